@@ -0,0 +1,387 @@
+import math
+from statistics import NormalDist
+from typing import Optional, Sequence
+
+import numpy as np
+
+# game indices (or grid positions) per accumulator that keep a quantile sketch,
+# None sketches every one of them
+SKETCH_POINTS = 100
+# span sketched by an accumulator that is never told its game size
+DEFAULT_GAME_SIZE = 1_000_000
+PERCENTILE_FIELDS = ["p1", "p5", "p50", "p95", "p99"]
+BALANCE_FIELDS = ["index", "min", "max", "mean", "std", *PERCENTILE_FIELDS]
+
+
+def sketch_positions(last: int, points: Optional[int] = SKETCH_POINTS) -> np.ndarray:
+    # positions 0..last, `points` of them log-spaced like the game lengths when there
+    # are more, so short and long sessions both get rows
+    if points is None or last < points:
+        return np.arange(0, last + 1)
+    # rounding collapses the dense start, step at least one game instead
+    steps = np.arange(0, points - 1)
+    spaced = np.round(np.geomspace(1, last, points - 1)).astype(np.int64)
+    return np.concatenate([[0], np.maximum.accumulate(spaced - steps) + steps])
+
+
+class BalanceAccumulator:
+    # per game index running min/max/count/mean/M2 (Welford), mergeable across workers
+    def __init__(
+        self, size: int = 0, sketch_points: Optional[int] = SKETCH_POINTS
+    ) -> None:
+        self.length: int = 0
+        # game index of every position when trajectories are recorded on a grid
+        self.grid: Optional[np.ndarray] = None
+        self.count: np.ndarray = np.zeros(size, dtype=np.int64)
+        self.mean: np.ndarray = np.zeros(size, dtype=np.float64)
+        self.m2: np.ndarray = np.zeros(size, dtype=np.float64)
+        self.min: np.ndarray = np.full(size, np.inf)
+        self.max: np.ndarray = np.full(size, -np.inf)
+        self.sketch_points: Optional[int] = sketch_points
+        self.sketch_positions: np.ndarray = sketch_positions(
+            DEFAULT_GAME_SIZE, sketch_points
+        )
+        self.sketch: QuantileSketch = QuantileSketch(len(self.sketch_positions))
+
+    def __getstate__(self):
+        # only the used part of the preallocated buffers crosses processes
+        state = self.__dict__.copy()
+        for field in ("count", "mean", "m2", "min", "max"):
+            state[field] = state[field][: self.length].copy()
+        return state
+
+    def use_grid(
+        self, grid: Optional[np.ndarray], game_size: Optional[int] = None
+    ) -> None:
+        # the game indices of the trajectories about to be added, None for every game
+        # of a `game_size` session; an empty accumulator lays its sketches out on them
+        if self.length == 0:
+            self.grid = grid
+            last = len(grid) - 1 if grid is not None else game_size
+            if last is not None:
+                self.sketch_positions = sketch_positions(last, self.sketch_points)
+                self.sketch = QuantileSketch(len(self.sketch_positions))
+            return
+        if self.grid is grid:
+            return
+        if (self.grid is None) != (grid is None) or (
+            grid is not None and not np.array_equal(self.grid, grid)
+        ):
+            raise Exception("balances recorded on different game grids can't be merged")
+
+    def _reserve(self, length: int) -> None:
+        if length > len(self.count):
+            size = max(length, len(self.count) * 2)
+            extra = size - len(self.count)
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+            self.min = np.concatenate([self.min, np.full(extra, np.inf)])
+            self.max = np.concatenate([self.max, np.full(extra, -np.inf)])
+        self.length = max(self.length, length)
+
+    def add(self, index: int, balances: np.ndarray) -> None:
+        # one game index, balances of many players
+        balances = np.asarray(balances, dtype=np.float64)
+        if len(balances) == 0:
+            return
+        self._reserve(index + 1)
+        n_b = len(balances)
+        mean_b = balances.mean()
+        m2_b = np.square(balances - mean_b).sum()
+        n_a = self.count[index]
+        n = n_a + n_b
+        delta = mean_b - self.mean[index]
+        self.mean[index] += delta * n_b / n
+        self.m2[index] += m2_b + delta * delta * n_a * n_b / n
+        self.count[index] = n
+        self.min[index] = min(self.min[index], balances.min())
+        self.max[index] = max(self.max[index], balances.max())
+        row = int(np.searchsorted(self.sketch_positions, index))
+        if row < len(self.sketch_positions) and self.sketch_positions[row] == index:
+            self.sketch.add(row, balances)
+
+    def add_trajectory(self, balances: Sequence[float]) -> None:
+        # one player, balances at game indices 0..len-1
+        balances = np.asarray(balances, dtype=np.float64)
+        length = len(balances)
+        self._reserve(length)
+        count = self.count[:length]
+        mean = self.mean[:length]
+        count += 1
+        delta = balances - mean
+        mean += delta / count
+        self.m2[:length] += delta * (balances - mean)
+        np.minimum(self.min[:length], balances, out=self.min[:length])
+        np.maximum(self.max[:length], balances, out=self.max[:length])
+        rows = int(np.searchsorted(self.sketch_positions, length))
+        self.sketch.add_rows(np.arange(0, rows), balances[self.sketch_positions[:rows]])
+
+    def merge(self, other: "BalanceAccumulator") -> "BalanceAccumulator":
+        if other.length == 0:
+            return self
+        if self.length == 0:
+            # e.g. a fresh accumulator taking in a worker's, whatever its layout
+            self.grid = other.grid
+            self.sketch_positions = other.sketch_positions
+            self.sketch = QuantileSketch(
+                len(other.sketch_positions), other.sketch.accuracy
+            )
+        self.use_grid(other.grid)
+        if not np.array_equal(self.sketch_positions, other.sketch_positions):
+            raise Exception("balances sketched at different positions can't be merged")
+        self._reserve(other.length)
+        length = other.length
+        n_a = self.count[:length]
+        n_b = other.count[:length]
+        n = n_a + n_b
+        safe_n = np.where(n == 0, 1, n)
+        delta = other.mean[:length] - self.mean[:length]
+        self.mean[:length] += delta * n_b / safe_n
+        self.m2[:length] += other.m2[:length] + delta * delta * n_a * n_b / safe_n
+        self.count[:length] = n
+        np.minimum(self.min[:length], other.min[:length], out=self.min[:length])
+        np.maximum(self.max[:length], other.max[:length], out=self.max[:length])
+        self.sketch.merge(other.sketch)
+        return self
+
+    def std(self) -> np.ndarray:
+        count = self.count[: self.length]
+        return np.sqrt(self.m2[: self.length] / np.where(count == 0, 1, count))
+
+    def columns(self) -> dict:
+        # fresh arrays per BALANCE_FIELDS, safe to hand to another thread while this
+        # accumulator keeps merging; percentiles are NaN where no sketch is kept
+        length = self.length
+        columns = {
+            "index": (
+                np.arange(0, length) if self.grid is None else self.grid[:length].copy()
+            ),
+            "min": self.min[:length].copy(),
+            "max": self.max[:length].copy(),
+            "mean": self.mean[:length].copy(),
+            "std": self.std(),
+        }
+        percentiles = np.full((len(PERCENTILE_FIELDS), length), np.nan)
+        for sketch_row, position in enumerate(self.sketch_positions.tolist()):
+            if position >= length:
+                break
+            percentiles[:, position] = [
+                np.nan if estimate is None else estimate
+                for estimate in self.sketch.quantiles(
+                    sketch_row, self.min[position], self.max[position]
+                )
+            ]
+        columns.update(zip(PERCENTILE_FIELDS, percentiles))
+        return columns
+
+    def rows(self) -> list:
+        return column_rows(self.columns())
+
+
+def column_rows(columns: dict) -> list:
+    # one dict per row, percentiles None where blank
+    values = {field: column.tolist() for field, column in columns.items()}
+    for field in PERCENTILE_FIELDS:
+        values[field] = [None if math.isnan(v) else v for v in values[field]]
+    return [dict(zip(values, row)) for row in zip(*values.values())]
+
+
+class QuantileSketch:
+    # DDSketch style log buckets, one row per sketched game index: every quantile
+    # comes back within `accuracy` relative error however skewed the balances are,
+    # and sketches merge by adding counts. Only the key range seen so far is kept.
+    QUANTILES = (0.01, 0.05, 0.5, 0.95, 0.99)
+
+    def __init__(self, rows: int = 0, accuracy: float = 0.02) -> None:
+        self.accuracy: float = accuracy
+        self.gamma: float = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma: float = float(np.log(self.gamma))
+        self.key_low: int = 0
+        # balances at or below zero, e.g. a Martingale player that bet it all
+        self.zeros: np.ndarray = np.zeros(rows, dtype=np.int64)
+        self.counts: np.ndarray = np.zeros((rows, 0), dtype=np.int64)
+
+    def _keys(self, values: np.ndarray) -> np.ndarray:
+        values = np.clip(values[values > 0], 1e-300, 1e300)
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def _cover(self, key_low: int, key_high: int) -> None:
+        # widen the bucket window to keys key_low..key_high
+        width = self.counts.shape[1]
+        if width == 0:
+            self.key_low = key_low
+            self.counts = np.zeros((len(self.zeros), key_high - key_low + 1), np.int64)
+            return
+        below = max(0, self.key_low - key_low)
+        above = max(0, key_high - (self.key_low + width - 1))
+        if below or above:
+            self.counts = np.pad(self.counts, ((0, 0), (below, above)))
+            self.key_low -= below
+
+    def add(self, row: int, values: np.ndarray) -> None:
+        # many balances of one row
+        self.zeros[row] += np.count_nonzero(values <= 0)
+        keys = self._keys(values)
+        if len(keys) == 0:
+            return
+        self._cover(int(keys.min()), int(keys.max()))
+        self.counts[row] += np.bincount(
+            keys - self.key_low, minlength=self.counts.shape[1]
+        )
+
+    def add_rows(self, rows: np.ndarray, values: np.ndarray) -> None:
+        # one balance for each of `rows`
+        positive = values > 0
+        np.add.at(self.zeros, rows[~positive], 1)
+        keys = self._keys(values)
+        if len(keys) == 0:
+            return
+        self._cover(int(keys.min()), int(keys.max()))
+        np.add.at(self.counts, (rows[positive], keys - self.key_low), 1)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.accuracy != self.accuracy or len(other.zeros) != len(self.zeros):
+            raise Exception("quantile sketches of different layouts can't be merged")
+        self.zeros += other.zeros
+        width = other.counts.shape[1]
+        if width == 0:
+            return self
+        self._cover(other.key_low, other.key_low + width - 1)
+        start = other.key_low - self.key_low
+        self.counts[:, start : start + width] += other.counts
+        return self
+
+    def quantiles(self, row: int, _min: float, _max: float) -> list:
+        # bucket midpoints, kept inside the exact min and max of the row
+        counts = np.concatenate([[self.zeros[row]], self.counts[row]])
+        cumulative = np.cumsum(counts)
+        total = cumulative[-1]
+        if total == 0:
+            return [None for _ in QuantileSketch.QUANTILES]
+        estimates = []
+        for quantile in QuantileSketch.QUANTILES:
+            bucket = int(np.searchsorted(cumulative, quantile * (total - 1), "right"))
+            if bucket == 0:
+                estimate = min(0.0, _max)
+            else:
+                key = self.key_low + bucket - 1
+                estimate = 2 * self.gamma**key / (self.gamma + 1)
+            estimates.append(float(min(max(estimate, _min), _max)))
+        return estimates
+
+
+class RunningStats:
+    # scalar count/mean/M2/min/max, merged with Chan's parallel update
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.mean: float = 0.0
+        self.m2: float = 0.0
+        self.min: float = np.inf
+        self.max: float = -np.inf
+
+    def add(self, values: Sequence[float]) -> "RunningStats":
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        mean = values.mean()
+        return self._merge(
+            len(values),
+            mean,
+            np.square(values - mean).sum(),
+            values.min(),
+            values.max(),
+        )
+
+    def add_groups(
+        self,
+        counts: np.ndarray,
+        means: np.ndarray,
+        m2s: np.ndarray,
+        mins: np.ndarray,
+        maxs: np.ndarray,
+    ) -> "RunningStats":
+        # many already summarized groups at once, e.g. one per player
+        counts = np.asarray(counts)
+        non_empty = counts > 0
+        if not non_empty.any():
+            return self
+        counts = counts[non_empty]
+        means = np.asarray(means, dtype=np.float64)[non_empty]
+        count = counts.sum()
+        mean = np.sum(counts * means) / count
+        m2 = np.sum(np.asarray(m2s)[non_empty] + counts * np.square(means - mean))
+        return self._merge(
+            count,
+            mean,
+            m2,
+            np.asarray(mins)[non_empty].min(),
+            np.asarray(maxs)[non_empty].max(),
+        )
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        if other.count == 0:
+            return self
+        return self._merge(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _merge(
+        self, count: int, mean: float, m2: float, _min: float, _max: float
+    ) -> "RunningStats":
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = float(self.mean + delta * count / total)
+        self.m2 = float(self.m2 + m2 + delta * delta * self.count * count / total)
+        self.count = int(total)
+        self.min = min(self.min, _min)
+        self.max = max(self.max, _max)
+        return self
+
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+
+    def confidence_interval(self, confidence: float = 0.95) -> float:
+        # half width of the normal interval around the mean
+        if self.count < 2:
+            return np.inf
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return float(z * np.sqrt(self.m2 / (self.count - 1) / self.count))
+
+
+class ResultSummary:
+    # per rate summary row of the game results CSV, built from PlayerResult records
+    def __init__(self) -> None:
+        self.sample_size: int = 0
+        self.games_played: int = 0
+        # players that stopped before the end of the session
+        self.broke: int = 0
+        self.mvdd: RunningStats = RunningStats()
+        self.pnl: RunningStats = RunningStats()
+        self.double_balance_game_length: RunningStats = RunningStats()
+
+    def add(self, results: list) -> "ResultSummary":
+        if not results:
+            return self
+        self.sample_size += len(results)
+        self.games_played += sum(r.games_played for r in results)
+        self.broke += sum(r.broke for r in results)
+        self.mvdd.add([r.max_value_draw_down_pcnt for r in results])
+        balances = np.array([r.balance for r in results])
+        initial_budgets = np.array([r.initial_budget for r in results])
+        self.pnl.add(((balances - initial_budgets) / initial_budgets) * 100)
+        self.double_balance_game_length.add_groups(
+            [r.double_balance_game_length_count for r in results],
+            [r.double_balance_game_length_mean for r in results],
+            [r.double_balance_game_length_m2 for r in results],
+            [r.double_balance_game_length_min for r in results],
+            [r.double_balance_game_length_max for r in results],
+        )
+        return self
+
+    def merge(self, other: "ResultSummary") -> "ResultSummary":
+        self.sample_size += other.sample_size
+        self.games_played += other.games_played
+        self.broke += other.broke
+        self.mvdd.merge(other.mvdd)
+        self.pnl.merge(other.pnl)
+        self.double_balance_game_length.merge(other.double_balance_game_length)
+        return self
@@ -0,0 +1,294 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from betting_simulator import lockstep
+from betting_simulator.skipping import skip_games
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    SteadyOnePlayer,
+    _aggregate_rate_results,
+    _simulate_rate,
+    _write_game_balances_tract_to_file,
+    simulate_games,
+    write_game_results,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+# peak memory below this much growth is allocator noise, not a regression
+MEMORY_SLACK = 1 << 20
+
+
+class Benchmark(NamedTuple):
+    name: str
+    unit: str
+    # builds the inputs outside the measurement and returns the measured call,
+    # which returns the number of units it processed
+    prepare: Callable[[], Callable[[], int]]
+
+
+def _house_play(games: int):
+    house = House(0.5, 0, 1, rng=np.random.default_rng(0))
+
+    def run() -> int:
+        for _ in range(0, games):
+            house.play(10)
+        return games
+
+    return run
+
+
+def _player_play(player_class: type, games: int):
+    # a winning house so no player goes broke and bets shrink to nothing
+    house = House(0.6, 0, 1, rng=np.random.default_rng(0))
+    player = player_class(1_000_000)
+
+    def run() -> int:
+        for _ in range(0, games):
+            player.play(house)
+        return games
+
+    return run
+
+
+def _simulate_games(games: int):
+    house = House(0.6, 0, 1, rng=np.random.default_rng(0))
+    player = SteadyOnePlayer(1_000_000)
+
+    def run() -> int:
+        _, _player, _ = simulate_games(games, house, player)
+        return _player.games_played
+
+    return run
+
+
+def _skip_games(games: int):
+    house = House(0.6, 0, 1, rng=np.random.default_rng(0))
+    player = SteadyOnePlayer(1_000_000)
+
+    def run() -> int:
+        _, _player, _ = skip_games(games, house, player)
+        return _player.games_played
+
+    return run
+
+
+def _rate_results(players: int, games: int) -> list:
+    simulation_func = partial(lockstep.simulate_steady_one_player, game_size=games)
+    return [
+        _simulate_rate(
+            0.5 + (0.01 * x), simulation_func, 1, players=players, root_seed=0
+        )
+        for x in range(0, 30)
+    ]
+
+
+def _aggregation(players: int, games: int):
+    simulation_results = _rate_results(players, games)
+
+    def run() -> int:
+        rate_balance_accumulator_dict = {}
+        _aggregate_rate_results(rate_balance_accumulator_dict, {}, simulation_results)
+        return int(
+            sum(
+                balance_accumulator.count.sum()
+                for balance_accumulator in rate_balance_accumulator_dict.values()
+            )
+        )
+
+    return run
+
+
+def _quietly_in(func: Callable, *args) -> None:
+    # the writers print every rate and write into the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+                io.StringIO()
+            ):
+                func(*args)
+        finally:
+            os.chdir(cwd)
+
+
+def _write_results(players: int, games: int):
+    rate_result_summary_dict = {}
+    _aggregate_rate_results({}, rate_result_summary_dict, _rate_results(players, games))
+
+    def run() -> int:
+        _quietly_in(
+            write_game_results,
+            rate_result_summary_dict,
+            SteadyOnePlayer().name,
+            1,
+        )
+        return len(rate_result_summary_dict)
+
+    return run
+
+
+def _write_balances(players: int, games: int):
+    rate_balance_accumulator_dict = {}
+    _aggregate_rate_results(
+        rate_balance_accumulator_dict, {}, _rate_results(players, games)
+    )
+
+    def run() -> int:
+        _quietly_in(
+            _write_game_balances_tract_to_file,
+            rate_balance_accumulator_dict,
+            SteadyOnePlayer().name,
+            1,
+        )
+        return sum(
+            balance_accumulator.length
+            for balance_accumulator in rate_balance_accumulator_dict.values()
+        )
+
+    return run
+
+
+BENCHMARKS: list = [
+    Benchmark("house_play", "games", partial(_house_play, 1_000_000)),
+    *[
+        Benchmark(
+            f"player_play_{player_class.__name__}",
+            "games",
+            partial(_player_play, player_class, 200_000),
+        )
+        for player_class in (
+            SteadyOnePlayer,
+            MartingaleSystemPlayer,
+            MartingaleSystemStopLossPlayer,
+        )
+    ],
+    *[
+        Benchmark(f"simulate_games_{games}", "games", partial(_simulate_games, games))
+        for games in (1_000, 10_000, 100_000)
+    ],
+    Benchmark("skip_games_1000000", "games", partial(_skip_games, 1_000_000)),
+    Benchmark(
+        "simulate_and_save_aggregation", "games", partial(_aggregation, 100, 2_000)
+    ),
+    Benchmark("write_game_results", "rows", partial(_write_results, 10, 2_000)),
+    Benchmark("write_game_balances", "rows", partial(_write_balances, 10, 2_000)),
+]
+
+
+def measure(benchmark: Benchmark, repeat: int = 3) -> dict:
+    # best wall time of `repeat` runs, peak memory from one more traced run so
+    # tracing does not slow the timed ones
+    seconds = np.inf
+    units = 0
+    for _ in range(0, repeat):
+        run = benchmark.prepare()
+        start = time.perf_counter()
+        units = run()
+        seconds = min(seconds, time.perf_counter() - start)
+    run = benchmark.prepare()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "unit": benchmark.unit,
+        "units": units,
+        "seconds": round(seconds, 6),
+        "per_sec": round(units / seconds, 2) if seconds else np.inf,
+        "peak_memory": peak_memory,
+    }
+
+
+def run_benchmarks(names: Optional[list] = None, repeat: int = 3) -> dict:
+    results = {}
+    for benchmark in BENCHMARKS:
+        if names and not any(name in benchmark.name for name in names):
+            continue
+        results[benchmark.name] = measure(benchmark, repeat)
+        result = results[benchmark.name]
+        print(
+            f"{benchmark.name:<45} {result['per_sec']:>15,.0f} {result['unit']}/sec {result['peak_memory'] / 1024:>12,.0f} KiB"
+        )
+    return results
+
+
+def regressions(results: dict, baseline: dict, tolerance: float = 0.2) -> list:
+    found = []
+    for name, result in results.items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            continue
+        if result["per_sec"] < base["per_sec"] * (1 - tolerance):
+            found.append(
+                f"{name}: {result['per_sec']:,.0f} {result['unit']}/sec, baseline {base['per_sec']:,.0f}"
+            )
+        if (
+            result["peak_memory"] > base["peak_memory"] * (1 + tolerance)
+            and result["peak_memory"] - base["peak_memory"] > MEMORY_SLACK
+        ):
+            found.append(
+                f"{name}: {result['peak_memory']:,} bytes peak, baseline {base['peak_memory']:,}"
+            )
+    return found
+
+
+def save_baseline(results: dict, path: str = BASELINE_PATH) -> None:
+    baseline = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=2)
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="casino simulation benchmarks")
+    parser.add_argument("names", nargs="*", help="only benchmarks containing these")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save", action="store_true", help="write the results as the new baseline"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.names, args.repeat)
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save to create one")
+        return 0
+    found = regressions(results, load_baseline(args.baseline), args.tolerance)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,48 @@
 import csv
 import os
-import random
+import time
+import zlib
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from functools import partial
+from typing import Optional
 
 import numpy as np
-import parmap
 from tqdm import tqdm
 
+from betting_simulator.aggregates import (
+    BALANCE_FIELDS,
+    PERCENTILE_FIELDS,
+    BalanceAccumulator,
+    ResultSummary,
+)
+from betting_simulator.metrics import AttemptMetrics, payload_bytes, profiled
+from betting_simulator.store import TrajectoryStore
+from betting_simulator.trajectory import EVENTS, OFF, Recording, Trajectory
+from betting_simulator.writer import BackgroundWriter
+
 
 class House:
     THOUSAND = 1_000
     MILLION = 1_000_000
     BILLION = 1_000_000_000
 
+    # outcome codes, also the index into payout multipliers
+    LOSS = 0
+    TIE = 1
+    WIN = 2
+
+    BLOCK_SIZE = 65_536
+
     def __init__(
         self,
         win_rate: float,
         tie_rate: float,
         return_on_investment: float,
+        rng: Optional[np.random.Generator] = None,
+        block_size: int = BLOCK_SIZE,
     ) -> None:
         if win_rate + tie_rate > 1:
             raise Exception("win rate + tie rate cannot exceed 1")
@@ -28,9 +52,29 @@ class House:
         self._win_range: int = int(House.MILLION * self.win_rate)
         self._tie_range: int = int(House.MILLION * self.tie_rate) + self._win_range
         self._lose_range: int = House.MILLION
+        self._rng: np.random.Generator = (
+            rng if rng is not None else np.random.default_rng()
+        )
+        self._block_size: int = block_size
+        self._draws: np.ndarray = np.empty(0, dtype=np.int64)
+        self._draws_list: Optional[list] = None
+        self._cursor: int = 0
+
+    def __getstate__(self):
+        # the pre-drawn block is bulky and cheap to redraw, keep pickles small
+        state = self.__dict__.copy()
+        state["_draws"] = np.empty(0, dtype=np.int64)
+        state["_draws_list"] = None
+        state["_cursor"] = 0
+        return state
 
     def play(self, bet: float) -> float:
-        r = random.randint(1, House.MILLION)
+        if self._cursor >= len(self._draws):
+            self._refill()
+        if self._draws_list is None:
+            self._draws_list = self._draws.tolist()
+        r = self._draws_list[self._cursor]
+        self._cursor += 1
         return (
             bet * (1 + self.return_on_investment)
             if r <= self._win_range
@@ -39,6 +83,42 @@ class House:
             else 0
         )
 
+    def play_many(self, bets: np.ndarray) -> np.ndarray:
+        bets = np.asarray(bets, dtype=np.float64)
+        return bets * self.payout_multipliers()[self.outcomes(len(bets))]
+
+    def outcomes(self, n: int) -> np.ndarray:
+        draws = self._next_draws(n)
+        codes = np.full(len(draws), House.LOSS, dtype=np.int8)
+        codes[draws <= self._tie_range] = House.TIE
+        codes[draws <= self._win_range] = House.WIN
+        return codes
+
+    def payout_multipliers(self) -> np.ndarray:
+        return np.array([0, 1, 1 + self.return_on_investment], dtype=np.float64)
+
+    def _next_draws(self, n: int) -> np.ndarray:
+        # play() and outcomes() consume the same block stream, so a seeded
+        # house yields identical games however they are batched
+        chunks = []
+        while n > 0:
+            if self._cursor >= len(self._draws):
+                self._refill()
+            take = min(n, len(self._draws) - self._cursor)
+            chunks.append(self._draws[self._cursor : self._cursor + take])
+            self._cursor += take
+            n -= take
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def _refill(self) -> None:
+        self._draws = self._rng.integers(
+            1, House.MILLION, size=self._block_size, endpoint=True
+        )
+        self._draws_list = None
+        self._cursor = 0
+
 
 class Player:
     def __init__(
@@ -152,6 +232,62 @@ class Player:
     def is_broke(self) -> bool:
         pass
 
+    def result(self) -> "PlayerResult":
+        return PlayerResult(self)
+
+
+class PlayerResult:
+    # the scalars the result writers need, cheap to pickle back from workers
+    __slots__ = (
+        "balance",
+        "initial_budget",
+        "max_value_draw_down_pcnt",
+        "games_played",
+        "win",
+        "tie",
+        "loss",
+        "max_bet",
+        "max_losing_streak",
+        "broke",
+        "double_balance_game_length_count",
+        "double_balance_game_length_mean",
+        "double_balance_game_length_m2",
+        "double_balance_game_length_min",
+        "double_balance_game_length_max",
+    )
+
+    def __init__(self, player: Player) -> None:
+        self.balance: float = player.balance
+        self.initial_budget: float = player.initial_budget
+        self.max_value_draw_down_pcnt: float = player.max_value_draw_down_pcnt
+        self.games_played: int = player.games_played
+        self.win: int = player.win
+        self.tie: int = player.tie
+        self.loss: int = player.loss
+        self.max_bet: float = player.max_bet
+        self.max_losing_streak: int = player.max_losing_streak
+        self.broke: bool = bool(player.is_broke())
+        lengths = player.double_balance_game_lengths
+        count = len(lengths)
+        mean = sum(lengths) / count if count else 0
+        self.double_balance_game_length_count: int = count
+        self.double_balance_game_length_mean: float = mean
+        self.double_balance_game_length_m2: float = sum(
+            (length - mean) ** 2 for length in lengths
+        )
+        self.double_balance_game_length_min: int = min(lengths, default=0)
+        self.double_balance_game_length_max: int = max(lengths, default=0)
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in PlayerResult.__slots__)
+
+    def __setstate__(self, state):
+        for field, value in zip(PlayerResult.__slots__, state):
+            setattr(self, field, value)
+
+    def __str__(self):
+        return str({field: getattr(self, field) for field in PlayerResult.__slots__})
+
 
 class SteadyOnePlayer(Player):
     def __init__(self, budget: float = 0) -> None:
@@ -196,7 +332,14 @@ class MartingaleSystemStopLossPlayer(MartingaleSystemPlayer):
         return max_bet
 
 
-def track_game_balances(repetition: int, house: House, player: Player):
+def track_game_balances(
+    repetition: int,
+    house: House,
+    player: Player,
+    recording: Optional[Recording] = None,
+):
+    if recording is not None:
+        return _record_games(repetition, house, player, recording)
     balances = [player.balance]
     for _ in range(0, repetition):
         player.play(house=house)
@@ -206,13 +349,84 @@ def track_game_balances(repetition: int, house: House, player: Player):
     return balances
 
 
-def simulate_games(repetition: int, house: House, player: Player):
+def _record_games(
+    repetition: int, house: House, player: Player, recording: Recording
+) -> Optional[Trajectory]:
+    # same games as simulate_games, balances kept only where the recording asks
+    # for them, in preallocated buffers
+    if recording.mode == OFF:
+        for _ in range(0, repetition):
+            player.play(house=house)
+            if player.is_broke():
+                break
+        return None
+    if recording.mode == EVENTS:
+        indices = array("q", [0])
+        balances = array("d", [player.balance])
+        for _ in range(0, repetition):
+            max_value = player.max_value
+            max_value_draw_down_pcnt = player.max_value_draw_down_pcnt
+            player.play(house=house)
+            broke = player.is_broke()
+            if (
+                player.max_value > max_value
+                or player.max_value_draw_down_pcnt < max_value_draw_down_pcnt
+                or broke
+            ):
+                indices.append(player.games_played)
+                balances.append(player.balance)
+            if broke:
+                break
+        if indices[-1] != player.games_played:
+            indices.append(player.games_played)
+            balances.append(player.balance)
+        return Trajectory(
+            np.frombuffer(indices, dtype=np.int64), np.frombuffer(balances)
+        )
+    grid = recording.grid(repetition)
+    grid_list = grid.tolist()
+    balances = np.empty(len(grid))
+    balances[0] = player.balance
+    position = 1
+    next_index = grid_list[1] if len(grid_list) > 1 else -1
+    for _ in range(0, repetition):
+        player.play(house=house)
+        if player.games_played == next_index:
+            balances[position] = player.balance
+            position += 1
+            next_index = grid_list[position] if position < len(grid_list) else -1
+        if player.is_broke():
+            break
+    return Trajectory(grid[:position], balances[:position])
+
+
+def simulate_games(
+    repetition: int,
+    house: House,
+    player: Player,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    recording: Optional[Recording] = None,
+):
+    if recording is not None:
+        if balance_accumulator is not None and recording.mode == EVENTS:
+            raise Exception("event trajectories share no game grid to aggregate")
+        trajectory = _record_games(repetition, house, player, recording)
+        if balance_accumulator is not None and recording.mode != OFF:
+            balance_accumulator.use_grid(recording.grid(repetition), repetition)
+            balance_accumulator.add_trajectory(trajectory.balances)
+            trajectory = None
+        return house, player, trajectory
     _balances = [player.balance]
     for _ in range(0, repetition):
         player.play(house=house)
         _balances.append(player.balance)
         if player.is_broke():
             break
+    if balance_accumulator is not None:
+        # fold the trajectory in and drop it instead of handing it back
+        balance_accumulator.use_grid(None, repetition)
+        balance_accumulator.add_trajectory(_balances)
+        _balances = None
     return house, player, _balances
 
 
@@ -222,9 +436,99 @@ def simulate_with_player(
     tie_rate: float = 0,
     roi: float = 1,
     game_size: int = 1_000_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    rng: Optional[np.random.Generator] = None,
+    recording: Optional[Recording] = None,
+):
+    house = House(
+        win_rate=win_rate, tie_rate=tie_rate, return_on_investment=roi, rng=rng
+    )
+    return simulate_games(game_size, house, player, balance_accumulator, recording)
+
+
+def _seed_key(value: float) -> int:
+    return int(round(value * House.MILLION))
+
+
+def seed_sequence(
+    root_seed: int,
+    player_name: str,
+    roi: float,
+    win_rate: float,
+    attempt: int,
+    player_index: int,
+) -> np.random.SeedSequence:
+    # one independent stream per (strategy, roi, win rate, attempt, player) cell,
+    # so any single cell can be replayed without rerunning the sweep
+    return np.random.SeedSequence(
+        root_seed,
+        spawn_key=(
+            zlib.crc32(player_name.encode()),
+            _seed_key(roi),
+            _seed_key(win_rate),
+            attempt,
+            player_index,
+        ),
+    )
+
+
+def player_rngs(
+    root_seed: Optional[int],
+    player_name: str,
+    roi: float,
+    win_rate: float,
+    attempt: int,
+    first_player: int,
+    repetition: int,
+) -> list:
+    if root_seed is None:
+        return [None for _ in range(0, repetition)]
+    return [
+        np.random.default_rng(
+            seed_sequence(
+                root_seed, player_name, roi, win_rate, attempt, first_player + i
+            )
+        )
+        for i in range(0, repetition)
+    ]
+
+
+def common_seed_sequence(
+    root_seed: int,
+    win_rate: float,
+    tie_rate: float,
+    attempt: int,
+    player_index: int,
+) -> np.random.SeedSequence:
+    # outcomes do not depend on the bet, so every strategy, roi and budget of a
+    # (win rate, tie rate) cell can replay the same stream (common random numbers)
+    return np.random.SeedSequence(
+        root_seed,
+        spawn_key=(
+            zlib.crc32(b"common outcomes"),
+            _seed_key(tie_rate),
+            _seed_key(win_rate),
+            attempt,
+            player_index,
+        ),
+    )
+
+
+def replay_player(
+    player_class: type,
+    root_seed: int,
+    roi: float,
+    win_rate: float,
+    attempt: int,
+    player_index: int,
+    tie_rate: float = 0,
+    game_size: int = 1_000_000,
 ):
-    house = House(win_rate=win_rate, tie_rate=tie_rate, return_on_investment=roi)
-    return simulate_games(game_size, house, player)
+    player: Player = player_class(budget=1_000_000)
+    rng = np.random.default_rng(
+        seed_sequence(root_seed, player.name, roi, win_rate, attempt, player_index)
+    )
+    return simulate_with_player(player, win_rate, tie_rate, roi, game_size, rng=rng)
 
 
 def simulate_martingale_system_player(
@@ -233,10 +537,27 @@ def simulate_martingale_system_player(
     roi: float = 1,
     game_size: int = 1_000_000,
     repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
 ):
     players = [MartingaleSystemPlayer(budget=1_000_000) for _ in range(0, repetition)]
+    rngs = player_rngs(
+        root_seed,
+        MartingaleSystemPlayer().name,
+        roi,
+        win_rate,
+        attempt,
+        first_player,
+        repetition,
+    )
     return [
-        simulate_with_player(p, win_rate, tie_rate, roi, game_size) for p in players
+        simulate_with_player(
+            p, win_rate, tie_rate, roi, game_size, balance_accumulator, rng, recording
+        )
+        for p, rng in zip(players, rngs)
     ]
 
 
@@ -246,12 +567,29 @@ def simulate_martingale_stoploss_player(
     roi: float = 1,
     game_size: int = 1_000_000,
     repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
 ):
     players = [
         MartingaleSystemStopLossPlayer(budget=1_000_000) for _ in range(0, repetition)
     ]
+    rngs = player_rngs(
+        root_seed,
+        MartingaleSystemStopLossPlayer().name,
+        roi,
+        win_rate,
+        attempt,
+        first_player,
+        repetition,
+    )
     return [
-        simulate_with_player(p, win_rate, tie_rate, roi, game_size) for p in players
+        simulate_with_player(
+            p, win_rate, tie_rate, roi, game_size, balance_accumulator, rng, recording
+        )
+        for p, rng in zip(players, rngs)
     ]
 
 
@@ -261,58 +599,175 @@ def simulate_steady_one_player(
     roi: float = 1,
     game_size: int = 1_000_000,
     repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
 ):
     players = [SteadyOnePlayer(budget=1_000_000) for _ in range(0, repetition)]
+    rngs = player_rngs(
+        root_seed,
+        SteadyOnePlayer().name,
+        roi,
+        win_rate,
+        attempt,
+        first_player,
+        repetition,
+    )
     return [
-        simulate_with_player(p, win_rate, tie_rate, roi, game_size) for p in players
+        simulate_with_player(
+            p, win_rate, tie_rate, roi, game_size, balance_accumulator, rng, recording
+        )
+        for p, rng in zip(players, rngs)
     ]
 
 
-def simulate_multiple_rates(simulation_func, roi: float = 1):
+def _simulate_rate(
+    win_rate: float,
+    simulation_func,
+    roi: float,
+    profile_directory: Optional[str] = None,
+    trajectory_store: Optional[TrajectoryStore] = None,
+    first_player: int = 0,
+    players: int = 1_000,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+):
+    balance_accumulator = BalanceAccumulator()
+    # with a store every trajectory is also written to its rows on disk
+    sink = (
+        trajectory_store.writer(win_rate, first_player, players, balance_accumulator)
+        if trajectory_store is not None
+        else balance_accumulator
+    )
+    profile_path = (
+        os.path.join(
+            profile_directory,
+            f"rate_{round(win_rate, 4)}_{os.getpid()}_{time.time_ns()}.prof",
+        )
+        if profile_directory
+        else None
+    )
+    with profiled(profile_path):
+        simulations = simulation_func(
+            win_rate,
+            roi=roi,
+            repetition=players,
+            balance_accumulator=sink,
+            root_seed=root_seed,
+            attempt=attempt,
+            first_player=first_player,
+        )
+    if trajectory_store is not None:
+        trajectory_store.flush()
+    result_summary = ResultSummary().add(
+        [player.result() for _house, player, _balances in simulations]
+    )
+    return win_rate, result_summary, balance_accumulator
+
+
+def _simulate_block(task: tuple, **kwargs):
+    win_rate, first_player, players = task
+    start_cpu = time.process_time()
+    simulation_result = _simulate_rate(
+        win_rate, first_player=first_player, players=players, **kwargs
+    )
+    # measured in the worker, the parent sees neither a pool's cpu nor the result
+    # before it is unpickled
+    return (
+        simulation_result,
+        payload_bytes(simulation_result),
+        time.process_time() - start_cpu,
+    )
+
+
+def simulate_multiple_rates(
+    simulation_func,
+    roi: float = 1,
+    profile_directory: Optional[str] = None,
+    trajectory_store: Optional[TrajectoryStore] = None,
+    metrics: Optional[AttemptMetrics] = None,
+    repetition: int = 1_000,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    executor: Optional[Executor] = None,
+):
+    # every rate is played by blocks of `repetition` players, numbered on from one
+    # block to the next so seeded blocks play their own games; a sweep passes its
+    # executor so the pool outlives the attempt
+    metrics = metrics if metrics is not None else AttemptMetrics()
     steps: int = 30
-    win_rates = []
-    for _ in range(0, 10):
-        win_rates += [0.5 + (0.01 * x) for x in range(0, steps)]
-    return parmap.map(partial(simulation_func, roi=roi), win_rates, pm_pbar=True)
+    blocks: int = 10
+    # each block of a rate fills its own share of the store's player rows
+    if trajectory_store is not None and trajectory_store.players != blocks * repetition:
+        raise Exception(
+            f"a store of {trajectory_store.players} players does not hold {blocks} blocks of {repetition}"
+        )
+    tasks = []
+    for block in range(0, blocks):
+        tasks += [
+            (0.5 + (0.01 * x), block * repetition, repetition) for x in range(0, steps)
+        ]
+    simulate_block = partial(
+        _simulate_block,
+        simulation_func=simulation_func,
+        roi=roi,
+        profile_directory=profile_directory,
+        trajectory_store=trajectory_store,
+        root_seed=root_seed,
+        attempt=attempt,
+    )
+    with ProcessPoolExecutor() if executor is None else nullcontext(executor) as pool:
+        block_results = list(tqdm(pool.map(simulate_block, tasks), total=len(tasks)))
+    metrics.count("bytes_from_workers", sum(size for _, size, _ in block_results))
+    metrics.count(
+        "worker_cpu_seconds", round(sum(cpu for _, _, cpu in block_results), 6)
+    )
+    return [simulation_result for simulation_result, _, _ in block_results]
 
 
-def _write_game_results_to_file(rate_player_dict: dict, player_name: str, roi: float):
+def write_game_results(rate_result_summary_dict: dict, player_name: str, roi: float):
     results = []
-    for rate, players in rate_player_dict.items():
+    for rate, result_summary in rate_result_summary_dict.items():
         print("=========================================")
-        mvdds = [p.max_value_draw_down_pcnt for p in players]
-        mvdd_min = round(np.min(mvdds), 4)
-        mvdd_max = round(np.max(mvdds), 4)
-        mvdd_std = round(np.std(mvdds), 4)
-        mvdd_mean = round(np.mean(mvdds), 4)
+        sample_size = result_summary.sample_size
+        mvdd = result_summary.mvdd
+        mvdd_min = round(mvdd.min, 4)
+        mvdd_max = round(mvdd.max, 4)
+        mvdd_std = round(mvdd.std(), 4)
+        mvdd_mean = round(mvdd.mean, 4)
+        mvdd_mean_ci = round(mvdd.confidence_interval(), 4)
         print(
-            f"@ rate[{round(rate, 4)}] with sample size[{len(mvdds)}] :: MVDD :: min[{mvdd_min}] max[{mvdd_max}] std[{mvdd_std}] mean[{mvdd_mean}]"
+            f"@ rate[{round(rate, 4)}] with sample size[{sample_size}] :: MVDD :: min[{mvdd_min}] max[{mvdd_max}] std[{mvdd_std}] mean[{mvdd_mean}] ci[{mvdd_mean_ci}]"
         )
-        pnls = [
-            ((p.balance - p.initial_budget) / p.initial_budget) * 100 for p in players
-        ]
-        pnl_min = round(np.min(pnls), 4)
-        pnl_max = round(np.max(pnls), 4)
-        pnl_std = round(np.std(pnls), 4)
-        pnl_mean = round(np.mean(pnls), 4)
+        pnl = result_summary.pnl
+        pnl_min = round(pnl.min, 4)
+        pnl_max = round(pnl.max, 4)
+        pnl_std = round(pnl.std(), 4)
+        pnl_mean = round(pnl.mean, 4)
+        pnl_mean_ci = round(pnl.confidence_interval(), 4)
         print(
-            f"@ rate[{round(rate, 4)}] with sample size[{len(pnls)}] :: PnL :: min[{pnl_min}] max[{pnl_max}] std[{pnl_std}] mean[{pnl_mean}]"
-        )
-        double_balance_game_lengths = sum(
-            [p.double_balance_game_lengths for p in players], []
+            f"@ rate[{round(rate, 4)}] with sample size[{sample_size}] :: PnL :: min[{pnl_min}] max[{pnl_max}] std[{pnl_std}] mean[{pnl_mean}] ci[{pnl_mean_ci}]"
         )
-        if not double_balance_game_lengths:
-            double_balance_game_lengths.append(0)
-        double_balance_game_length_min = round(np.min(double_balance_game_lengths), 4)
-        double_balance_game_length_max = round(np.max(double_balance_game_lengths), 4)
-        double_balance_game_length_std = round(np.std(double_balance_game_lengths), 4)
-        double_balance_game_length_mean = round(np.mean(double_balance_game_lengths), 4)
-        double_balance_game_length_count = len(double_balance_game_lengths)
+        double_balance_game_length = result_summary.double_balance_game_length
+        if double_balance_game_length.count:
+            double_balance_game_length_min = round(double_balance_game_length.min, 4)
+            double_balance_game_length_max = round(double_balance_game_length.max, 4)
+            double_balance_game_length_std = round(double_balance_game_length.std(), 4)
+            double_balance_game_length_mean = round(double_balance_game_length.mean, 4)
+            double_balance_game_length_count = double_balance_game_length.count
+        else:
+            double_balance_game_length_min = 0
+            double_balance_game_length_max = 0
+            double_balance_game_length_std = 0
+            double_balance_game_length_mean = 0
+            double_balance_game_length_count = 1
         print(
-            f"@ rate[{round(rate, 4)}] with sample size[{len(pnls)}] :: Double game lengths :: min[{double_balance_game_length_min}] max[{double_balance_game_length_max}] std[{double_balance_game_length_std}] mean[{double_balance_game_length_mean}] count[{double_balance_game_length_count}]"
+            f"@ rate[{round(rate, 4)}] with sample size[{sample_size}] :: Double game lengths :: min[{double_balance_game_length_min}] max[{double_balance_game_length_max}] std[{double_balance_game_length_std}] mean[{double_balance_game_length_mean}] count[{double_balance_game_length_count}]"
         )
         result = {
-            "sample_size": len(mvdds),
+            "sample_size": sample_size,
             "rate": round(rate, 4),
             "mvdd_min": mvdd_min,
             "mvdd_max": mvdd_max,
@@ -326,6 +781,8 @@ def _write_game_results_to_file(rate_player_dict: dict, player_name: str, roi: f
             "double_balance_game_length_max": double_balance_game_length_max,
             "double_balance_game_length_std": double_balance_game_length_std,
             "double_balance_game_length_mean": double_balance_game_length_mean,
+            "mvdd_mean_ci": mvdd_mean_ci,
+            "pnl_mean_ci": pnl_mean_ci,
         }
         results.append(result)
     headers = [
@@ -343,6 +800,8 @@ def _write_game_results_to_file(rate_player_dict: dict, player_name: str, roi: f
         "double_balance_game_length_max",
         "double_balance_game_length_std",
         "double_balance_game_length_mean",
+        "mvdd_mean_ci",
+        "pnl_mean_ci",
     ]
     with open(
         f"{datetime.today().strftime('%Y%m%d')}_{player_name.replace(' ', '_')}_rate_50-80_roi_{roi}.csv",
@@ -353,91 +812,259 @@ def _write_game_results_to_file(rate_player_dict: dict, player_name: str, roi: f
         writer.writerows(results)
 
 
-def _write_game_balances_tract_to_file(
-    rate_index_balances_dict: dict, player_name: str, roi: float
-):
-    headers = ["index", "min", "max", "mean", "std"]
-    for rate, index_balances_dict in tqdm(rate_index_balances_dict.items()):
-        rows = [
-            {
-                "index": i,
-                "min": np.min(b),
-                "max": np.max(b),
-                "mean": np.mean(b),
-                "std": np.std(b),
-            }
-            for i, b in index_balances_dict.items()
-        ]
-        today_str = datetime.today().strftime("%Y%m%d")
-        directory = os.path.join("game_balances", today_str)
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+def _game_balances_directory() -> tuple:
+    today_str = datetime.today().strftime("%Y%m%d")
+    directory = os.path.join("game_balances", today_str)
+    os.makedirs(directory, exist_ok=True)
+    return directory, today_str
+
+
+def _write_game_balance_columns_to_csv(
+    rate_columns: dict, player_name: str, roi: float
+) -> None:
+    directory, today_str = _game_balances_directory()
+    for rate, columns in tqdm(rate_columns.items()):
         filename = os.path.join(
             directory,
             f"{today_str}_{player_name.replace(' ', '_')}_rate_{rate}_roi_{roi}_game_balances.csv",
         )
+        values = [columns[field].tolist() for field in BALANCE_FIELDS]
+        # NaN percentiles, rows without a sketch, are written blank
+        for i in range(len(BALANCE_FIELDS) - len(PERCENTILE_FIELDS), len(values)):
+            values[i] = ["" if v != v else v for v in values[i]]
         with open(
             filename,
             "w",
         ) as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(rows)
+            writer = csv.writer(csvfile)
+            writer.writerow(BALANCE_FIELDS)
+            writer.writerows(zip(*values))
+
+
+def _write_game_balance_columns_to_npz(
+    rate_columns: dict, player_name: str, roi: float
+) -> None:
+    # every rate in one file, rows of rate i are offsets[i]:offsets[i + 1]
+    directory, today_str = _game_balances_directory()
+    filename = os.path.join(
+        directory,
+        f"{today_str}_{player_name.replace(' ', '_')}_roi_{roi}_game_balances.npz",
+    )
+    rates = sorted(rate_columns)
+    lengths = [len(rate_columns[rate]["index"]) for rate in rates]
+    arrays = {
+        field: (
+            np.concatenate([rate_columns[rate][field] for rate in rates])
+            if rates
+            else np.empty(0)
+        )
+        for field in BALANCE_FIELDS
+    }
+    # never leave a half written file behind for readers of the last attempt
+    temporary_filename = f"{filename}.tmp"
+    with open(temporary_filename, "wb") as file:
+        np.savez(
+            file,
+            rates=np.array(rates, dtype=np.float64),
+            offsets=np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+            rate=np.repeat(np.array(rates, dtype=np.float64), lengths),
+            **arrays,
+        )
+    os.replace(temporary_filename, filename)
+
+
+BALANCE_WRITERS: dict = {
+    "csv": _write_game_balance_columns_to_csv,
+    "npz": _write_game_balance_columns_to_npz,
+}
+
+
+def save_game_balances(
+    rate_balance_accumulator_dict: dict,
+    player_name: str,
+    roi: float,
+    balance_format: str = "csv",
+    writer: Optional[BackgroundWriter] = None,
+):
+    if balance_format not in BALANCE_WRITERS:
+        raise Exception(f"unknown game balances format {balance_format}")
+    # a snapshot, the next attempt merges into the accumulators while it is written
+    rate_columns = {
+        rate: balance_accumulator.columns()
+        for rate, balance_accumulator in rate_balance_accumulator_dict.items()
+    }
+    if writer is None:
+        BALANCE_WRITERS[balance_format](rate_columns, player_name, roi)
+        return
+    writer.submit(BALANCE_WRITERS[balance_format], rate_columns, player_name, roi)
+
+
+def _write_game_balances_tract_to_file(
+    rate_balance_accumulator_dict: dict, player_name: str, roi: float
+):
+    save_game_balances(rate_balance_accumulator_dict, player_name, roi)
+
+
+def _aggregate_rate_results(
+    rate_balance_accumulator_dict: dict,
+    rate_result_summary_dict: dict,
+    simulation_results: list,
+):
+    for win_rate, _result_summary, _balance_accumulator in simulation_results:
+        result_summary = rate_result_summary_dict.get(win_rate, ResultSummary())
+        rate_result_summary_dict[win_rate] = result_summary.merge(_result_summary)
+
+        balance_accumulator = rate_balance_accumulator_dict.get(
+            win_rate, BalanceAccumulator()
+        )
+        rate_balance_accumulator_dict[win_rate] = balance_accumulator.merge(
+            _balance_accumulator
+        )
 
 
 def simulate_and_save(
-    rate_index_balances_dict: dict,
-    rate_player_dict: dict,
+    rate_balance_accumulator_dict: dict,
+    rate_result_summary_dict: dict,
     simulation_with_player_func,
     roi: float,
     player_name: str,
+    metrics: Optional[AttemptMetrics] = None,
+    profile_directory: Optional[str] = None,
+    trajectory_store: Optional[TrajectoryStore] = None,
+    balance_format: str = "csv",
+    writer: Optional[BackgroundWriter] = None,
+    repetition: int = 1_000,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    executor: Optional[Executor] = None,
 ):
-    simulation_results = simulate_multiple_rates(simulation_with_player_func, roi)
-    for simulations in simulation_results:
-        for simulation in simulations:
-            _house, _player, _balances = simulation
-            win_rate = _house.win_rate
-            players = rate_player_dict.get(win_rate, [])
-            players.append(_player)
-            rate_player_dict[win_rate] = players
-
-            index_balances_dict = rate_index_balances_dict.get(win_rate, {})
-            for index, balance in enumerate(_balances):
-                index_balances = index_balances_dict.get(index, [])
-                index_balances.append(balance)
-                index_balances_dict[index] = index_balances
-            rate_index_balances_dict[win_rate] = index_balances_dict
-    _write_game_results_to_file(rate_player_dict, player_name, roi)
-    _write_game_balances_tract_to_file(rate_index_balances_dict, player_name, roi)
+    metrics = metrics if metrics is not None else AttemptMetrics()
+    with metrics.stage("simulate"):
+        simulation_results = simulate_multiple_rates(
+            simulation_with_player_func,
+            roi,
+            profile_directory,
+            trajectory_store,
+            metrics,
+            repetition,
+            root_seed,
+            attempt,
+            executor,
+        )
+    with metrics.stage("metrics"):
+        for simulation_result in simulation_results:
+            metrics.count_results(simulation_result[1])
+    with metrics.stage("aggregate"):
+        _aggregate_rate_results(
+            rate_balance_accumulator_dict, rate_result_summary_dict, simulation_results
+        )
+    with metrics.stage("write_results"):
+        write_game_results(rate_result_summary_dict, player_name, roi)
+    # with a writer this is only the snapshot, the file is written in the background
+    with metrics.stage("write_balances"):
+        save_game_balances(
+            rate_balance_accumulator_dict, player_name, roi, balance_format, writer
+        )
+
+
+def _simulate_and_save_attempt(
+    attempt: int,
+    rate_balance_accumulator_dict: dict,
+    rate_result_summary_dict: dict,
+    simulation_function,
+    roi: float,
+    player_name: str,
+    metrics_path: Optional[str],
+    profile_attempt: Optional[int],
+    balance_format: str = "csv",
+    writer: Optional[BackgroundWriter] = None,
+    root_seed: Optional[int] = None,
+    executor: Optional[Executor] = None,
+):
+    metrics = AttemptMetrics(attempt=attempt, player_name=player_name, roi=roi)
+    # profiles of the parent and of every rate simulated by the workers
+    profile_directory = (
+        os.path.join(
+            "profiles", f"attempt_{attempt}_{player_name.replace(' ', '_')}_roi_{roi}"
+        )
+        if attempt == profile_attempt
+        else None
+    )
+    with profiled(
+        os.path.join(profile_directory, "parent.prof") if profile_directory else None
+    ):
+        simulate_and_save(
+            rate_balance_accumulator_dict,
+            rate_result_summary_dict,
+            simulation_function,
+            roi,
+            player_name,
+            metrics,
+            profile_directory,
+            balance_format=balance_format,
+            writer=writer,
+            root_seed=root_seed,
+            attempt=attempt,
+            executor=executor,
+        )
+    metrics.emit(metrics_path)
+
+
+def _root_seed(root_seed: Optional[int]) -> int:
+    # every player's outcomes derive from this, see seed_sequence; printed so an
+    # unseeded sweep can be reproduced too
+    root_seed = root_seed if root_seed is not None else np.random.SeedSequence().entropy
+    print(f"Root seed {root_seed}")
+    return root_seed
 
 
 def run_multiple_rates_on_player_and_roi(
     _repetition: int,
-    _rate_index_balances_dict: dict,
-    _rate_player_dict: dict,
+    _rate_balance_accumulator_dict: dict,
+    _rate_result_summary_dict: dict,
     _simulation_function,
     _roi: float,
     _player_name: str,
+    metrics_path: Optional[str] = None,
+    profile_attempt: Optional[int] = None,
+    balance_format: str = "csv",
+    root_seed: Optional[int] = None,
 ):
-    for index in range(0, _repetition):
-        start_time: datetime = datetime.now()
-        attempt = index + 1
-        print(
-            f"Attempt {attempt} @ {start_time} on {_simulation_function.__name__} with roi {_roi} ..."
-        )
-        simulate_and_save(
-            _rate_index_balances_dict,
-            _rate_player_dict,
-            simulate_steady_one_player,
-            _roi,
-            _player_name,
-        )
-        end_time: datetime = datetime.now()
-        simulation_timedelta: timedelta = end_time - start_time
-        print(f"Attempt {attempt} took [{simulation_timedelta}] to complete")
+    root_seed = _root_seed(root_seed)
+    # game balances of one attempt are written while the next one simulates, and
+    # every attempt runs on the same pool
+    with ProcessPoolExecutor() as executor, BackgroundWriter() as writer:
+        for index in range(0, _repetition):
+            start_time: datetime = datetime.now()
+            attempt = index + 1
+            print(
+                f"Attempt {attempt} @ {start_time} on {_simulation_function.__name__} with roi {_roi} ..."
+            )
+            _simulate_and_save_attempt(
+                attempt,
+                _rate_balance_accumulator_dict,
+                _rate_result_summary_dict,
+                simulate_steady_one_player,
+                _roi,
+                _player_name,
+                metrics_path,
+                profile_attempt,
+                balance_format,
+                writer,
+                root_seed,
+                executor,
+            )
+            end_time: datetime = datetime.now()
+            simulation_timedelta: timedelta = end_time - start_time
+            print(f"Attempt {attempt} took [{simulation_timedelta}] to complete")
 
 
-def run_multiple_rates_on_players_and_rois():
+def run_multiple_rates_on_players_and_rois(
+    metrics_path: Optional[str] = None,
+    profile_attempt: Optional[int] = None,
+    balance_format: str = "csv",
+    root_seed: Optional[int] = None,
+):
     rois = [1, 2, 3]
     simulation_functions = [
         simulate_martingale_system_player,
@@ -449,56 +1076,76 @@ def run_multiple_rates_on_players_and_rois():
         simulate_martingale_stoploss_player: MartingaleSystemStopLossPlayer().name,
         simulate_steady_one_player: SteadyOnePlayer().name,
     }
-    simulation_func_roi_rate_player_dict = {}
-    simulation_func_roi_rate_index_balances_dict = {}
-    for index in range(0, 1_000_000):
-        for simulation_function in simulation_functions:
-            roi_rate_player_dict = simulation_func_roi_rate_player_dict.get(
-                simulation_function, {}
-            )
-            roi_rate_index_balances_dict = (
-                simulation_func_roi_rate_index_balances_dict.get(
-                    simulation_function, {}
-                )
-            )
-            player_name = player_names.get(simulation_function)
-            for roi in rois:
-                rate_player_dict = roi_rate_player_dict.get(roi, {})
-                rate_index_balances_dict = roi_rate_index_balances_dict.get(roi, {})
-                start_time: datetime = datetime.now()
-                attempt = index + 1
-                print(
-                    f"Attempt {attempt} @ {start_time} on {simulation_function.__name__} with roi {roi} ..."
+    simulation_func_roi_rate_result_summary_dict = {}
+    simulation_func_roi_rate_balance_accumulator_dict = {}
+    root_seed = _root_seed(root_seed)
+    # one pool for the whole sweep instead of one per (strategy, roi, attempt)
+    with ProcessPoolExecutor() as executor, BackgroundWriter() as writer:
+        for index in range(0, 1_000_000):
+            for simulation_function in simulation_functions:
+                roi_rate_result_summary_dict = (
+                    simulation_func_roi_rate_result_summary_dict.get(
+                        simulation_function, {}
+                    )
                 )
-                simulate_and_save(
-                    rate_index_balances_dict,
-                    rate_player_dict,
-                    simulation_function,
-                    roi,
-                    player_name,
+                roi_rate_balance_accumulator_dict = (
+                    simulation_func_roi_rate_balance_accumulator_dict.get(
+                        simulation_function, {}
+                    )
                 )
-                end_time: datetime = datetime.now()
-                simulation_timedelta: timedelta = end_time - start_time
-                print(f"Attempt {attempt} took [{simulation_timedelta}] to complete")
-                roi_rate_player_dict[roi] = rate_player_dict
-                roi_rate_index_balances_dict[roi] = rate_index_balances_dict
-            simulation_func_roi_rate_player_dict[
-                simulation_function
-            ] = roi_rate_player_dict
-            simulation_func_roi_rate_index_balances_dict[
-                simulation_function
-            ] = roi_rate_index_balances_dict
+                player_name = player_names.get(simulation_function)
+                for roi in rois:
+                    rate_result_summary_dict = roi_rate_result_summary_dict.get(roi, {})
+                    rate_balance_accumulator_dict = (
+                        roi_rate_balance_accumulator_dict.get(roi, {})
+                    )
+                    start_time: datetime = datetime.now()
+                    attempt = index + 1
+                    print(
+                        f"Attempt {attempt} @ {start_time} on {simulation_function.__name__} with roi {roi} ..."
+                    )
+                    _simulate_and_save_attempt(
+                        attempt,
+                        rate_balance_accumulator_dict,
+                        rate_result_summary_dict,
+                        simulation_function,
+                        roi,
+                        player_name,
+                        metrics_path,
+                        profile_attempt,
+                        balance_format,
+                        writer,
+                        root_seed,
+                        executor,
+                    )
+                    end_time: datetime = datetime.now()
+                    simulation_timedelta: timedelta = end_time - start_time
+                    print(
+                        f"Attempt {attempt} took [{simulation_timedelta}] to complete"
+                    )
+                    roi_rate_result_summary_dict[roi] = rate_result_summary_dict
+                    roi_rate_balance_accumulator_dict[roi] = (
+                        rate_balance_accumulator_dict
+                    )
+                simulation_func_roi_rate_result_summary_dict[
+                    simulation_function
+                ] = roi_rate_result_summary_dict
+                simulation_func_roi_rate_balance_accumulator_dict[
+                    simulation_function
+                ] = roi_rate_balance_accumulator_dict
 
 
 if __name__ == "__main__":
-    run_multiple_rates_on_players_and_rois()
+    run_multiple_rates_on_players_and_rois(
+        metrics_path=os.path.join("metrics", "simulation_metrics.jsonl")
+    )
 
-    # rate_player_dict: dict = {}
+    # rate_result_summary_dict: dict = {}
     # roi = 1
     # player_name = SteadyOnePlayer().name
     # simulation_function = simulate_steady_one_player
     # run_multiple_rates_on_player_and_roi(
-    #     1_000_000, rate_player_dict, simulation_function, roi, player_name
+    #     1_000_000, rate_result_summary_dict, simulation_function, roi, player_name
     # )
 
     # deltas = []
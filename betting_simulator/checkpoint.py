@@ -0,0 +1,46 @@
+import os
+import pickle
+from typing import Optional
+
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(
+    path: str,
+    root_seed: int,
+    completed_attempts: dict,
+    rate_result_summary_dicts: dict,
+    rate_balance_accumulator_dicts: dict,
+    config: Optional[dict] = None,
+) -> None:
+    state = {
+        "version": CHECKPOINT_VERSION,
+        # what the sweep was run with, a run only resumes or merges on the same
+        "config": config,
+        "root_seed": root_seed,
+        "completed_attempts": completed_attempts,
+        "rate_result_summaries": rate_result_summary_dicts,
+        "rate_balance_accumulators": rate_balance_accumulator_dicts,
+    }
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    # never leave a half written checkpoint behind if the run dies mid-write
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: str):
+    with open(path, "rb") as file:
+        state = pickle.load(file)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise Exception(f"unsupported checkpoint version {state.get('version')}")
+    return (
+        state["root_seed"],
+        state["completed_attempts"],
+        state["rate_result_summaries"],
+        state["rate_balance_accumulators"],
+        state["config"],
+    )
@@ -0,0 +1,202 @@
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from betting_simulator.aggregates import BalanceAccumulator, ResultSummary
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    SteadyOnePlayer,
+    common_seed_sequence,
+)
+from betting_simulator.lockstep import LockstepPlayers
+from betting_simulator.strategy import StrategySpec
+
+
+class GridCell(NamedTuple):
+    win_rate: float
+    tie_rate: float
+    roi: float
+    strategy: str
+    budget: float
+
+
+class GridResult(NamedTuple):
+    result_summary: ResultSummary
+    balance_accumulator: Optional[BalanceAccumulator]
+
+
+def _strategy_name(strategy) -> str:
+    return strategy.name if isinstance(strategy, StrategySpec) else strategy().name
+
+
+def _balance_accumulator(game_size: int) -> BalanceAccumulator:
+    balance_accumulator = BalanceAccumulator()
+    balance_accumulator.use_grid(None, game_size)
+    return balance_accumulator
+
+
+def _observe(
+    balance_accumulator: BalanceAccumulator,
+    index: int,
+    _ids: np.ndarray,
+    balances: np.ndarray,
+) -> None:
+    balance_accumulator.add(index, balances)
+
+
+def simulate_outcome_cell(
+    win_rate: float,
+    tie_rate: float,
+    rois: list,
+    strategies: list,
+    budgets: list,
+    players: int = 1_000,
+    game_size: int = 1_000_000,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    track_balances: bool = True,
+    block_size: int = 4_096,
+) -> dict:
+    # one outcome stream per player of the (win rate, tie rate) cell, every
+    # (roi, strategy, budget) engine replays the same drawn block of it
+    houses = [
+        House(
+            win_rate,
+            tie_rate,
+            1,
+            rng=(
+                np.random.default_rng(
+                    common_seed_sequence(
+                        root_seed, win_rate, tie_rate, attempt, first_player + i
+                    )
+                )
+                if root_seed is not None
+                else None
+            ),
+            block_size=block_size,
+        )
+        for i in range(0, players)
+    ]
+    engines = {}
+    observers = {}
+    for roi, strategy, budget in itertools.product(rois, strategies, budgets):
+        cell = GridCell(win_rate, tie_rate, roi, _strategy_name(strategy), budget)
+        # the engine only reads the configuration, outcomes come from the block
+        house = House(win_rate, tie_rate, roi, block_size=1)
+        engines[cell] = LockstepPlayers(strategy, [house] * players, budget)
+        observers[cell] = (
+            partial(_observe, _balance_accumulator(game_size))
+            if track_balances
+            else None
+        )
+    played = 0
+    while played < game_size:
+        active = [engine.ids for engine in engines.values() if len(engine.ids)]
+        if not active:
+            break
+        n = min(block_size, game_size - played)
+        # players broke in every engine need no more outcomes
+        ids = np.unique(np.concatenate(active))
+        codes = np.zeros((n, players), dtype=np.int8)
+        codes[:, ids] = np.stack([houses[i].outcomes(n) for i in ids], axis=1)
+        for cell, engine in engines.items():
+            engine.run_codes(codes, observers[cell])
+        played += n
+    results = {}
+    for cell, engine in engines.items():
+        engine.finish()
+        results[cell] = GridResult(
+            ResultSummary().add([player.result() for player in engine.to_players()]),
+            observers[cell].args[0] if observers[cell] is not None else None,
+        )
+    return results
+
+
+def grid_sweep(
+    win_rates: list,
+    tie_rates: Optional[list] = None,
+    rois: Optional[list] = None,
+    strategies: Optional[list] = None,
+    budgets: Optional[list] = None,
+    players: int = 1_000,
+    game_size: int = 1_000_000,
+    root_seed: Optional[int] = None,
+    track_balances: bool = True,
+    workers: Optional[int] = None,
+) -> dict:
+    # win_rate x tie_rate x roi x strategy x budget, strategies are Player classes
+    # with a spec or StrategySpecs; within a (win rate, tie rate) cell every
+    # strategy, roi and budget sees the same games
+    simulate = partial(
+        simulate_outcome_cell,
+        rois=rois or [1, 2, 3],
+        strategies=strategies
+        or [SteadyOnePlayer, MartingaleSystemPlayer, MartingaleSystemStopLossPlayer],
+        budgets=budgets or [1_000_000],
+        players=players,
+        game_size=game_size,
+        root_seed=root_seed,
+        track_balances=track_balances,
+    )
+    outcome_cells = list(itertools.product(win_rates, tie_rates or [0]))
+    results = {}
+    if workers == 1:
+        for win_rate, tie_rate in outcome_cells:
+            results.update(simulate(win_rate, tie_rate))
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for cell_results in executor.map(
+            simulate,
+            [win_rate for win_rate, _ in outcome_cells],
+            [tie_rate for _, tie_rate in outcome_cells],
+        ):
+            results.update(cell_results)
+    return results
+
+
+def write_grid_results(results: dict, path: str) -> None:
+    headers = list(GridCell._fields) + [
+        "sample_size",
+        "mvdd_mean",
+        "mvdd_std",
+        "mvdd_mean_ci",
+        "pnl_mean",
+        "pnl_std",
+        "pnl_mean_ci",
+        "double_balance_game_length_mean",
+        "double_balance_game_length_count",
+    ]
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, "w") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=headers)
+        writer.writeheader()
+        for cell in sorted(results):
+            result_summary = results[cell].result_summary
+            writer.writerow(
+                {
+                    **cell._asdict(),
+                    "sample_size": result_summary.sample_size,
+                    "mvdd_mean": round(result_summary.mvdd.mean, 4),
+                    "mvdd_std": round(result_summary.mvdd.std(), 4),
+                    "mvdd_mean_ci": round(result_summary.mvdd.confidence_interval(), 4),
+                    "pnl_mean": round(result_summary.pnl.mean, 4),
+                    "pnl_std": round(result_summary.pnl.std(), 4),
+                    "pnl_mean_ci": round(result_summary.pnl.confidence_interval(), 4),
+                    "double_balance_game_length_mean": round(
+                        result_summary.double_balance_game_length.mean, 4
+                    ),
+                    "double_balance_game_length_count": (
+                        result_summary.double_balance_game_length.count
+                    ),
+                }
+            )
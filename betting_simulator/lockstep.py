@@ -0,0 +1,424 @@
+from functools import partial
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    Player,
+    SteadyOnePlayer,
+    player_rngs,
+)
+from betting_simulator.strategy import (
+    SpecPlayer,
+    StrategyKernel,
+    StrategySpec,
+    spec_of,
+)
+from betting_simulator.trajectory import (
+    EVENTS,
+    OFF,
+    GridObserver,
+    Recording,
+    Trajectory,
+)
+
+# (index, player ids, balances) of every player that played the given game index
+BalanceObserver = Callable[[int, np.ndarray, np.ndarray], None]
+
+
+class LockstepPlayers:
+    # per-player state, mirrored from Player attributes
+    FLOAT_FIELDS = [
+        "balance",
+        "target_balance",
+        "last_bet",
+        "max_bet",
+        "cumulative_bet",
+        "initial_bet",
+        "max_value",
+        "max_value_draw_down_pcnt",
+    ]
+    INT_FIELDS = [
+        "last_double_balanced_game",
+        "win",
+        "tie",
+        "loss",
+        "losing_streak",
+        "max_losing_streak",
+        "games_played",
+    ]
+    BOOL_FIELDS = ["lost_last_game"]
+
+    def __init__(
+        self,
+        strategy: Union[type, StrategySpec],
+        houses: list,
+        budget: float = 1_000_000,
+        block_size: int = 4_096,
+    ) -> None:
+        # a Player subclass runs on the spec it is equivalent to
+        if isinstance(strategy, StrategySpec):
+            self.player_class = partial(SpecPlayer, strategy)
+        else:
+            self.player_class = strategy
+            strategy = spec_of(strategy)
+        self.kernel: StrategyKernel = StrategyKernel(strategy)
+        house: House = houses[0]
+        for h in houses:
+            if (h.win_rate, h.tie_rate, h.return_on_investment) != (
+                house.win_rate,
+                house.tie_rate,
+                house.return_on_investment,
+            ):
+                raise Exception("lockstep players must share one house configuration")
+        self.houses: list = houses
+        self.size: int = len(houses)
+        self.initial_budget: float = budget
+        self.roi: float = house.return_on_investment
+        self._multipliers: np.ndarray = house.payout_multipliers()
+        self._block_size: int = block_size
+        self._broke_threshold: float = self.kernel.broke_threshold(budget)
+        self.double_balance_game_lengths: list = [[] for _ in range(0, self.size)]
+
+        # results of every player, written when a player leaves the active set
+        self.final: dict = {}
+        for field in LockstepPlayers.FLOAT_FIELDS:
+            self.final[field] = np.zeros(self.size, dtype=np.float64)
+        for field in LockstepPlayers.INT_FIELDS:
+            self.final[field] = np.zeros(self.size, dtype=np.int64)
+        for field in LockstepPlayers.BOOL_FIELDS:
+            self.final[field] = np.zeros(self.size, dtype=bool)
+
+        # working state of the players still in play, compacted as players go broke
+        self.ids: np.ndarray = np.arange(self.size)
+        self.state: dict = {k: v.copy() for k, v in self.final.items()}
+        self.state["balance"][:] = budget
+        self.state["target_balance"][:] = budget * 2
+        self.state["max_value"][:] = budget
+        self.games_played: int = 0
+        self._codes: np.ndarray = np.empty((0, self.size), dtype=np.int8)
+        self._cursor: int = 0
+
+    def run(
+        self, game_size: int, observer: Optional[BalanceObserver] = None
+    ) -> "LockstepPlayers":
+        self._observe_start(observer)
+        for _ in range(0, game_size):
+            if len(self.ids) == 0:
+                break
+            self._advance(self._next_codes(), observer)
+        return self.finish()
+
+    def run_codes(
+        self, codes: np.ndarray, observer: Optional[BalanceObserver] = None
+    ) -> "LockstepPlayers":
+        # codes[game, player] of every player of the engine, drawn by the caller so
+        # one block of outcomes can be replayed by many engines; call finish() after
+        # the last block
+        self._observe_start(observer)
+        for row in codes:
+            if len(self.ids) == 0:
+                break
+            self._advance(row[self.ids], observer)
+        return self
+
+    def finish(self) -> "LockstepPlayers":
+        self._retire(np.ones(len(self.ids), dtype=bool))
+        return self
+
+    def _observe_start(self, observer: Optional[BalanceObserver]) -> None:
+        if observer is not None and self.games_played == 0:
+            observer(0, self.ids, self.state["balance"])
+
+    def _advance(self, codes: np.ndarray, observer: Optional[BalanceObserver]) -> None:
+        broke = self.step(codes)
+        if observer is not None:
+            observer(self.games_played, self.ids, self.state["balance"])
+        if broke.any():
+            self._retire(broke)
+
+    def step(self, codes: np.ndarray) -> np.ndarray:
+        s = self.state
+        balance = s["balance"]
+
+        # Player.bet
+        bet = self.kernel.bet(s, self.roi)
+
+        # House.play
+        result = bet * self._multipliers[codes]
+
+        won = result > bet
+        tied = result == bet
+        lost = ~(won | tied)
+        s["win"] += won
+        s["tie"] += tied
+        s["loss"] += lost
+        self.kernel.won(s, won)
+        s["losing_streak"] += lost
+        np.maximum(
+            s["max_losing_streak"], s["losing_streak"], out=s["max_losing_streak"]
+        )
+        s["lost_last_game"] |= lost
+        balance += result
+
+        # draw down calculation
+        np.maximum(s["max_value"], balance, out=s["max_value"])
+        draw_down_pcnt = ((balance / s["max_value"]) - 1) * 100
+        np.minimum(
+            draw_down_pcnt,
+            s["max_value_draw_down_pcnt"],
+            out=s["max_value_draw_down_pcnt"],
+        )
+        # game count
+        self.games_played += 1
+        s["games_played"] += 1
+        # break double game count tracker
+        doubled = np.flatnonzero(balance >= s["target_balance"])
+        for i in doubled:
+            self.double_balance_game_lengths[self.ids[i]].append(
+                self.games_played - int(s["last_double_balanced_game"][i])
+            )
+        s["target_balance"][doubled] *= 2
+        s["last_double_balanced_game"][doubled] = self.games_played
+
+        return balance <= self._broke_threshold
+
+    def _next_codes(self) -> np.ndarray:
+        if self._cursor >= len(self._codes):
+            self._codes = np.stack(
+                [self.houses[i].outcomes(self._block_size) for i in self.ids], axis=1
+            )
+            self._cursor = 0
+        codes = self._codes[self._cursor]
+        self._cursor += 1
+        return codes
+
+    def _retire(self, leaving: np.ndarray) -> None:
+        ids = self.ids[leaving]
+        for field, values in self.state.items():
+            self.final[field][ids] = values[leaving]
+        staying = ~leaving
+        self.ids = self.ids[staying]
+        self.state = {k: v[staying] for k, v in self.state.items()}
+        self._codes = self._codes[:, staying]
+
+    def to_players(self) -> list:
+        players = []
+        for i in range(0, self.size):
+            player: Player = self.player_class(budget=self.initial_budget)
+            for field, values in self.final.items():
+                setattr(player, field, values[i].item())
+            player.double_balance_game_lengths = self.double_balance_game_lengths[i]
+            players.append(player)
+        return players
+
+
+def simulate_lockstep(
+    strategy: Union[type, StrategySpec],
+    houses: list,
+    game_size: int,
+    budget: float = 1_000_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    recording: Optional[Recording] = None,
+):
+    # same (house, player, balances) results as simulate_games on every player
+    grid = None
+    if recording is not None:
+        if recording.mode == EVENTS:
+            raise Exception("event trajectories are only recorded by simulate_games")
+        grid = recording.grid(game_size)
+        if recording.mode == OFF:
+            engine = LockstepPlayers(strategy, houses, budget).run(game_size)
+            return [
+                (house, player, None)
+                for house, player in zip(houses, engine.to_players())
+            ]
+
+    if balance_accumulator is not None:
+        balance_accumulator.use_grid(grid, game_size)
+
+        def observer(index: int, _ids: np.ndarray, balances: np.ndarray):
+            balance_accumulator.add(index, balances)
+
+        engine = LockstepPlayers(strategy, houses, budget).run(
+            game_size, observer if grid is None else GridObserver(grid, observer)
+        )
+        return [
+            (house, player, None) for house, player in zip(houses, engine.to_players())
+        ]
+
+    steps = []
+
+    def _record(_index: int, ids: np.ndarray, balances: np.ndarray):
+        steps.append((ids, balances.copy()))
+
+    engine = LockstepPlayers(strategy, houses, budget).run(
+        game_size, _record if grid is None else GridObserver(grid, _record)
+    )
+    trajectories = np.full((len(steps), engine.size), np.nan)
+    for index, (ids, balances) in enumerate(steps):
+        trajectories[index, ids] = balances
+    games_played = engine.final["games_played"]
+    if grid is None:
+        return [
+            (house, player, trajectories[: games_played[i] + 1, i].tolist())
+            for i, (house, player) in enumerate(zip(houses, engine.to_players()))
+        ]
+    # grid points reached by every player
+    reached = np.searchsorted(grid, games_played, side="right")
+    return [
+        (
+            house,
+            player,
+            Trajectory(grid[: reached[i]], trajectories[: reached[i], i].copy()),
+        )
+        for i, (house, player) in enumerate(zip(houses, engine.to_players()))
+    ]
+
+
+def _simulate_players(
+    strategy: Union[type, StrategySpec],
+    win_rate: float,
+    tie_rate: float,
+    roi: float,
+    game_size: int,
+    repetition: int,
+    balance_accumulator: Optional[BalanceAccumulator],
+    root_seed: Optional[int],
+    attempt: int,
+    first_player: int,
+    recording: Optional[Recording] = None,
+):
+    rngs = player_rngs(
+        root_seed,
+        strategy.name if isinstance(strategy, StrategySpec) else strategy().name,
+        roi,
+        win_rate,
+        attempt,
+        first_player,
+        repetition,
+    )
+    houses = [
+        House(win_rate=win_rate, tie_rate=tie_rate, return_on_investment=roi, rng=rng)
+        for rng in rngs
+    ]
+    return simulate_lockstep(
+        strategy,
+        houses,
+        game_size,
+        balance_accumulator=balance_accumulator,
+        recording=recording,
+    )
+
+
+def simulate_martingale_system_player(
+    win_rate: float = 0.5,
+    tie_rate: float = 0,
+    roi: float = 1,
+    game_size: int = 1_000_000,
+    repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
+):
+    return _simulate_players(
+        MartingaleSystemPlayer,
+        win_rate,
+        tie_rate,
+        roi,
+        game_size,
+        repetition,
+        balance_accumulator,
+        root_seed,
+        attempt,
+        first_player,
+        recording,
+    )
+
+
+def simulate_martingale_stoploss_player(
+    win_rate: float = 0.5,
+    tie_rate: float = 0,
+    roi: float = 1,
+    game_size: int = 1_000_000,
+    repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
+):
+    return _simulate_players(
+        MartingaleSystemStopLossPlayer,
+        win_rate,
+        tie_rate,
+        roi,
+        game_size,
+        repetition,
+        balance_accumulator,
+        root_seed,
+        attempt,
+        first_player,
+        recording,
+    )
+
+
+def simulate_steady_one_player(
+    win_rate: float = 0.5,
+    tie_rate: float = 0,
+    roi: float = 1,
+    game_size: int = 1_000_000,
+    repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
+):
+    return _simulate_players(
+        SteadyOnePlayer,
+        win_rate,
+        tie_rate,
+        roi,
+        game_size,
+        repetition,
+        balance_accumulator,
+        root_seed,
+        attempt,
+        first_player,
+        recording,
+    )
+
+
+def simulate_strategy(
+    spec: StrategySpec,
+    win_rate: float = 0.5,
+    tie_rate: float = 0,
+    roi: float = 1,
+    game_size: int = 1_000_000,
+    repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
+):
+    return _simulate_players(
+        spec,
+        win_rate,
+        tie_rate,
+        roi,
+        game_size,
+        repetition,
+        balance_accumulator,
+        root_seed,
+        attempt,
+        first_player,
+        recording,
+    )
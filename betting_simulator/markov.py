@@ -0,0 +1,192 @@
+import copy
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from betting_simulator.casino import House, MartingaleSystemPlayer, Player
+
+
+class Excursion(NamedTuple):
+    # games are played until the first win (back to a fresh bet) or until broke
+    losses: np.ndarray  # losses before the winning game of each exit
+    balances: np.ndarray  # balance right after the winning game
+    probabilities: np.ndarray
+    ruin_losses: int  # losses that break the player if no win comes first
+    ruin_probability: float
+
+
+class MarkovEngine:
+    # Absorbing chain over log-spaced balances between broke and doubled, one
+    # transition per excursion. Every excursion is replayed with the real Player
+    # bet rules; balances that fall between grid points are split log-linearly.
+    # A tie gives a flat bet back and leaves the player where it was, so the chain
+    # runs on decided games and every one takes 1 / (1 - tie) games. Progressions
+    # keep the tied bet in cumulative_bet and raise the next one, those are not.
+    def __init__(
+        self,
+        player_class: type,
+        house: House,
+        budget: float = 1_000_000,
+        grid_steps_per_percent: int = 4,
+    ) -> None:
+        tie_probability = (house._tie_range - house._win_range) / House.MILLION
+        if tie_probability >= 1:
+            raise Exception("a house that only ties never decides a game")
+        if tie_probability and issubclass(player_class, MartingaleSystemPlayer):
+            raise Exception(
+                "ties keep their bet in cumulative_bet, only flat bets are modelled with ties"
+            )
+        self.player_class: type = player_class
+        self.house: House = house
+        self.budget: float = budget
+        # of the decided games
+        self.win_probability: float = (
+            house._win_range / House.MILLION / (1 - tie_probability)
+        )
+        self.loss_probability: float = 1 - self.win_probability
+        self.games_per_decision: float = 1 / (1 - tie_probability)
+        self._always_win: House = House(1, 0, house.return_on_investment, block_size=1)
+        self._always_lose: House = House(0, 0, house.return_on_investment, block_size=1)
+        self._grid_step: float = math.log(1.01) / grid_steps_per_percent
+        self.target_balance: float = budget * 2
+        lowest = self._lowest_balance()
+        # grid index 0 is the budget itself
+        self._low: int = math.ceil(math.log(lowest / budget) / self._grid_step)
+        self._high: int = math.ceil(
+            math.log(self.target_balance / budget) / self._grid_step
+        )
+        self.balances: np.ndarray = budget * np.exp(
+            np.arange(self._low, self._high) * self._grid_step
+        )
+
+    def _start(self, balance: float) -> Player:
+        player: Player = self.player_class(budget=self.budget)
+        player.balance = balance
+        player.max_value = balance
+        # keep the double balance tracker quiet while replaying
+        player.target_balance = math.inf
+        return player
+
+    def _lowest_balance(self) -> float:
+        # smallest balance a player that is not broke can hold
+        low, high = 0, self.budget
+        for _ in range(0, 60):
+            middle = (low + high) / 2
+            if self._start(middle).is_broke():
+                low = middle
+            else:
+                high = middle
+        return high
+
+    def excursion(self, balance: float) -> Excursion:
+        player = self._start(balance)
+        losses, balances, probabilities = [], [], []
+        reach = 1.0
+        while True:
+            won = copy.copy(player)
+            won.play(self._always_win)
+            losses.append(player.losing_streak)
+            balances.append(won.balance)
+            probabilities.append(reach * self.win_probability)
+            player.play(self._always_lose)
+            reach *= self.loss_probability
+            if player.is_broke() or reach == 0:
+                break
+        return Excursion(
+            np.array(losses),
+            np.array(balances),
+            np.array(probabilities),
+            player.losing_streak,
+            reach,
+        )
+
+    def _locate(self, balances: np.ndarray):
+        # lower grid neighbour and upper weight of each balance, grid index len(balances)
+        # stands for doubled
+        position = np.log(balances / self.budget) / self._grid_step - self._low
+        position = np.clip(position, 0, len(self.balances))
+        lower = np.minimum(np.floor(position).astype(np.int64), len(self.balances) - 1)
+        return lower, position - lower
+
+    def solve(self) -> dict:
+        size = len(self.balances)
+        # the extra last column is the doubled state
+        transitions = np.zeros((size, size + 1))
+        ruined = np.zeros(size)
+        games = np.zeros(size)
+        excursions = [self.excursion(b) for b in self.balances]
+        exits = []
+        for i, excursion in enumerate(excursions):
+            lower, upper_weight = self._locate(excursion.balances)
+            probabilities = excursion.probabilities
+            np.add.at(transitions[i], lower, probabilities * (1 - upper_weight))
+            np.add.at(transitions[i], lower + 1, probabilities * upper_weight)
+            ruined[i] = excursion.ruin_probability
+            games[i] = (
+                np.sum(probabilities * (excursion.losses + 1))
+                + excursion.ruin_probability * excursion.ruin_losses
+            )
+            exits.append((lower, upper_weight))
+        fundamental = np.eye(size) - transitions[:, :size]
+        doubling_probability = np.linalg.solve(fundamental, transitions[:, size])
+        ruin_probability = np.linalg.solve(fundamental, ruined)
+        expected_games = np.linalg.solve(fundamental, games)
+        # games spent on paths that end doubled, E[T; doubled]
+        onward_probability = np.append(doubling_probability, 1)
+        doubled_games = np.zeros(size)
+        for i, (excursion, (lower, upper_weight)) in enumerate(zip(excursions, exits)):
+            onward = (
+                onward_probability[lower] * (1 - upper_weight)
+                + onward_probability[lower + 1] * upper_weight
+            )
+            doubled_games[i] = np.sum(
+                excursion.probabilities * (excursion.losses + 1) * onward
+            )
+        doubled_games = np.linalg.solve(fundamental, doubled_games)
+        start = -self._low
+        return {
+            "ruin_probability": float(ruin_probability[start]),
+            "doubling_probability": float(doubling_probability[start]),
+            "expected_games": float(expected_games[start] * self.games_per_decision),
+            "expected_games_until_doubling": (
+                float(
+                    doubled_games[start]
+                    / doubling_probability[start]
+                    * self.games_per_decision
+                )
+                if doubling_probability[start]
+                else math.inf
+            ),
+        }
+
+    def losing_streak_distribution(self, balance: float = 0) -> dict:
+        # losses before the next win of one excursion, from a fresh bet
+        excursion = self.excursion(balance or self.budget)
+        distribution = dict(
+            zip(excursion.losses.tolist(), excursion.probabilities.tolist())
+        )
+        distribution["broke"] = excursion.ruin_probability
+        return distribution
+
+
+def max_losing_streak_distribution(
+    house: House, games: int, max_streak: int = 64
+) -> np.ndarray:
+    # P(max losing streak == k) over `games` games for k < max_streak, the last
+    # entry holds the tail; a tie neither extends nor resets a streak
+    win = house._win_range / House.MILLION
+    tie = (house._tie_range - house._win_range) / House.MILLION
+    loss = 1 - win - tie
+    below = np.zeros(max_streak + 1)
+    for streak in range(1, max_streak + 1):
+        # run length chain that is cut off once a streak reaches `streak`
+        chain = np.zeros((streak, streak))
+        chain[:, 0] += win
+        chain[np.arange(streak), np.arange(streak)] += tie
+        chain[np.arange(streak - 1), np.arange(1, streak)] += loss
+        start = np.zeros(streak)
+        start[0] = 1
+        below[streak] = start @ np.linalg.matrix_power(chain, games) @ np.ones(streak)
+    distribution = np.diff(below)
+    return np.append(distribution, 1 - below[-1])
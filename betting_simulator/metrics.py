@@ -0,0 +1,122 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not on windows
+    resource = None
+
+
+def peak_rss() -> int:
+    # peak bytes of this process so far
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # linux reports kilobytes, macos bytes
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def payload_bytes(obj) -> int:
+    # roughly what `obj` costs to send between processes: the bytes of its numpy
+    # arrays, which are most of it, and 8 per other value, without pickling it twice
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(payload_bytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(payload_bytes(value) for value in obj)
+    if hasattr(obj, "__dict__"):
+        return payload_bytes(vars(obj))
+    return 8
+
+
+@contextmanager
+def profiled(path: Optional[str]):
+    if not path:
+        yield
+        return
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+
+class AttemptMetrics:
+    # wall/cpu per stage and counters of one attempt, one JSON line when emitted
+    def __init__(self, **labels) -> None:
+        self.labels: dict = labels
+        self.stages: dict = {}
+        self.counters: dict = {
+            "games_simulated": 0,
+            "players": 0,
+            "players_broke_early": 0,
+            "bytes_from_workers": 0,
+        }
+        self.peaks: dict = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield self
+        finally:
+            self.add_stage(
+                name,
+                time.perf_counter() - start_wall,
+                time.process_time() - start_cpu,
+            )
+
+    def add_stage(self, name: str, wall: float, cpu: float) -> None:
+        stage = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+        stage["wall"] += wall
+        stage["cpu"] += cpu
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name: str, value: int) -> None:
+        self.peaks[name] = max(self.peaks.get(name, 0), value)
+
+    def count_results(self, result_summary) -> None:
+        self.count("games_simulated", result_summary.games_played)
+        self.count("players", result_summary.sample_size)
+        self.count("players_broke_early", result_summary.broke)
+
+    def record(self) -> dict:
+        self.peak("peak_rss_bytes", peak_rss())
+        return {
+            **self.labels,
+            "time": datetime.now().isoformat(),
+            "stages": {
+                name: {"wall": round(stage["wall"], 6), "cpu": round(stage["cpu"], 6)}
+                for name, stage in self.stages.items()
+            },
+            **self.counters,
+            **self.peaks,
+        }
+
+    def emit(self, path: Optional[str]) -> dict:
+        record = self.record()
+        if not path:
+            return record
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+        return record
@@ -0,0 +1,598 @@
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from betting_simulator import lockstep
+from betting_simulator.aggregates import BalanceAccumulator, ResultSummary
+from betting_simulator.checkpoint import load_checkpoint, save_checkpoint
+from betting_simulator.metrics import AttemptMetrics, payload_bytes, profiled
+from betting_simulator.trajectory import Recording
+from betting_simulator.writer import BackgroundWriter
+from betting_simulator.casino import (
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    SteadyOnePlayer,
+    save_game_balances,
+    write_game_results,
+)
+
+SIMULATION_FUNCTIONS: dict = {
+    MartingaleSystemPlayer().name: lockstep.simulate_martingale_system_player,
+    MartingaleSystemStopLossPlayer().name: lockstep.simulate_martingale_stoploss_player,
+    SteadyOnePlayer().name: lockstep.simulate_steady_one_player,
+}
+
+WIN_RATES: list = [0.5 + (0.01 * x) for x in range(0, 30)]
+
+
+class SweepTask(NamedTuple):
+    attempt: int
+    player_name: str
+    roi: float
+    win_rate: float
+    first_player: int
+    players: int
+
+
+class TaskResult(NamedTuple):
+    task: SweepTask
+    result_summary: ResultSummary
+    balance_accumulator: BalanceAccumulator
+    pid: int
+    wall_time: float
+    cpu_time: float
+    # size of the summary and accumulator, estimated where they were built
+    payload_bytes: int
+
+
+def _run_task(
+    task: SweepTask,
+    game_size: int,
+    root_seed: int,
+    profile_directory: Optional[str] = None,
+    recording: Optional[Recording] = None,
+) -> TaskResult:
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    balance_accumulator = BalanceAccumulator()
+    with profiled(
+        os.path.join(
+            profile_directory,
+            f"{task.player_name.replace(' ', '_')}_roi_{task.roi}_rate_{round(task.win_rate, 4)}_player_{task.first_player}.prof",
+        )
+        if profile_directory
+        else None
+    ):
+        simulations = SIMULATION_FUNCTIONS[task.player_name](
+            task.win_rate,
+            roi=task.roi,
+            game_size=game_size,
+            repetition=task.players,
+            balance_accumulator=balance_accumulator,
+            root_seed=root_seed,
+            attempt=task.attempt,
+            first_player=task.first_player,
+            recording=recording,
+        )
+    result_summary = ResultSummary().add(
+        [player.result() for _house, player, _balances in simulations]
+    )
+    return TaskResult(
+        task,
+        result_summary,
+        balance_accumulator,
+        os.getpid(),
+        time.perf_counter() - start_wall,
+        time.process_time() - start_cpu,
+        payload_bytes((result_summary, balance_accumulator)),
+    )
+
+
+class PoolStats:
+    def __init__(self, workers: int) -> None:
+        self.workers: int = workers
+        self.start: float = time.perf_counter()
+        self.tasks: int = 0
+        self.busy_time: dict = {}
+        self.cpu_time: dict = {}
+
+    def record(self, task_result: TaskResult) -> None:
+        self.tasks += 1
+        pid = task_result.pid
+        self.busy_time[pid] = self.busy_time.get(pid, 0) + task_result.wall_time
+        self.cpu_time[pid] = self.cpu_time.get(pid, 0) + task_result.cpu_time
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self.start
+        utilization = {
+            pid: round(cpu / elapsed * 100, 2) for pid, cpu in self.cpu_time.items()
+        }
+        return {
+            "tasks": self.tasks,
+            "elapsed": round(elapsed, 2),
+            "tasks_per_sec": round(self.tasks / elapsed, 4) if elapsed else 0,
+            "utilization": utilization,
+            "mean_utilization": (
+                round(sum(self.cpu_time.values()) / (elapsed * self.workers) * 100, 2)
+                if elapsed
+                else 0
+            ),
+        }
+
+
+class SweepScheduler:
+    # one long-lived pool for every (strategy, roi, win_rate, player chunk) cell of the sweep
+    def __init__(
+        self,
+        player_names: Optional[list] = None,
+        rois: Optional[list] = None,
+        win_rates: Optional[list] = None,
+        players_per_rate: int = 10_000,
+        players_per_task: int = 250,
+        game_size: int = 1_000_000,
+        workers: Optional[int] = None,
+        tasks_in_flight: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_every: int = 10,
+        root_seed: Optional[int] = None,
+        metrics_path: Optional[str] = None,
+        profile_attempt: Optional[int] = None,
+        profile_directory: str = "profiles",
+        recording: Optional[Recording] = None,
+        balance_format: str = "csv",
+    ) -> None:
+        self.player_names: list = player_names or list(SIMULATION_FUNCTIONS)
+        self.rois: list = rois or [1, 2, 3]
+        self.win_rates: list = win_rates or WIN_RATES
+        self.players_per_rate: int = players_per_rate
+        self.players_per_task: int = players_per_task
+        self.game_size: int = game_size
+        self.workers: int = workers or os.cpu_count() or 1
+        # enough queued work that the pool never drains while the parent writes
+        self.tasks_in_flight: int = tasks_in_flight or self.workers * 4
+        self.checkpoint_path: Optional[str] = checkpoint_path
+        self.checkpoint_every: int = checkpoint_every
+        # every player's outcomes derive from this, see casino.seed_sequence
+        self.root_seed: int = (
+            root_seed if root_seed is not None else np.random.SeedSequence().entropy
+        )
+        # last attempt folded into the running totals, per (player name, roi)
+        self.completed_attempts: dict = {}
+        self.rate_result_summary_dicts: dict = {}
+        self.rate_balance_accumulator_dicts: dict = {}
+        self.stats: PoolStats = PoolStats(self.workers)
+        self._checkpointed_attempt: int = 0
+        # one JSON line per (attempt, player name, roi) once it is saved
+        self.metrics_path: Optional[str] = metrics_path
+        # tasks of this attempt run under cProfile, one stats file per task
+        self.profile_attempt: Optional[int] = profile_attempt
+        self.profile_directory: str = profile_directory
+        # which balances feed the game balances CSVs, every game when None
+        self.recording: Optional[Recording] = recording
+        # "csv" per rate or one "npz" per (player name, roi), see casino.BALANCE_WRITERS
+        self.balance_format: str = balance_format
+        # set while running, game balances are then written off the collecting thread
+        self._writer: Optional[BackgroundWriter] = None
+
+    def tasks(self, attempt: int) -> list:
+        chunks = math.ceil(self.players_per_rate / self.players_per_task)
+        return [
+            SweepTask(
+                attempt,
+                player_name,
+                roi,
+                win_rate,
+                first_player,
+                min(self.players_per_task, self.players_per_rate - first_player),
+            )
+            for first_player in range(
+                0, chunks * self.players_per_task, self.players_per_task
+            )
+            for win_rate in self.win_rates
+            for roi in self.rois
+            for player_name in self.player_names
+        ]
+
+    def _pending(self, attempts: int):
+        for attempt in range(self._lowest_completed_attempt() + 1, attempts + 1):
+            for task in self.tasks(attempt):
+                if attempt > self.completed_attempts.get(
+                    (task.player_name, task.roi), 0
+                ):
+                    yield task
+
+    def _lowest_completed_attempt(self) -> int:
+        return min(
+            self.completed_attempts.get((player_name, roi), 0)
+            for player_name in self.player_names
+            for roi in self.rois
+        )
+
+    def config(self) -> dict:
+        # what the running totals depend on, two runs only add up if they share it
+        return {
+            "game_size": self.game_size,
+            "players_per_rate": self.players_per_rate,
+            "win_rates": [round(win_rate, 6) for win_rate in self.win_rates],
+            "recording": self.recording,
+        }
+
+    def _check_config(self, config: dict, path: str) -> None:
+        if config != self.config():
+            raise Exception(
+                f"checkpoint {path} was run with {config}, not {self.config()}"
+            )
+
+    def resume(self, path: str) -> None:
+        (
+            root_seed,
+            completed_attempts,
+            rate_result_summary_dicts,
+            rate_balance_accumulator_dicts,
+            config,
+        ) = load_checkpoint(path)
+        self._check_config(config, path)
+        self.root_seed = root_seed
+        self.completed_attempts = completed_attempts
+        self.rate_result_summary_dicts = rate_result_summary_dicts
+        self.rate_balance_accumulator_dicts = rate_balance_accumulator_dicts
+        self._checkpointed_attempt = self._lowest_completed_attempt()
+
+    def merge(self, path: str) -> None:
+        # fold in a checkpoint of an independent run, e.g. from another machine
+        (
+            root_seed,
+            completed_attempts,
+            rate_result_summary_dicts,
+            rate_balance_accumulator_dicts,
+            config,
+        ) = load_checkpoint(path)
+        self._check_config(config, path)
+        if root_seed == self.root_seed:
+            raise Exception(
+                "checkpoint shares this run's root seed, its games would be counted twice"
+            )
+        for pair, attempts in completed_attempts.items():
+            self.completed_attempts[pair] = (
+                self.completed_attempts.get(pair, 0) + attempts
+            )
+            rate_result_summary_dict = self.rate_result_summary_dicts.setdefault(
+                pair, {}
+            )
+            for win_rate, result_summary in rate_result_summary_dicts.get(
+                pair, {}
+            ).items():
+                rate_result_summary_dict[win_rate] = rate_result_summary_dict.get(
+                    win_rate, ResultSummary()
+                ).merge(result_summary)
+            rate_balance_accumulator_dict = (
+                self.rate_balance_accumulator_dicts.setdefault(pair, {})
+            )
+            for win_rate, balance_accumulator in rate_balance_accumulator_dicts.get(
+                pair, {}
+            ).items():
+                rate_balance_accumulator_dict[win_rate] = (
+                    rate_balance_accumulator_dict.get(
+                        win_rate, BalanceAccumulator()
+                    ).merge(balance_accumulator)
+                )
+
+    def checkpoint(self) -> None:
+        if not self.checkpoint_path:
+            return
+        save_checkpoint(
+            self.checkpoint_path,
+            self.root_seed,
+            self.completed_attempts,
+            self.rate_result_summary_dicts,
+            self.rate_balance_accumulator_dicts,
+            self.config(),
+        )
+        self._checkpointed_attempt = self._lowest_completed_attempt()
+
+    def run(self, attempts: int = 1_000_000) -> dict:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            self.resume(self.checkpoint_path)
+        tasks_per_pair = len(self.tasks(1)) // (len(self.player_names) * len(self.rois))
+        # per (attempt, player name, roi):
+        # [tasks done, rate summaries, rate accumulators, metrics]
+        attempt_states: dict = {}
+        pending = self._pending(attempts)
+        in_flight = set()
+        self.stats = PoolStats(self.workers)
+        with ProcessPoolExecutor(
+            max_workers=self.workers
+        ) as executor, BackgroundWriter() as self._writer:
+            submit = partial(
+                executor.submit,
+                _run_task,
+                game_size=self.game_size,
+                root_seed=self.root_seed,
+                recording=self.recording,
+            )
+            for task in pending:
+                in_flight.add(
+                    submit(
+                        task,
+                        profile_directory=(
+                            os.path.join(
+                                self.profile_directory, f"attempt_{task.attempt}"
+                            )
+                            if task.attempt == self.profile_attempt
+                            else None
+                        ),
+                    )
+                )
+                if len(in_flight) < self.tasks_in_flight:
+                    continue
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future.result(), attempt_states, tasks_per_pair)
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future.result(), attempt_states, tasks_per_pair)
+        self._writer = None
+        self.checkpoint()
+        return self.stats.report()
+
+    def _collect(
+        self,
+        task_result: TaskResult,
+        attempt_states: dict,
+        tasks_per_pair: int,
+    ) -> None:
+        self.stats.record(task_result)
+        task = task_result.task
+        key = (task.attempt, task.player_name, task.roi)
+        state = attempt_states.get(key)
+        if state is None:
+            state = [
+                0,
+                {},
+                {},
+                AttemptMetrics(
+                    attempt=task.attempt, player_name=task.player_name, roi=task.roi
+                ),
+            ]
+            attempt_states[key] = state
+        metrics: AttemptMetrics = state[3]
+        metrics.add_stage("simulate", task_result.wall_time, task_result.cpu_time)
+        metrics.count_results(task_result.result_summary)
+        metrics.count("bytes_from_workers", task_result.payload_bytes)
+        state[0] += 1
+        with metrics.stage("aggregate"):
+            result_summary = state[1].get(task.win_rate, ResultSummary())
+            state[1][task.win_rate] = result_summary.merge(task_result.result_summary)
+            balance_accumulator = state[2].get(task.win_rate, BalanceAccumulator())
+            state[2][task.win_rate] = balance_accumulator.merge(
+                task_result.balance_accumulator
+            )
+        # attempts finish out of order, fold them into the running totals in order
+        pair = (task.player_name, task.roi)
+        attempt = self.completed_attempts.get(pair, 0) + 1
+        while attempt_states.get((attempt, *pair), [0])[0] == tasks_per_pair:
+            _, rate_result_summaries, rate_balance_accumulators, metrics = (
+                attempt_states.pop((attempt, *pair))
+            )
+            self._save(
+                attempt, pair, rate_result_summaries, rate_balance_accumulators, metrics
+            )
+            metrics.emit(self.metrics_path)
+            self.completed_attempts[pair] = attempt
+            attempt += 1
+        lowest_completed_attempt = self._lowest_completed_attempt()
+        # several attempts can complete at once, so the lowest one may skip over a
+        # multiple of checkpoint_every
+        if (
+            lowest_completed_attempt
+            >= self._checkpointed_attempt + self.checkpoint_every
+        ):
+            self.checkpoint()
+
+    def _save(
+        self,
+        attempt: int,
+        pair: tuple,
+        rate_result_summaries: dict,
+        rate_balance_accumulators: dict,
+        metrics: Optional[AttemptMetrics] = None,
+    ) -> None:
+        metrics = metrics if metrics is not None else AttemptMetrics()
+        player_name, roi = pair
+        rate_result_summary_dict = self.rate_result_summary_dicts.setdefault(pair, {})
+        rate_balance_accumulator_dict = self.rate_balance_accumulator_dicts.setdefault(
+            pair, {}
+        )
+        with metrics.stage("aggregate"):
+            for win_rate in sorted(rate_result_summaries):
+                result_summary = rate_result_summary_dict.get(win_rate, ResultSummary())
+                rate_result_summary_dict[win_rate] = result_summary.merge(
+                    rate_result_summaries[win_rate]
+                )
+                balance_accumulator = rate_balance_accumulator_dict.get(
+                    win_rate, BalanceAccumulator()
+                )
+                rate_balance_accumulator_dict[win_rate] = balance_accumulator.merge(
+                    rate_balance_accumulators[win_rate]
+                )
+        self._write(pair, metrics)
+        print(
+            f"Attempt {attempt} on {player_name} with roi {roi} saved @ {datetime.now()} :: {self.stats.report()}"
+        )
+
+    def _write(self, pair: tuple, metrics: Optional[AttemptMetrics] = None) -> None:
+        metrics = metrics if metrics is not None else AttemptMetrics()
+        player_name, roi = pair
+        with metrics.stage("write_results"):
+            write_game_results(self.rate_result_summary_dicts[pair], player_name, roi)
+        with metrics.stage("write_balances"):
+            save_game_balances(
+                self.rate_balance_accumulator_dicts[pair],
+                player_name,
+                roi,
+                self.balance_format,
+                self._writer,
+            )
+
+    def precision(
+        self,
+        cell: tuple,
+        relative_precision: float,
+        absolute_precision: float,
+        confidence: float,
+        in_flight_players: int = 0,
+    ) -> float:
+        # widest ci over pnl_mean and mvdd_mean relative to its target, <= 1 once
+        # converged; players still in flight shrink it as if they were done
+        player_name, roi, win_rate = cell
+        result_summary = self.rate_result_summary_dicts.get((player_name, roi), {}).get(
+            win_rate
+        )
+        if result_summary is None or result_summary.sample_size < 2:
+            return math.inf
+        ratio = max(
+            stats.confidence_interval(confidence)
+            / max(absolute_precision, relative_precision * abs(stats.mean))
+            for stats in (result_summary.pnl, result_summary.mvdd)
+        )
+        sample_size = result_summary.sample_size
+        return ratio * math.sqrt(sample_size / (sample_size + in_flight_players))
+
+    def run_adaptive(
+        self,
+        min_players: int = 1_000,
+        max_players: int = 100_000,
+        relative_precision: float = 0.01,
+        absolute_precision: float = 0.1,
+        confidence: float = 0.95,
+        write_every: int = 100,
+    ) -> dict:
+        # instead of equal attempts per rate, keep sampling the cells whose pnl_mean
+        # and mvdd_mean intervals are widest until every cell is within precision
+        # or has max_players players; players of a cell are numbered
+        # 0..max_players-1 under attempt 0 so every one has its own stream
+        cells = [
+            (player_name, roi, win_rate)
+            for player_name in self.player_names
+            for roi in self.rois
+            for win_rate in self.win_rates
+        ]
+        # players handed out per cell, a resumed run carries on after its samples
+        dispatched = {
+            (player_name, roi, win_rate): self.rate_result_summary_dicts.get(
+                (player_name, roi), {}
+            )
+            .get(win_rate, ResultSummary())
+            .sample_size
+            for player_name, roi, win_rate in cells
+        }
+        in_flight_players = {cell: 0 for cell in cells}
+
+        def _noisiest():
+            # cells still short of min_players first, then the widest interval
+            candidates = []
+            for cell in cells:
+                if dispatched[cell] >= max_players:
+                    continue
+                if dispatched[cell] < min_players:
+                    candidates.append((1, -dispatched[cell], cell))
+                    continue
+                ratio = self.precision(
+                    cell,
+                    relative_precision,
+                    absolute_precision,
+                    confidence,
+                    in_flight_players[cell],
+                )
+                if ratio > 1:
+                    candidates.append((0, ratio, cell))
+            return max(candidates, default=(None, None, None))[2]
+
+        in_flight = set()
+        changed_pairs = set()
+        written_tasks = 0
+        self.stats = PoolStats(self.workers)
+        with ProcessPoolExecutor(
+            max_workers=self.workers
+        ) as executor, BackgroundWriter() as self._writer:
+            submit = partial(
+                executor.submit,
+                _run_task,
+                game_size=self.game_size,
+                root_seed=self.root_seed,
+                recording=self.recording,
+            )
+            while True:
+                while len(in_flight) < self.tasks_in_flight:
+                    cell = _noisiest()
+                    if cell is None:
+                        break
+                    player_name, roi, win_rate = cell
+                    players = min(self.players_per_task, max_players - dispatched[cell])
+                    in_flight.add(
+                        submit(
+                            SweepTask(
+                                0, player_name, roi, win_rate, dispatched[cell], players
+                            )
+                        )
+                    )
+                    dispatched[cell] += players
+                    in_flight_players[cell] += players
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_result = future.result()
+                    self.stats.record(task_result)
+                    task = task_result.task
+                    pair = (task.player_name, task.roi)
+                    in_flight_players[(*pair, task.win_rate)] -= task.players
+                    rate_result_summary_dict = (
+                        self.rate_result_summary_dicts.setdefault(pair, {})
+                    )
+                    rate_result_summary_dict[task.win_rate] = (
+                        rate_result_summary_dict.get(
+                            task.win_rate, ResultSummary()
+                        ).merge(task_result.result_summary)
+                    )
+                    rate_balance_accumulator_dict = (
+                        self.rate_balance_accumulator_dicts.setdefault(pair, {})
+                    )
+                    rate_balance_accumulator_dict[task.win_rate] = (
+                        rate_balance_accumulator_dict.get(
+                            task.win_rate, BalanceAccumulator()
+                        ).merge(task_result.balance_accumulator)
+                    )
+                    changed_pairs.add(pair)
+                if self.stats.tasks - written_tasks >= write_every:
+                    written_tasks = self.stats.tasks
+                    for pair in sorted(changed_pairs):
+                        self._write(pair)
+                    changed_pairs.clear()
+                    print(
+                        f"Adaptive sweep saved @ {datetime.now()} :: {self.stats.report()}"
+                    )
+        self._writer = None
+        for pair in sorted(changed_pairs):
+            self._write(pair)
+        report = self.stats.report()
+        report["unconverged"] = [
+            cell
+            for cell in cells
+            if self.precision(cell, relative_precision, absolute_precision, confidence)
+            > 1
+        ]
+        return report
+
+
+if __name__ == "__main__":
+    SweepScheduler(
+        checkpoint_path=os.path.join("checkpoints", "sweep.checkpoint")
+    ).run()
@@ -2,6 +2,13 @@ import collections
 import random
 import numpy as np
 import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Optional
+
+initial_budget = 400_000
+bet = 10_000
+win_records = {True: 0, False: 0}
 
 
 def unique(list1):
@@ -54,25 +61,89 @@ def play_games(_budget: int, _total_bet: int, _max_bet: int):
     return _max_bet
 
 
-win_records = {True: 0, False: 0}
-max_bets = {}
-initial_budget = 400_000
-bet = 10_000
-for i in range(0, 10000):
-    budget = initial_budget
-    total_bet = 0
-    max_bet = 0
-    max_bet = play_games(budget, total_bet, max_bet)
-    max_bets[max_bet] = max_bets[max_bet] + 1 if max_bet in max_bets else 1
-
-win_count = len([won for won in win_records if won is True])
-
-sorted_max_bets = collections.OrderedDict({k: v for k, v in sorted(max_bets.items(), key=lambda item: item[1])})
-print(json.dumps(sorted_max_bets, indent=4))
-
-# print(f"budget[{budget}]")
-# print(f"revenue[{budget - initial_budget}]")
-# print(f"max bet[{max_bet}]")
-# print(f"total_bet[{total_bet}]")
-# print(f"win record: {win_count}/{len(win_records)}")
-# print(f"win rate: {win_count / len(win_records) * 100}")
+def play_sessions(won: Iterable[np.ndarray], sessions: int, _budget: int = initial_budget, _bet: int = bet):
+    # play_games for many sessions in lockstep, `won` yields one row of outcomes per
+    # game (or a block of rows); returns max bets, broke sessions, wins and losses
+    budgets = np.full(sessions, _budget, dtype=np.int64)
+    total_bets = np.zeros(sessions, dtype=np.int64)
+    max_bets = np.zeros(sessions, dtype=np.int64)
+    # losses at the end of the win records, counted up to three
+    trailing_losses = np.zeros(sessions, dtype=np.int64)
+    playing = np.ones(sessions, dtype=bool)
+    wins = 0
+    losses = 0
+    for rows in won:
+        for row in np.atleast_2d(rows):
+            playing &= budgets != 0
+            current_bets = np.where((trailing_losses > 0) & (total_bets > 0), total_bets, _bet)
+            np.maximum(max_bets, np.where(playing, current_bets, 0), out=max_bets)
+            # lost last three games, so the game only goes on the records
+            counted = playing & ~((trailing_losses >= 3) & (current_bets != _bet))
+            counted_wins = counted & row
+            counted_losses = counted & ~row
+            budgets += np.where(counted_wins, current_bets, 0) - np.where(counted_losses, current_bets, 0)
+            total_bets = np.where(counted_wins, 0, total_bets + np.where(counted_losses, current_bets, 0))
+            trailing_losses = np.where(playing, np.where(row, 0, np.minimum(trailing_losses + 1, 3)), trailing_losses)
+            wins += int(counted_wins.sum())
+            losses += int(counted_losses.sum())
+    return max_bets, ~playing, wins, losses
+
+
+def _random_outcomes(rng: np.random.Generator, sessions: int, games: int, block: int):
+    for start in range(0, games, block):
+        yield rng.random((min(block, games - start), sessions)) * 10 > 5
+
+
+def _play_chunk(seed_sequence: np.random.SeedSequence, sessions: int, games: int, _budget: int, _bet: int, block: int):
+    max_bets, broke, wins, losses = play_sessions(
+        _random_outcomes(np.random.default_rng(seed_sequence), sessions, games, block), sessions, _budget, _bet
+    )
+    # a session that ran out of budget returns no max bet
+    _max_bets = collections.Counter(max_bets[~broke].tolist())
+    if broke.any():
+        _max_bets[None] = int(broke.sum())
+    return _max_bets, wins, losses
+
+
+def play_games_batch(
+    sessions: int = 10_000,
+    games: int = 10_000,
+    _budget: int = initial_budget,
+    _bet: int = bet,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    block: int = 256,
+) -> dict:
+    # the max_bets histogram and win/loss counts of `sessions` play_games runs,
+    # without touching the module's records
+    seed_sequences = np.random.SeedSequence(seed).spawn(workers)
+    chunk_sizes = [len(chunk) for chunk in np.array_split(np.arange(sessions), workers)]
+    play = partial(_play_chunk, games=games, _budget=_budget, _bet=_bet, block=block)
+    if workers == 1:
+        results = [play(seed_sequences[0], sessions)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(play, seed_sequences, chunk_sizes))
+    max_bets = collections.Counter()
+    for _max_bets, _wins, _losses in results:
+        max_bets.update(_max_bets)
+    return {
+        "max_bets": dict(max_bets),
+        "wins": sum(result[1] for result in results),
+        "losses": sum(result[2] for result in results),
+    }
+
+
+if __name__ == "__main__":
+    result = play_games_batch(10_000, 10_000, initial_budget, bet)
+    max_bets = result["max_bets"]
+
+    sorted_max_bets = collections.OrderedDict({k: v for k, v in sorted(max_bets.items(), key=lambda item: item[1])})
+    print(json.dumps(sorted_max_bets, indent=4))
+
+    # print(f"budget[{budget}]")
+    # print(f"revenue[{budget - initial_budget}]")
+    # print(f"max bet[{max_bet}]")
+    # print(f"total_bet[{total_bet}]")
+    # print(f"win record: {win_count}/{len(win_records)}")
+    # print(f"win rate: {win_count / len(win_records) * 100}")
@@ -0,0 +1,444 @@
+import copy
+import math
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    Player,
+    SteadyOnePlayer,
+    player_rngs,
+)
+from betting_simulator.strategy import FLAT, SpecPlayer, StrategySpec, spec_of
+from betting_simulator.trajectory import EVENTS, OFF, Recording, Trajectory
+
+# longest losing streak an excursion table covers, longer ones are played out
+MAX_STREAK = 1_000
+MAX_BLOCK = 65_536
+# far above anything a capped bet progression can spend, so no balance
+# dependent rule fires while the additive table is replayed
+HUGE_BALANCE = 1e200
+
+
+class ExcursionTable(NamedTuple):
+    # an excursion is every game from a fresh bet up to and including the next win;
+    # entry k is for k losses before that win
+    bottoms: np.ndarray  # balance after the k losses
+    wins: np.ndarray  # balance after the win
+    max_bets: np.ndarray  # biggest bet of the excursion
+    # start balances the table holds for, per k
+    low: np.ndarray
+    high: float
+    # proportional tables are per unit of start balance, additive ones are offsets
+    proportional: bool
+
+
+def _base_fraction(spec: StrategySpec, roi: float) -> float:
+    return (
+        spec.base_bet_fraction / roi
+        if spec.base_bet_per_roi
+        else spec.base_bet_fraction
+    )
+
+
+def _replay(spec: StrategySpec, roi: float, balance: float, lowest: float) -> tuple:
+    # the real bet rules over a streak of losses, with a win tried after each,
+    # until the balance is down to `lowest`
+    player = SpecPlayer(spec, balance)
+    # keep the double balance tracker quiet while replaying
+    player.target_balance = math.inf
+    always_win = House(1, 0, roi, block_size=1)
+    always_lose = House(0, 0, roi, block_size=1)
+    bottoms, wins, bets, max_bets = [], [], [], []
+    for _ in range(0, MAX_STREAK):
+        won = copy.copy(player)
+        won.play(always_win)
+        bottoms.append(player.balance)
+        wins.append(won.balance)
+        bets.append(copy.copy(player).bet(roi))
+        max_bets.append(won.max_bet)
+        if player.balance <= lowest:
+            break
+        player.play(always_lose)
+    return (
+        np.array(bottoms),
+        np.array(wins),
+        np.array(bets),
+        np.array(max_bets),
+    )
+
+
+@lru_cache(maxsize=64)
+def proportional_table(spec: StrategySpec, roi: float) -> ExcursionTable:
+    # while the fresh bet is below the cap every bet is a fixed fraction of the
+    # start balance, so one excursion scales to any start balance
+    bottoms, wins, _bets, max_bets = _replay(spec, roi, 1.0, 1e-18)
+    return ExcursionTable(
+        bottoms,
+        wins,
+        max_bets,
+        np.zeros(len(bottoms)),
+        spec.bet_cap / _base_fraction(spec, roi),
+        True,
+    )
+
+
+@lru_cache(maxsize=64)
+def additive_table(spec: StrategySpec, roi: float) -> ExcursionTable:
+    # once the fresh bet sits at the cap the bets no longer depend on the balance,
+    # until the balance is too small to cover one, the capped base bet is no
+    # longer capped, or the stop loss cuts in
+    _bottoms, _wins, bets, _max_bets = _replay(
+        spec, roi, HUGE_BALANCE, HUGE_BALANCE / 2
+    )
+    spent = np.concatenate([[0], np.cumsum(bets)[:-1]])
+    low = spent + bets
+    if spec.stop_loss_fraction is not None:
+        low = np.maximum(low, spent + (spent + bets) / spec.stop_loss_fraction)
+    capped = spent + spec.bet_cap / _base_fraction(spec, roi)
+    if spec.progression == FLAT:
+        low = np.maximum(low, capped)
+    else:
+        low[0] = max(low[0], capped[0])
+    return ExcursionTable(
+        -spent,
+        bets * roi - spent,
+        np.maximum.accumulate(bets),
+        np.maximum.accumulate(low),
+        math.inf,
+        False,
+    )
+
+
+def _spec(player: Player) -> StrategySpec:
+    return player.spec if isinstance(player, SpecPlayer) else spec_of(type(player))
+
+
+class SkippingSession:
+    # Plays a whole session of one player an excursion at a time: the number of
+    # games to the next win is geometric, so a block of excursions is drawn at
+    # once and folded in from the tables. Excursions where something happens
+    # (broke, a table does not hold, a recorded game, the end of the session) are
+    # played game by game with the real player.
+    def __init__(
+        self, house: House, player: Player, grid: Optional[np.ndarray] = None
+    ) -> None:
+        spec = _spec(player)
+        if not spec.reset_on_win:
+            raise Exception("progressions that run through wins have no excursions")
+        if house.tie_rate and (
+            spec.progression != FLAT or spec.stop_loss_fraction is not None
+        ):
+            raise Exception(
+                "ties keep their bet in cumulative_bet, only tie-free houses are skipped"
+            )
+        self.house: House = house
+        self.player: Player = player
+        self.roi: float = house.return_on_investment
+        self.win_probability: float = house._win_range / House.MILLION
+        self.tie_probability: float = (
+            house._tie_range - house._win_range
+        ) / House.MILLION
+        self.threshold: float = player.initial_budget * spec.broke_fraction
+        self.proportional: ExcursionTable = proportional_table(spec, self.roi)
+        self.additive: ExcursionTable = additive_table(spec, self.roi)
+        self._rng: np.random.Generator = house._rng
+        self._houses: dict = {
+            House.WIN: House(1, 0, self.roi, block_size=1),
+            House.TIE: House(0, 1, self.roi, block_size=1),
+            House.LOSS: House(0, 0, self.roi, block_size=1),
+        }
+        self.grid: list = grid.tolist() if grid is not None else []
+        self.balances: list = []
+        self._position: int = 0
+        self._record()
+
+    def _record(self) -> None:
+        player = self.player
+        if (
+            self._position < len(self.grid)
+            and self.grid[self._position] == player.games_played
+        ):
+            self.balances.append(player.balance)
+            self._position += 1
+
+    def _next_recorded(self) -> float:
+        return (
+            self.grid[self._position] if self._position < len(self.grid) else math.inf
+        )
+
+    def _done(self, game_size: int) -> bool:
+        return self.player.games_played >= game_size or self.player.is_broke()
+
+    def _play(self, outcome: int) -> None:
+        self.player.play(self._houses[outcome])
+        self._record()
+
+    def _play_excursion(self, games: int, losses: int, game_size: int) -> None:
+        # the losses are anywhere among the games before the win
+        lost = np.zeros(games, dtype=bool)
+        lost[self._rng.choice(games, losses, replace=False)] = True
+        for outcome in lost.tolist():
+            self._play(House.LOSS if outcome else House.TIE)
+            if self._done(game_size):
+                return
+        self._play(House.WIN)
+
+    def run(self, game_size: int) -> "SkippingSession":
+        player = self.player
+        if self.win_probability == 0:
+            while not self._done(game_size):
+                self._play(
+                    House.LOSS
+                    if self._rng.random() >= self.tie_probability
+                    else House.TIE
+                )
+            return self
+        size = 16
+        while not self._done(game_size):
+            if player.lost_last_game or player.balance >= player.target_balance:
+                # mid excursion, or a double still due on the next game
+                self._play(self._outcome())
+                continue
+            games = self._rng.geometric(self.win_probability, size) - 1
+            loss_probability = 1 - self.win_probability - self.tie_probability
+            losses = (
+                self._rng.binomial(
+                    games, loss_probability / (loss_probability + self.tie_probability)
+                )
+                if self.tie_probability
+                else games
+            )
+            accepted = self._fold(games, losses, game_size)
+            if accepted < size and not self._done(game_size):
+                self._play_excursion(
+                    int(games[accepted]), int(losses[accepted]), game_size
+                )
+                size = max(16, 2 * accepted)
+            else:
+                size = min(MAX_BLOCK, 2 * size)
+        return self
+
+    def _outcome(self) -> int:
+        draw = self._rng.random()
+        if draw < self.win_probability:
+            return House.WIN
+        if draw < self.win_probability + self.tie_probability:
+            return House.TIE
+        return House.LOSS
+
+    def _fold(self, games: np.ndarray, losses: np.ndarray, game_size: int) -> int:
+        # applies the leading excursions nothing happens in, returns their count
+        player = self.player
+        start = player.balance
+        # far out blocks overflow, they are cut off below anyway
+        with np.errstate(over="ignore", invalid="ignore"):
+            return self._fold_block(start, games, losses, game_size)
+
+    def _fold_block(
+        self, start: float, games: np.ndarray, losses: np.ndarray, game_size: int
+    ) -> int:
+        player = self.player
+        table = self.proportional if start < self.proportional.high else self.additive
+        inside = losses < len(table.wins)
+        k = np.where(inside, losses, 0)
+        if table.proportional:
+            ends = start * np.cumprod(table.wins[k])
+        else:
+            ends = start + np.cumsum(table.wins[k])
+        starts = np.concatenate([[start], ends[:-1]])
+        if table.proportional:
+            bottoms = starts * table.bottoms[k]
+            max_bets = starts * table.max_bets[k]
+        else:
+            bottoms = starts + table.bottoms[k]
+            max_bets = table.max_bets[k]
+        ended = player.games_played + np.cumsum(games + 1)
+        fine = (
+            inside
+            & (starts >= table.low[k])
+            & (starts < table.high)
+            & (bottoms > self.threshold)
+            & (ended <= game_size)
+            & (ended < self._next_recorded())
+        )
+        accepted = len(games) if fine.all() else int(np.argmin(fine))
+        accepted = self._double(ends, ended, accepted)
+        if accepted == 0:
+            return 0
+        running = np.maximum.accumulate(
+            np.concatenate([[player.max_value], ends[:accepted]])
+        )
+        player.max_value_draw_down_pcnt = min(
+            player.max_value_draw_down_pcnt,
+            float(((bottoms[:accepted] / running[:-1]) - 1).min() * 100),
+        )
+        player.max_value = float(running[-1])
+        player.balance = float(ends[accepted - 1])
+        player.games_played = int(ended[accepted - 1])
+        player.win += accepted
+        player.loss += int(losses[:accepted].sum())
+        player.tie += int((games - losses)[:accepted].sum())
+        player.max_losing_streak = max(
+            player.max_losing_streak, int(losses[:accepted].max())
+        )
+        player.max_bet = max(player.max_bet, float(max_bets[:accepted].max()))
+        return accepted
+
+    def _double(self, ends: np.ndarray, ended: np.ndarray, accepted: int) -> int:
+        # balances only rise on the win that ends an excursion
+        player = self.player
+        low = 0
+        while low < accepted:
+            hits = np.flatnonzero(ends[low:accepted] >= player.target_balance)
+            if not len(hits):
+                break
+            j = low + int(hits[0])
+            game = int(ended[j])
+            player.double_balance_game_lengths.append(
+                game - player.last_double_balanced_game
+            )
+            player.target_balance *= 2
+            player.last_double_balanced_game = game
+            if ends[j] >= player.target_balance:
+                # doubled twice over, the next double can come on any game
+                return j + 1
+            low = j + 1
+        return accepted
+
+
+def skip_games(
+    repetition: int,
+    house: House,
+    player: Player,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    recording: Optional[Recording] = None,
+):
+    # simulate_games results without playing every game; balances only on a grid
+    recording = recording if recording is not None else Recording(OFF)
+    if recording.mode == EVENTS:
+        raise Exception("skipped games have no events to record")
+    grid = recording.grid(repetition)
+    session = SkippingSession(house, player, grid).run(repetition)
+    if grid is None:
+        return house, player, None
+    trajectory = Trajectory(grid[: len(session.balances)], np.array(session.balances))
+    if balance_accumulator is not None:
+        balance_accumulator.use_grid(grid, repetition)
+        balance_accumulator.add_trajectory(trajectory.balances)
+        trajectory = None
+    return house, player, trajectory
+
+
+def _simulate_players(
+    player_class: type,
+    win_rate: float,
+    tie_rate: float,
+    roi: float,
+    game_size: int,
+    repetition: int,
+    balance_accumulator: Optional[BalanceAccumulator],
+    root_seed: Optional[int],
+    attempt: int,
+    first_player: int,
+    recording: Optional[Recording],
+):
+    rngs = player_rngs(
+        root_seed, player_class().name, roi, win_rate, attempt, first_player, repetition
+    )
+    return [
+        skip_games(
+            game_size,
+            House(win_rate, tie_rate, roi, rng=rng),
+            player_class(budget=1_000_000),
+            balance_accumulator,
+            recording,
+        )
+        for rng in rngs
+    ]
+
+
+def simulate_martingale_system_player(
+    win_rate: float = 0.5,
+    tie_rate: float = 0,
+    roi: float = 1,
+    game_size: int = 1_000_000,
+    repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
+):
+    return _simulate_players(
+        MartingaleSystemPlayer,
+        win_rate,
+        tie_rate,
+        roi,
+        game_size,
+        repetition,
+        balance_accumulator,
+        root_seed,
+        attempt,
+        first_player,
+        recording,
+    )
+
+
+def simulate_martingale_stoploss_player(
+    win_rate: float = 0.5,
+    tie_rate: float = 0,
+    roi: float = 1,
+    game_size: int = 1_000_000,
+    repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
+):
+    return _simulate_players(
+        MartingaleSystemStopLossPlayer,
+        win_rate,
+        tie_rate,
+        roi,
+        game_size,
+        repetition,
+        balance_accumulator,
+        root_seed,
+        attempt,
+        first_player,
+        recording,
+    )
+
+
+def simulate_steady_one_player(
+    win_rate: float = 0.5,
+    tie_rate: float = 0,
+    roi: float = 1,
+    game_size: int = 1_000_000,
+    repetition: int = 1_000,
+    balance_accumulator: Optional[BalanceAccumulator] = None,
+    root_seed: Optional[int] = None,
+    attempt: int = 0,
+    first_player: int = 0,
+    recording: Optional[Recording] = None,
+):
+    return _simulate_players(
+        SteadyOnePlayer,
+        win_rate,
+        tie_rate,
+        roi,
+        game_size,
+        repetition,
+        balance_accumulator,
+        root_seed,
+        attempt,
+        first_player,
+        recording,
+    )
@@ -0,0 +1,178 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.trajectory import EVENTS, OFF, Recording, Trajectory
+
+BALANCES_FILE = "balances.npy"
+LENGTHS_FILE = "lengths.npy"
+INDICES_FILE = "indices.npy"
+META_FILE = "meta.json"
+
+
+def _rate_key(win_rate: float) -> float:
+    # win rates are built as 0.5 + 0.01 * x, match them without float noise
+    return round(win_rate, 6)
+
+
+def create_store(
+    path: str,
+    win_rates: list,
+    players: int,
+    game_size: int,
+    recording: Optional[Recording] = None,
+) -> "TrajectoryStore":
+    # balances[rate, player, position] as .npy files any numpy can memory map;
+    # position is the game index, or the position on the recording grid
+    if recording is not None and recording.mode in (OFF, EVENTS):
+        raise Exception(f"{recording.mode} recordings have no trajectory layout")
+    indices = (
+        np.arange(0, game_size + 1, dtype=np.int64)
+        if recording is None
+        else recording.grid(game_size)
+    )
+    if not os.path.exists(path):
+        os.makedirs(path)
+    rates = sorted({_rate_key(win_rate) for win_rate in win_rates})
+    # the files are created sparse, nothing is written until a worker does
+    np.lib.format.open_memmap(
+        os.path.join(path, BALANCES_FILE),
+        mode="w+",
+        dtype=np.float64,
+        shape=(len(rates), players, len(indices)),
+    ).flush()
+    np.lib.format.open_memmap(
+        os.path.join(path, LENGTHS_FILE),
+        mode="w+",
+        dtype=np.int64,
+        shape=(len(rates), players),
+    ).flush()
+    np.save(os.path.join(path, INDICES_FILE), indices)
+    with open(os.path.join(path, META_FILE), "w") as file:
+        json.dump(
+            {
+                "win_rates": rates,
+                "players": players,
+                "game_size": game_size,
+                "recording": recording._asdict() if recording is not None else None,
+            },
+            file,
+            indent=2,
+        )
+    return TrajectoryStore(path, "r+")
+
+
+def open_store(path: str) -> "TrajectoryStore":
+    return TrajectoryStore(path, "r")
+
+
+class TrajectoryStore:
+    # trajectories past lengths[rate, player] (a broke player) are zero padding
+    def __init__(self, path: str, mode: str = "r") -> None:
+        self.path: str = path
+        self.mode: str = mode
+        with open(os.path.join(path, META_FILE)) as file:
+            meta = json.load(file)
+        self.win_rates: list = meta["win_rates"]
+        self.players: int = meta["players"]
+        self.game_size: int = meta["game_size"]
+        self.indices: np.ndarray = np.load(os.path.join(path, INDICES_FILE))
+        self.balances: np.ndarray = np.load(
+            os.path.join(path, BALANCES_FILE), mmap_mode=mode
+        )
+        self.lengths: np.ndarray = np.load(
+            os.path.join(path, LENGTHS_FILE), mmap_mode=mode
+        )
+
+    def __getstate__(self):
+        # workers map the files themselves instead of receiving their contents
+        return {"path": self.path, "mode": self.mode}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["mode"])
+
+    def rate_index(self, win_rate: float) -> int:
+        key = _rate_key(win_rate)
+        if key not in self.win_rates:
+            raise Exception(f"win rate {win_rate} is not in the trajectory store")
+        return self.win_rates.index(key)
+
+    def trajectory(self, win_rate: float, player: int) -> Trajectory:
+        rate_index = self.rate_index(win_rate)
+        length = int(self.lengths[rate_index, player])
+        return Trajectory(
+            self.indices[:length], self.balances[rate_index, player, :length]
+        )
+
+    def writer(
+        self,
+        win_rate: float,
+        first_player: int,
+        players: int,
+        balance_accumulator: Optional[BalanceAccumulator] = None,
+    ) -> "TrajectoryWriter":
+        if first_player + players > self.players:
+            raise Exception(
+                f"players {first_player}..{first_player + players} do not fit in a store of {self.players}"
+            )
+        return TrajectoryWriter(
+            self, self.rate_index(win_rate), first_player, players, balance_accumulator
+        )
+
+    def flush(self) -> None:
+        if self.mode != "r":
+            self.balances.flush()
+            self.lengths.flush()
+
+
+class TrajectoryWriter:
+    # takes the place of the balance accumulator in simulate_games: every whole
+    # trajectory goes into the next player row of its rate, and on to the
+    # accumulator if there is one
+    def __init__(
+        self,
+        store: TrajectoryStore,
+        rate_index: int,
+        first_player: int,
+        players: int,
+        balance_accumulator: Optional[BalanceAccumulator] = None,
+    ) -> None:
+        self.store: TrajectoryStore = store
+        self.rate_index: int = rate_index
+        self.player: int = first_player
+        self.end: int = first_player + players
+        self.balance_accumulator: Optional[BalanceAccumulator] = balance_accumulator
+
+    def use_grid(
+        self, grid: Optional[np.ndarray], game_size: Optional[int] = None
+    ) -> None:
+        # None is every game
+        indices = self.store.indices
+        expected = np.arange(0, len(indices)) if grid is None else grid
+        if not np.array_equal(expected, indices):
+            raise Exception("trajectories are recorded on a different game grid")
+        if self.balance_accumulator is not None:
+            self.balance_accumulator.use_grid(grid, game_size)
+
+    def add_trajectory(self, balances) -> None:
+        if self.player >= self.end:
+            raise Exception("more trajectories than players given to the writer")
+        balances = np.asarray(balances, dtype=np.float64)
+        length = len(balances)
+        if length > self.store.balances.shape[2]:
+            raise Exception(
+                f"trajectory of {length} balances is longer than the store's {self.store.balances.shape[2]}"
+            )
+        self.store.balances[self.rate_index, self.player, :length] = balances
+        self.store.lengths[self.rate_index, self.player] = length
+        self.player += 1
+        if self.balance_accumulator is not None:
+            self.balance_accumulator.add_trajectory(balances)
+
+    def add(self, _index: int, _balances: np.ndarray) -> None:
+        raise Exception(
+            "the trajectory store needs whole trajectories, use the per player simulate functions"
+        )
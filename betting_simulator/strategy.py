@@ -0,0 +1,168 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from betting_simulator.casino import (
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    Player,
+    SteadyOnePlayer,
+)
+
+# what the next bet is after a loss
+FLAT = "flat"  # the base bet again
+RECOVER = (
+    "recover"  # win back everything bet since the last reset plus the base bet's return
+)
+MULTIPLY = "multiply"  # last bet times loss_multiplier
+
+
+class StrategySpec(NamedTuple):
+    name: str
+    base_bet_fraction: float = 0.01
+    bet_cap: float = 100_000_000
+    # divide the base bet by the house roi so a win returns the same amount
+    base_bet_per_roi: bool = False
+    progression: str = FLAT
+    loss_multiplier: float = 2
+    reset_on_win: bool = True
+    # cap the bets since the last reset at this fraction of the balance, then reset
+    stop_loss_fraction: Optional[float] = None
+    # broke once the balance is at or below this fraction of the initial budget
+    broke_fraction: float = 0.5
+
+
+STEADY_ONE = StrategySpec(SteadyOnePlayer().name, broke_fraction=0.5)
+MARTINGALE_SYSTEM = StrategySpec(
+    MartingaleSystemPlayer().name,
+    base_bet_per_roi=True,
+    progression=RECOVER,
+    broke_fraction=0.1,
+)
+MARTINGALE_SYSTEM_STOP_LOSS = MARTINGALE_SYSTEM._replace(
+    name=MartingaleSystemStopLossPlayer().name, stop_loss_fraction=0.1
+)
+
+PLAYER_CLASS_SPECS: dict = {
+    SteadyOnePlayer: STEADY_ONE,
+    MartingaleSystemPlayer: MARTINGALE_SYSTEM,
+    MartingaleSystemStopLossPlayer: MARTINGALE_SYSTEM_STOP_LOSS,
+}
+
+
+def spec_of(player_class: type) -> StrategySpec:
+    if player_class not in PLAYER_CLASS_SPECS:
+        raise Exception(f"{player_class.__name__} has no strategy spec")
+    return PLAYER_CLASS_SPECS[player_class]
+
+
+class SpecPlayer(Player):
+    # the per game object version of a spec, what the kernel has to match
+    def __init__(self, spec: StrategySpec, budget: float = 0) -> None:
+        super().__init__(budget)
+        self.name: str = spec.name
+        self.spec: StrategySpec = spec
+
+    def _required_bet(self, roi: float = 1) -> float:
+        spec = self.spec
+        if self.lost_last_game and spec.progression == RECOVER:
+            required_return: float = self.cumulative_bet + (self.initial_bet * roi)
+            return required_return / roi
+        if self.lost_last_game and spec.progression == MULTIPLY:
+            return self.last_bet * spec.loss_multiplier
+        if spec.base_bet_per_roi:
+            return min(self.balance * spec.base_bet_fraction / roi, spec.bet_cap)
+        return min(self.balance * spec.base_bet_fraction, spec.bet_cap)
+
+    def _stop_loss(self, bet: float) -> float:
+        if self.spec.stop_loss_fraction is None:
+            return bet
+        max_bet = self.balance * self.spec.stop_loss_fraction
+        if (self.cumulative_bet + bet) <= max_bet:
+            return bet
+        self._reset_bet()
+        return max_bet
+
+    def _won(self):
+        if self.spec.reset_on_win:
+            super()._won()
+            return
+        # the progression runs on through wins
+        self.win += 1
+        self.losing_streak = 0
+
+    def is_broke(self) -> bool:
+        return self.balance <= self.initial_budget * self.spec.broke_fraction
+
+
+class StrategyKernel:
+    # Player.bet, Player._won and is_broke of a spec over arrays of players, the
+    # branches on the spec are taken once here instead of once per game
+    def __init__(self, spec: StrategySpec) -> None:
+        if spec.progression not in (FLAT, RECOVER, MULTIPLY):
+            raise Exception(f"unknown progression {spec.progression}")
+        self.spec: StrategySpec = spec
+        self._base_bet = (
+            self._base_bet_per_roi if spec.base_bet_per_roi else self._base_bet_flat
+        )
+        self._progression = {
+            FLAT: None,
+            RECOVER: self._recover,
+            MULTIPLY: self._multiply,
+        }[spec.progression]
+        self._apply_stop_loss = (
+            self._stop_loss if spec.stop_loss_fraction is not None else None
+        )
+        self.won = self._reset if spec.reset_on_win else self._keep
+
+    def _base_bet_flat(self, s: dict, _roi: float) -> np.ndarray:
+        return np.minimum(s["balance"] * self.spec.base_bet_fraction, self.spec.bet_cap)
+
+    def _base_bet_per_roi(self, s: dict, roi: float) -> np.ndarray:
+        return np.minimum(
+            s["balance"] * self.spec.base_bet_fraction / roi, self.spec.bet_cap
+        )
+
+    def _recover(self, s: dict, roi: float) -> np.ndarray:
+        return (s["cumulative_bet"] + (s["initial_bet"] * roi)) / roi
+
+    def _multiply(self, s: dict, _roi: float) -> np.ndarray:
+        return s["last_bet"] * self.spec.loss_multiplier
+
+    def _stop_loss(self, s: dict, bet: np.ndarray) -> np.ndarray:
+        stop_loss_bet = s["balance"] * self.spec.stop_loss_fraction
+        stopped = (s["cumulative_bet"] + bet) > stop_loss_bet
+        s["lost_last_game"] &= ~stopped
+        s["cumulative_bet"][stopped] = 0
+        s["initial_bet"][stopped] = 0
+        return np.where(stopped, stop_loss_bet, bet)
+
+    def bet(self, s: dict, roi: float) -> np.ndarray:
+        balance = s["balance"]
+        required = self._base_bet(s, roi)
+        if self._progression is not None:
+            required = np.where(
+                s["lost_last_game"], self._progression(s, roi), required
+            )
+        bet = np.minimum(required, balance)
+        if self._apply_stop_loss is not None:
+            bet = self._apply_stop_loss(s, bet)
+        s["initial_bet"] = np.where(s["lost_last_game"], s["initial_bet"], bet)
+        s["cumulative_bet"] += bet
+        balance -= bet
+        s["last_bet"] = bet
+        np.maximum(s["max_bet"], bet, out=s["max_bet"])
+        return bet
+
+    def _reset(self, s: dict, won: np.ndarray) -> None:
+        s["lost_last_game"][won] = False
+        s["last_bet"][won] = 0
+        s["cumulative_bet"][won] = 0
+        s["initial_bet"][won] = 0
+        s["losing_streak"][won] = 0
+
+    def _keep(self, s: dict, won: np.ndarray) -> None:
+        s["losing_streak"][won] = 0
+
+    def broke_threshold(self, budget: float) -> float:
+        return budget * self.spec.broke_fraction
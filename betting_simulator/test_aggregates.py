@@ -0,0 +1,156 @@
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator.aggregates import (
+    PERCENTILE_FIELDS,
+    BalanceAccumulator,
+    QuantileSketch,
+    RunningStats,
+)
+from betting_simulator.casino import House, SteadyOnePlayer, simulate_games
+
+
+class TestBalanceAccumulator(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.trajectories = [
+            rng.normal(100, 10, size=rng.integers(1, 50)) for _ in range(0, 40)
+        ]
+
+    def assert_matches(self, accumulator: BalanceAccumulator):
+        rows = accumulator.rows()
+        self.assertEqual(max(len(t) for t in self.trajectories), len(rows))
+        for row in rows:
+            values = [
+                t[row["index"]] for t in self.trajectories if len(t) > row["index"]
+            ]
+            self.assertAlmostEqual(np.min(values), row["min"])
+            self.assertAlmostEqual(np.max(values), row["max"])
+            self.assertAlmostEqual(np.mean(values), row["mean"])
+            self.assertAlmostEqual(np.std(values), row["std"])
+
+    def test_add_trajectory(self):
+        accumulator = BalanceAccumulator()
+        for trajectory in self.trajectories:
+            accumulator.add_trajectory(trajectory)
+        self.assert_matches(accumulator)
+
+    def test_add_index_and_merge(self):
+        halves = [BalanceAccumulator(10), BalanceAccumulator()]
+        for n, trajectory in enumerate(self.trajectories):
+            for index, balance in enumerate(trajectory):
+                halves[n % 2].add(index, np.array([balance]))
+        self.assert_matches(halves[0].merge(halves[1]))
+
+    def test_percentiles(self):
+        accumulator = BalanceAccumulator(sketch_points=10)
+        accumulator.use_grid(None, 48)
+        for trajectory in self.trajectories:
+            accumulator.add_trajectory(trajectory)
+        rows = accumulator.rows()
+        values = [t[0] for t in self.trajectories]
+        self.assertAlmostEqual(
+            np.percentile(values, 50, method="lower"), rows[0]["p50"], delta=3
+        )
+        # 10 log-spaced positions over games 0..48
+        sketched = [row["index"] for row in rows if row["p50"] is not None]
+        self.assertEqual([0, 1, 2, 3, 4, 7, 11, 18, 30, 48], sketched)
+
+    def test_percentiles_every_position(self):
+        accumulator = BalanceAccumulator(sketch_points=None)
+        accumulator.use_grid(None, 48)
+        halves = [BalanceAccumulator(sketch_points=None) for _ in range(0, 2)]
+        for n, trajectory in enumerate(self.trajectories):
+            accumulator.add_trajectory(trajectory)
+            halves[n % 2].use_grid(None, 48)
+            halves[n % 2].add_trajectory(trajectory)
+        rows = accumulator.rows()
+        self.assertNotIn(None, [row["p50"] for row in rows])
+        # a fresh accumulator takes on the layout of what it merges
+        merged = BalanceAccumulator().merge(halves[0]).merge(halves[1])
+        self.assertEqual(
+            [[row[field] for field in PERCENTILE_FIELDS] for row in rows],
+            [[row[field] for field in PERCENTILE_FIELDS] for row in merged.rows()],
+        )
+        with self.assertRaises(Exception):
+            merged.merge(self.sketched(10))
+
+    def test_sketches_span_the_game_size(self):
+        accumulator = BalanceAccumulator()
+        simulate_games(
+            1_000,
+            House(0.5, 0, 1, rng=np.random.default_rng(4)),
+            SteadyOnePlayer(1_000_000),
+            accumulator,
+        )
+        self.assertEqual(1_000, accumulator.sketch_positions[-1])
+        sketched = [row for row in accumulator.rows() if row["p50"] is not None]
+        self.assertEqual(
+            accumulator.sketch_positions.tolist(), [row["index"] for row in sketched]
+        )
+        self.assertEqual(100, len(sketched))
+
+    def sketched(self, sketch_points: int) -> BalanceAccumulator:
+        accumulator = BalanceAccumulator(sketch_points=sketch_points)
+        accumulator.use_grid(None, 48)
+        accumulator.add_trajectory(self.trajectories[0])
+        return accumulator
+
+
+class TestRunningStats(TestCase):
+    def test_add_and_merge(self):
+        rng = np.random.default_rng(1)
+        groups = [rng.exponential(10, size=n) for n in (1, 7, 0, 30)]
+        values = np.concatenate(groups)
+        merged = RunningStats()
+        for group in groups:
+            merged.merge(RunningStats().add(group))
+        grouped = RunningStats().add_groups(
+            [len(g) for g in groups],
+            [g.mean() if len(g) else 0 for g in groups],
+            [np.var(g) * len(g) if len(g) else 0 for g in groups],
+            [g.min() if len(g) else 0 for g in groups],
+            [g.max() if len(g) else 0 for g in groups],
+        )
+        for stats in (merged, grouped):
+            self.assertEqual(len(values), stats.count)
+            self.assertAlmostEqual(values.mean(), stats.mean)
+            self.assertAlmostEqual(values.std(), stats.std())
+            self.assertEqual(values.min(), stats.min)
+            self.assertEqual(values.max(), stats.max)
+
+    def test_confidence_interval(self):
+        values = np.random.default_rng(2).normal(5, 2, size=400)
+        stats = RunningStats().add(values)
+        self.assertAlmostEqual(
+            1.959964 * values.std(ddof=1) / np.sqrt(len(values)),
+            stats.confidence_interval(),
+            places=5,
+        )
+        self.assertEqual(np.inf, RunningStats().add([1.0]).confidence_interval())
+
+
+class TestQuantileSketch(TestCase):
+    def test_relative_accuracy_and_merge(self):
+        rng = np.random.default_rng(3)
+        # a skewed, Martingale like spread with some players at zero
+        values = np.concatenate([rng.lognormal(10, 3, size=20_000), np.zeros(500)])
+        whole = QuantileSketch(2, accuracy=0.01)
+        whole.add(1, values)
+        merged = QuantileSketch(2, accuracy=0.01)
+        for part in np.array_split(values, 7):
+            sketch = QuantileSketch(2, accuracy=0.01)
+            sketch.add_rows(np.ones(len(part), dtype=np.int64), part)
+            merged.merge(sketch)
+        self.assertEqual([None] * 5, whole.quantiles(0, 0, 0))
+        for quantile, estimate in zip(
+            QuantileSketch.QUANTILES, whole.quantiles(1, values.min(), values.max())
+        ):
+            exact = np.percentile(values, quantile * 100, method="lower")
+            self.assertAlmostEqual(exact, estimate, delta=exact * 0.01)
+        self.assertEqual(0.0, whole.quantiles(1, values.min(), values.max())[0])
+        self.assertEqual(
+            whole.quantiles(1, values.min(), values.max()),
+            merged.quantiles(1, values.min(), values.max()),
+        )
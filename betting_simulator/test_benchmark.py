@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from betting_simulator.benchmark import BENCHMARKS, measure, regressions
+
+
+def _result(per_sec: float, peak_memory: int) -> dict:
+    return {"unit": "games", "per_sec": per_sec, "peak_memory": peak_memory}
+
+
+class TestBenchmark(TestCase):
+    def test_regressions(self):
+        baseline = {
+            "benchmarks": {
+                "fast": _result(1_000, 10 << 20),
+                "small": _result(1_000, 1_000),
+            }
+        }
+        results = {
+            "fast": _result(700, 14 << 20),
+            "small": _result(900, 500_000),
+            "new": _result(1, 1),
+        }
+        found = regressions(results, baseline, tolerance=0.2)
+        self.assertEqual(2, len(found))
+        self.assertTrue(all(f.startswith("fast") for f in found))
+        self.assertEqual([], regressions(results, baseline, tolerance=0.5))
+
+    def test_measure(self):
+        benchmark = next(b for b in BENCHMARKS if b.name == "simulate_games_1000")
+        result = measure(benchmark, repeat=1)
+        self.assertEqual(1_000, result["units"])
+        self.assertGreater(result["per_sec"], 0)
+        self.assertGreater(result["peak_memory"], 0)
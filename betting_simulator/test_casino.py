@@ -1,11 +1,54 @@
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from unittest import TestCase
 
-from betting_simulator.casino import Player
+import numpy as np
+
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    Player,
+    SteadyOnePlayer,
+    simulate_and_save,
+    simulate_games,
+    simulate_steady_one_player,
+)
 
 
 class TestHouse(TestCase):
     def test_play(self):
-        self.fail()
+        self.assertEqual(30, House(1, 0, 2).play(10))
+        self.assertEqual(10, House(0, 1, 2).play(10))
+        self.assertEqual(0, House(0, 0, 2).play(10))
+
+    def test_outcomes_match_play(self):
+        played = House(0.6, 0.1, 1, rng=np.random.default_rng(7), block_size=1_000)
+        batched = House(0.6, 0.1, 1, rng=np.random.default_rng(7), block_size=1_000)
+        results = [played.play(10) for _ in range(0, 2_500)]
+        multipliers = batched.payout_multipliers()
+        codes = np.concatenate([batched.outcomes(n) for n in (1, 999, 1_500)])
+        self.assertEqual(results, list(multipliers[codes] * 10))
+
+    def test_play_many(self):
+        house = House(0.5, 0.2, 2, rng=np.random.default_rng(1))
+        payouts = house.play_many(np.full(100_000, 10.0))
+        self.assertEqual({0.0, 10.0, 30.0}, set(np.unique(payouts)))
+        self.assertAlmostEqual(0.5, np.mean(payouts == 30.0), delta=0.01)
+        self.assertAlmostEqual(0.2, np.mean(payouts == 10.0), delta=0.01)
+
+    def test_simulate_games_reproducible(self):
+        balances = [
+            simulate_games(
+                5_000,
+                House(0.55, 0, 1, rng=np.random.default_rng(3)),
+                SteadyOnePlayer(1_000_000),
+            )[2]
+            for _ in range(0, 2)
+        ]
+        self.assertEqual(balances[0], balances[1])
 
 
 class TestPlayer(TestCase):
@@ -31,3 +74,63 @@ class TestPlayer(TestCase):
         bet = player.bet(roi)
         print(bet)
 
+
+class TestPlayerResult(TestCase):
+    def test_result(self):
+        house = House(0.6, 0, 1, rng=np.random.default_rng(5))
+        _, player, _ = simulate_games(10_000, house, MartingaleSystemPlayer(1_000_000))
+        result = pickle.loads(pickle.dumps(player.result()))
+        lengths = player.double_balance_game_lengths
+        self.assertEqual(player.balance, result.balance)
+        self.assertEqual(
+            player.max_value_draw_down_pcnt, result.max_value_draw_down_pcnt
+        )
+        self.assertEqual(len(lengths), result.double_balance_game_length_count)
+        self.assertEqual(max(lengths), result.double_balance_game_length_max)
+        self.assertAlmostEqual(np.mean(lengths), result.double_balance_game_length_mean)
+        self.assertAlmostEqual(
+            np.var(lengths) * len(lengths), result.double_balance_game_length_m2
+        )
+
+
+class TestSimulateAndSave(TestCase):
+    def simulate(self, attempt: int, executor=None) -> dict:
+        rate_balance_accumulator_dict = {}
+        rate_result_summary_dict = {}
+        simulate_and_save(
+            rate_balance_accumulator_dict,
+            rate_result_summary_dict,
+            partial(simulate_steady_one_player, game_size=100),
+            1,
+            SteadyOnePlayer().name,
+            repetition=2,
+            root_seed=11,
+            attempt=attempt,
+            executor=executor,
+        )
+        return {
+            rate: (
+                result_summary.sample_size,
+                result_summary.pnl.mean,
+                result_summary.pnl.m2,
+                result_summary.mvdd.mean,
+                rate_balance_accumulator_dict[rate].rows(),
+            )
+            for rate, result_summary in rate_result_summary_dict.items()
+        }
+
+    def test_seeded_attempts_reproduce(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                first = self.simulate(1)
+                # a sweep's pool shared across attempts plays the same games
+                with ProcessPoolExecutor(max_workers=2) as executor:
+                    again = self.simulate(1, executor)
+                    other = self.simulate(2, executor)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual({20}, {values[0] for values in first.values()})
+        self.assertEqual(first, again)
+        self.assertNotEqual(first[0.5][1], other[0.5][1])
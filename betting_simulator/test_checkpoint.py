@@ -0,0 +1,48 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator.aggregates import BalanceAccumulator, ResultSummary
+from betting_simulator.casino import House, SteadyOnePlayer, simulate_games
+from betting_simulator.checkpoint import load_checkpoint, save_checkpoint
+
+
+class TestCheckpoint(TestCase):
+    def test_round_trip(self):
+        balance_accumulator = BalanceAccumulator()
+        _, player, _ = simulate_games(
+            1_000,
+            House(0.6, 0, 1, rng=np.random.default_rng(0)),
+            SteadyOnePlayer(1_000_000),
+            balance_accumulator,
+        )
+        pair = (player.name, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sweep.checkpoint")
+            save_checkpoint(
+                path,
+                42,
+                {pair: 4},
+                {pair: {0.6: ResultSummary().add([player.result()])}},
+                {pair: {0.6: balance_accumulator}},
+                {"game_size": 1_000},
+            )
+            (
+                root_seed,
+                completed_attempts,
+                rate_result_summary_dicts,
+                rate_balance_accumulators,
+                config,
+            ) = load_checkpoint(path)
+        self.assertEqual(42, root_seed)
+        self.assertEqual({pair: 4}, completed_attempts)
+        self.assertEqual({"game_size": 1_000}, config)
+        result_summary = rate_result_summary_dicts[pair][0.6]
+        self.assertEqual(1, result_summary.sample_size)
+        self.assertEqual(player.max_value_draw_down_pcnt, result_summary.mvdd.mean)
+        self.assertEqual(
+            balance_accumulator.rows(),
+            rate_balance_accumulators[pair][0.6].rows(),
+        )
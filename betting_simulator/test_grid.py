@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    SteadyOnePlayer,
+    common_seed_sequence,
+)
+from betting_simulator.grid import GridCell, grid_sweep
+from betting_simulator.lockstep import simulate_lockstep
+from betting_simulator.strategy import MARTINGALE_SYSTEM_STOP_LOSS
+
+
+class TestGridSweep(TestCase):
+    def test_strategies_replay_common_outcomes(self):
+        results = grid_sweep(
+            [0.5, 0.55],
+            tie_rates=[0, 0.05],
+            rois=[1, 2],
+            strategies=[SteadyOnePlayer, MartingaleSystemPlayer],
+            budgets=[1_000, 1_000_000],
+            players=8,
+            game_size=1_500,
+            root_seed=99,
+            workers=1,
+        )
+        self.assertEqual(2 * 2 * 2 * 2 * 2, len(results))
+        for cell, (result_summary, balance_accumulator) in results.items():
+            houses = [
+                House(
+                    cell.win_rate,
+                    cell.tie_rate,
+                    cell.roi,
+                    rng=np.random.default_rng(
+                        common_seed_sequence(99, cell.win_rate, cell.tie_rate, 0, i)
+                    ),
+                )
+                for i in range(0, 8)
+            ]
+            player_class = (
+                SteadyOnePlayer
+                if cell.strategy == SteadyOnePlayer().name
+                else MartingaleSystemPlayer
+            )
+            expected = BalanceAccumulator()
+            players = [
+                player
+                for _, player, _ in simulate_lockstep(
+                    player_class, houses, 1_500, cell.budget, expected
+                )
+            ]
+            self.assertEqual(8, result_summary.sample_size)
+            self.assertAlmostEqual(
+                np.mean([(p.balance / cell.budget - 1) * 100 for p in players]),
+                result_summary.pnl.mean,
+            )
+            self.assertEqual(expected.rows(), balance_accumulator.rows())
+
+    def test_specs_and_pool(self):
+        results = grid_sweep(
+            [0.6],
+            rois=[3],
+            strategies=[MARTINGALE_SYSTEM_STOP_LOSS],
+            players=4,
+            game_size=500,
+            root_seed=5,
+            track_balances=False,
+            workers=2,
+        )
+        cell = GridCell(0.6, 0, 3, MARTINGALE_SYSTEM_STOP_LOSS.name, 1_000_000)
+        self.assertEqual([cell], list(results))
+        self.assertIsNone(results[cell].balance_accumulator)
+        self.assertEqual(4, results[cell].result_summary.sample_size)
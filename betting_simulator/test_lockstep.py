@@ -0,0 +1,105 @@
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    SteadyOnePlayer,
+    replay_player,
+    simulate_games,
+)
+from betting_simulator.lockstep import (
+    simulate_lockstep,
+    simulate_martingale_stoploss_player,
+)
+from betting_simulator.strategy import MULTIPLY, SpecPlayer, StrategySpec, spec_of
+
+
+def _houses(win_rate: float, roi: float, size: int):
+    return [
+        House(win_rate, 0.05, roi, rng=np.random.default_rng(i), block_size=1_000)
+        for i in range(0, size)
+    ]
+
+
+class TestLockstepPlayers(TestCase):
+    def test_matches_player_objects(self):
+        for player_class in (
+            SteadyOnePlayer,
+            MartingaleSystemPlayer,
+            MartingaleSystemStopLossPlayer,
+        ):
+            for win_rate, roi in ((0.45, 1), (0.5, 2), (0.6, 3)):
+                expected = [
+                    simulate_games(2_000, h, player_class(1_000_000))
+                    for h in _houses(win_rate, roi, 20)
+                ]
+                actual = simulate_lockstep(
+                    player_class, _houses(win_rate, roi, 20), 2_000
+                )
+                for (_, p1, b1), (_, p2, b2) in zip(expected, actual):
+                    self.assertEqual(b1, b2)
+                    self.assertEqual(p1.__dict__, p2.__dict__)
+
+    def test_replay_single_player(self):
+        simulations = simulate_martingale_stoploss_player(
+            0.55,
+            roi=2,
+            game_size=3_000,
+            repetition=4,
+            root_seed=1234,
+            attempt=7,
+            first_player=100,
+        )
+        _, player, balances = replay_player(
+            MartingaleSystemStopLossPlayer, 1234, 2, 0.55, 7, 102, game_size=3_000
+        )
+        self.assertEqual(simulations[2][2], balances)
+        self.assertEqual(simulations[2][1].__dict__, player.__dict__)
+        self.assertNotEqual(simulations[1][2], balances)
+
+    def test_specs_match_player_classes(self):
+        for player_class in (
+            SteadyOnePlayer,
+            MartingaleSystemPlayer,
+            MartingaleSystemStopLossPlayer,
+        ):
+            spec = spec_of(player_class)
+            for win_rate, roi in ((0.45, 1), (0.55, 2)):
+                expected = [
+                    simulate_games(2_000, h, player_class(1_000_000))
+                    for h in _houses(win_rate, roi, 10)
+                ]
+                objects = [
+                    simulate_games(2_000, h, SpecPlayer(spec, 1_000_000))
+                    for h in _houses(win_rate, roi, 10)
+                ]
+                vectorized = simulate_lockstep(spec, _houses(win_rate, roi, 10), 2_000)
+                for (_, p1, b1), (_, p2, b2), (_, p3, b3) in zip(
+                    expected, objects, vectorized
+                ):
+                    self.assertEqual(b1, b2)
+                    self.assertEqual(b1, b3)
+                    self.assertEqual(p1.__dict__, _without_spec(p2))
+                    self.assertEqual(p1.__dict__, _without_spec(p3))
+
+    def test_spec_progressions(self):
+        doubling = StrategySpec(
+            "doubling", progression=MULTIPLY, reset_on_win=False, broke_fraction=0.2
+        )
+        expected = [
+            simulate_games(1_000, h, SpecPlayer(doubling, 1_000_000))
+            for h in _houses(0.48, 1, 10)
+        ]
+        actual = simulate_lockstep(doubling, _houses(0.48, 1, 10), 1_000)
+        for (_, p1, b1), (_, p2, b2) in zip(expected, actual):
+            self.assertEqual(b1, b2)
+            self.assertEqual(p1.__dict__, p2.__dict__)
+
+
+def _without_spec(player):
+    fields = dict(player.__dict__)
+    del fields["spec"]
+    return fields
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator.casino import House, MartingaleSystemPlayer, SteadyOnePlayer
+from betting_simulator.markov import MarkovEngine, max_losing_streak_distribution
+
+
+class TestMarkovEngine(TestCase):
+    def test_matches_monte_carlo(self):
+        solution = MarkovEngine(MartingaleSystemPlayer, House(0.55, 0, 1)).solve()
+        self.assertAlmostEqual(
+            1, solution["ruin_probability"] + solution["doubling_probability"]
+        )
+        ruined, games = 0, []
+        for i in range(0, 1_000):
+            house = House(0.55, 0, 1, rng=np.random.default_rng(i))
+            player = MartingaleSystemPlayer(1_000_000)
+            while not player.is_broke() and player.balance < 2_000_000:
+                player.play(house)
+            if player.is_broke():
+                ruined += 1
+            else:
+                games.append(player.games_played)
+        self.assertAlmostEqual(solution["ruin_probability"], ruined / 1_000, delta=0.05)
+        self.assertAlmostEqual(
+            solution["expected_games_until_doubling"], np.mean(games), delta=5
+        )
+
+    def test_ties(self):
+        # a flat bettor replays a tied game, the same odds over 1 / 0.9 as many games
+        solution = MarkovEngine(SteadyOnePlayer, House(0.5, 0.1, 1), budget=100).solve()
+        untied = MarkovEngine(
+            SteadyOnePlayer, House(0.5 / 0.9, 0, 1), budget=100
+        ).solve()
+        self.assertAlmostEqual(
+            untied["ruin_probability"], solution["ruin_probability"], delta=1e-4
+        )
+        self.assertAlmostEqual(
+            untied["expected_games"] / 0.9, solution["expected_games"], delta=1
+        )
+        games = []
+        for i in range(0, 500):
+            house = House(0.5, 0.1, 1, rng=np.random.default_rng(i))
+            player = SteadyOnePlayer(100)
+            while not player.is_broke() and player.balance < 200:
+                player.play(house)
+            games.append(player.games_played)
+        self.assertAlmostEqual(solution["expected_games"], np.mean(games), delta=30)
+        with self.assertRaises(Exception):
+            MarkovEngine(MartingaleSystemPlayer, House(0.5, 0.1, 1))
+
+    def test_losing_streak_distribution(self):
+        engine = MarkovEngine(MartingaleSystemPlayer, House(0.5, 0, 1))
+        distribution = engine.losing_streak_distribution()
+        self.assertAlmostEqual(1, sum(distribution.values()))
+        self.assertAlmostEqual(0.5, distribution[0])
+
+    def test_max_losing_streak_distribution(self):
+        distribution = max_losing_streak_distribution(House(0.6, 0.1, 1), 500, 20)
+        self.assertAlmostEqual(1, distribution.sum())
+        self.assertAlmostEqual(0, distribution[0])
@@ -0,0 +1,56 @@
+import json
+import os
+import pickle
+import tempfile
+from functools import partial
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator import lockstep
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.casino import simulate_and_save
+from betting_simulator.metrics import AttemptMetrics, payload_bytes
+
+
+class TestAttemptMetrics(TestCase):
+    def test_payload_bytes(self):
+        balance_accumulator = BalanceAccumulator()
+        balance_accumulator.add_trajectory(np.arange(10_000, dtype=np.float64))
+        # an estimate from the arrays, short by the ~600 bytes of names and framing
+        # pickle adds however long the arrays are
+        pickled = len(pickle.dumps(balance_accumulator, protocol=5))
+        self.assertAlmostEqual(pickled, payload_bytes(balance_accumulator), delta=1_000)
+        self.assertLess(payload_bytes(balance_accumulator), pickled)
+
+    def test_simulate_and_save(self):
+        metrics = AttemptMetrics(attempt=1)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                simulate_and_save(
+                    {},
+                    {},
+                    partial(lockstep.simulate_martingale_system_player, game_size=300),
+                    1,
+                    "Martingale system player",
+                    metrics,
+                    repetition=2,
+                )
+                metrics.emit(os.path.join("metrics", "metrics.jsonl"))
+                with open(os.path.join("metrics", "metrics.jsonl")) as file:
+                    record = json.loads(file.readline())
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(1, record["attempt"])
+        self.assertEqual(
+            {"simulate", "metrics", "aggregate", "write_results", "write_balances"},
+            set(record["stages"]),
+        )
+        self.assertEqual(600, record["players"])
+        self.assertLessEqual(record["games_simulated"], 600 * 300)
+        self.assertGreater(record["players_broke_early"], 0)
+        self.assertGreater(record["bytes_from_workers"], 0)
+        self.assertGreater(record["worker_cpu_seconds"], 0)
+        self.assertGreater(record["peak_rss_bytes"], 0)
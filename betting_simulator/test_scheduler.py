@@ -0,0 +1,253 @@
+import csv
+import glob
+import os
+import tempfile
+from unittest import TestCase
+
+from betting_simulator.casino import MartingaleSystemPlayer, SteadyOnePlayer
+from betting_simulator.scheduler import SweepScheduler, SweepTask, _run_task
+
+PLAYER_NAMES = [MartingaleSystemPlayer().name, SteadyOnePlayer().name]
+
+
+def sweep_scheduler(**kwargs) -> SweepScheduler:
+    return SweepScheduler(
+        **{
+            "player_names": PLAYER_NAMES,
+            "rois": [1],
+            "win_rates": [0.5, 0.6],
+            "players_per_rate": 20,
+            "players_per_task": 10,
+            "game_size": 200,
+            "workers": 2,
+            "root_seed": 7,
+            **kwargs,
+        }
+    )
+
+
+def aggregates(scheduler: SweepScheduler) -> dict:
+    # every running total of the scheduler as plain values
+    values = {}
+    for pair, rate_result_summary_dict in scheduler.rate_result_summary_dicts.items():
+        for win_rate, result_summary in rate_result_summary_dict.items():
+            values[(*pair, win_rate)] = (
+                result_summary.sample_size,
+                result_summary.games_played,
+                result_summary.broke,
+                *(
+                    (stats.count, stats.mean, stats.m2, stats.min, stats.max)
+                    for stats in (
+                        result_summary.mvdd,
+                        result_summary.pnl,
+                        result_summary.double_balance_game_length,
+                    )
+                ),
+                scheduler.rate_balance_accumulator_dicts[pair][win_rate].rows(),
+            )
+    return values
+
+
+class InDirectory:
+    # the scheduler writes its CSVs to the working directory
+    def __enter__(self) -> str:
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        return self.directory.name
+
+    def __exit__(self, *_exc_info) -> None:
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+
+class TestSweepScheduler(TestCase):
+    def test_tasks(self):
+        scheduler = sweep_scheduler(players_per_rate=25)
+        tasks = scheduler.tasks(3)
+        # 3 player chunks, the last one short, for every (rate, player name, roi)
+        self.assertEqual(3 * 2 * 2, len(tasks))
+        self.assertEqual({3}, {task.attempt for task in tasks})
+        chunks = sorted(
+            {(task.first_player, task.players) for task in tasks}, key=lambda c: c[0]
+        )
+        self.assertEqual([(0, 10), (10, 10), (20, 5)], chunks)
+        scheduler.completed_attempts = {(PLAYER_NAMES[0], 1): 2}
+        pending = list(scheduler._pending(2))
+        self.assertEqual(2 * 3 * 2, len(pending))
+        self.assertEqual({PLAYER_NAMES[1]}, {task.player_name for task in pending})
+        self.assertIsInstance(pending[0], SweepTask)
+
+    def test_run(self):
+        with InDirectory():
+            scheduler = sweep_scheduler()
+            report = scheduler.run(attempts=2)
+            self.assertEqual(
+                {(player_name, 1): 2 for player_name in PLAYER_NAMES},
+                scheduler.completed_attempts,
+            )
+            self.assertEqual(2 * 2 * 2 * 2, report["tasks"])
+            self.assertEqual(
+                {
+                    "tasks",
+                    "elapsed",
+                    "tasks_per_sec",
+                    "utilization",
+                    "mean_utilization",
+                },
+                set(report),
+            )
+            for player_name in PLAYER_NAMES:
+                result_summary = scheduler.rate_result_summary_dicts[(player_name, 1)][
+                    0.6
+                ]
+                self.assertEqual(2 * 20, result_summary.sample_size)
+                (filename,) = glob.glob(
+                    f"*_{player_name.replace(' ', '_')}_rate_50-80_roi_1.csv"
+                )
+                with open(filename) as file:
+                    rows = list(csv.DictReader(file))
+                self.assertEqual([0.5, 0.6], [float(row["rate"]) for row in rows])
+                self.assertEqual({"40"}, {row["sample_size"] for row in rows})
+                balance_filenames = glob.glob(
+                    os.path.join(
+                        "game_balances",
+                        "*",
+                        f"*_{player_name.replace(' ', '_')}_rate_*_roi_1_game_balances.csv",
+                    )
+                )
+                self.assertEqual(2, len(balance_filenames))
+            first = aggregates(scheduler)
+
+        with InDirectory():
+            scheduler = sweep_scheduler()
+            scheduler.run(attempts=2)
+            self.assertEqual(first, aggregates(scheduler))
+
+
+class TestSweepCheckpoint(TestCase):
+    def test_resume(self):
+        with InDirectory():
+            scheduler = sweep_scheduler(
+                checkpoint_path=os.path.join("checkpoints", "sweep.checkpoint"),
+                checkpoint_every=1,
+            )
+            scheduler.run(attempts=2)
+            # a new process picks the sweep up where the checkpoint left it
+            resumed = sweep_scheduler(
+                root_seed=None,
+                checkpoint_path=os.path.join("checkpoints", "sweep.checkpoint"),
+                checkpoint_every=1,
+            )
+            report = resumed.run(attempts=3)
+            self.assertEqual(7, resumed.root_seed)
+            self.assertEqual(2 * 2 * 2, report["tasks"])
+            fresh = sweep_scheduler()
+            fresh.run(attempts=3)
+        self.assertEqual(fresh.completed_attempts, resumed.completed_attempts)
+        self.assertEqual(aggregates(fresh), aggregates(resumed))
+
+    def test_checkpoint_after_several_attempts(self):
+        with InDirectory():
+            scheduler = sweep_scheduler(
+                player_names=PLAYER_NAMES[:1],
+                win_rates=[0.5],
+                players_per_rate=10,
+                checkpoint_path="sweep.checkpoint",
+                checkpoint_every=2,
+            )
+            pair = (PLAYER_NAMES[0], 1)
+            scheduler.completed_attempts = {pair: 1}
+            scheduler._checkpointed_attempt = 1
+            attempt_states = {}
+            (task_3,) = scheduler.tasks(3)
+            (task_2,) = scheduler.tasks(2)
+            scheduler._collect(_run_task(task_3, 200, 7), attempt_states, 1)
+            self.assertFalse(os.path.exists("sweep.checkpoint"))
+            # attempts 2 and 3 complete together, 3 is past the checkpoint at 2
+            scheduler._collect(_run_task(task_2, 200, 7), attempt_states, 1)
+            self.assertEqual({pair: 3}, scheduler.completed_attempts)
+            self.assertEqual(3, scheduler._checkpointed_attempt)
+            self.assertTrue(os.path.exists("sweep.checkpoint"))
+
+    def test_merge(self):
+        with InDirectory():
+            scheduler = sweep_scheduler(checkpoint_path="seed_7.checkpoint")
+            scheduler.run(attempts=1)
+            with self.assertRaises(Exception):
+                sweep_scheduler().merge("seed_7.checkpoint")
+            # a run of other games or rates doesn't add up with this one
+            for config in ({"game_size": 100}, {"win_rates": [0.5, 0.7]}):
+                with self.assertRaises(Exception):
+                    sweep_scheduler(root_seed=8, **config).merge("seed_7.checkpoint")
+            other = sweep_scheduler(root_seed=8)
+            other.run(attempts=1)
+            pnl_means = {
+                (*pair, win_rate): result_summary.pnl.mean
+                for pair, rate_result_summary_dict in other.rate_result_summary_dicts.items()
+                for win_rate, result_summary in rate_result_summary_dict.items()
+            }
+            other.merge("seed_7.checkpoint")
+        self.assertEqual(
+            {(player_name, 1): 2 for player_name in PLAYER_NAMES},
+            other.completed_attempts,
+        )
+        for pair, rate_result_summary_dict in other.rate_result_summary_dicts.items():
+            for win_rate, result_summary in rate_result_summary_dict.items():
+                own = scheduler.rate_result_summary_dicts[pair][win_rate]
+                self.assertEqual(2 * 20, result_summary.sample_size)
+                self.assertEqual(
+                    2 * 20,
+                    other.rate_balance_accumulator_dicts[pair][win_rate].count[0],
+                )
+                self.assertAlmostEqual(
+                    (own.pnl.mean + pnl_means[(*pair, win_rate)]) / 2,
+                    result_summary.pnl.mean,
+                )
+
+
+class TestAdaptiveSweep(TestCase):
+    def test_run_adaptive(self):
+        with InDirectory():
+            scheduler = sweep_scheduler(win_rates=[0.5], tasks_in_flight=2)
+            # steady one's pnl spreads ~14%, the martingale's ~115%: only the
+            # first gets within 5 before the 200 player cap
+            report = scheduler.run_adaptive(
+                min_players=20,
+                max_players=200,
+                relative_precision=0.01,
+                absolute_precision=5,
+            )
+            rows = {}
+            for player_name in PLAYER_NAMES:
+                (filename,) = glob.glob(
+                    f"*_{player_name.replace(' ', '_')}_rate_50-80_roi_1.csv"
+                )
+                with open(filename) as file:
+                    (rows[player_name],) = list(csv.DictReader(file))
+        martingale, steady_one = (
+            scheduler.rate_result_summary_dicts[(player_name, 1)][0.5]
+            for player_name in PLAYER_NAMES
+        )
+        self.assertEqual(200, martingale.sample_size)
+        self.assertLess(steady_one.sample_size, 100)
+        self.assertGreaterEqual(steady_one.sample_size, 20)
+        self.assertLessEqual(
+            scheduler.precision((PLAYER_NAMES[1], 1, 0.5), 0.01, 5, 0.95), 1
+        )
+        self.assertEqual([(PLAYER_NAMES[0], 1, 0.5)], report["unconverged"])
+        for player_name, result_summary in zip(PLAYER_NAMES, (martingale, steady_one)):
+            row = rows[player_name]
+            self.assertEqual(str(result_summary.sample_size), row["sample_size"])
+            self.assertAlmostEqual(
+                result_summary.pnl.confidence_interval(),
+                float(row["pnl_mean_ci"]),
+                places=4,
+            )
+            self.assertAlmostEqual(
+                result_summary.mvdd.confidence_interval(),
+                float(row["mvdd_mean_ci"]),
+                places=4,
+            )
+        self.assertLessEqual(float(rows[PLAYER_NAMES[1]]["pnl_mean_ci"]), 5)
+        self.assertGreater(float(rows[PLAYER_NAMES[0]]["pnl_mean_ci"]), 5)
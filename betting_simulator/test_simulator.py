@@ -0,0 +1,49 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from betting_simulator import simulator
+
+
+class TestPlaySessions(TestCase):
+    def test_matches_play_games(self):
+        sessions = 40
+        rng = np.random.default_rng(3)
+        # losing streaks often enough that some sessions run out of budget
+        won = rng.random((10_000, sessions)) < 0.45
+        max_bets, broke, wins, losses = simulator.play_sessions(
+            np.split(won, 40), sessions, 400_000, 10_000
+        )
+
+        expected_max_bets = []
+        with patch.dict(simulator.win_records, {True: 0, False: 0}):
+            for session in range(sessions):
+                draws = iter(np.where(won[:, session], 7.5, 2.5).tolist())
+                with patch.object(
+                    simulator.random, "uniform", lambda _a, _b: next(draws)
+                ):
+                    expected_max_bets.append(simulator.play_games(400_000, 0, 0))
+            expected_wins = simulator.win_records[True]
+            expected_losses = simulator.win_records[False]
+
+        self.assertTrue(broke.any())
+        self.assertEqual(
+            expected_max_bets,
+            [
+                None if _broke else max_bet
+                for max_bet, _broke in zip(max_bets.tolist(), broke)
+            ],
+        )
+        self.assertEqual(expected_wins, wins)
+        self.assertEqual(expected_losses, losses)
+
+    def test_play_games_batch(self):
+        result = simulator.play_games_batch(sessions=50, games=2_000, seed=1)
+        self.assertEqual(50, sum(result["max_bets"].values()))
+        self.assertEqual(
+            result, simulator.play_games_batch(sessions=50, games=2_000, seed=1)
+        )
+        split = simulator.play_games_batch(sessions=50, games=2_000, seed=1, workers=2)
+        self.assertEqual(50, sum(split["max_bets"].values()))
+        self.assertEqual({True: 0, False: 0}, simulator.win_records)
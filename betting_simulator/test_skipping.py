@@ -0,0 +1,103 @@
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator import skipping
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    MartingaleSystemStopLossPlayer,
+    SteadyOnePlayer,
+    simulate_games,
+)
+from betting_simulator.skipping import skip_games
+from betting_simulator.trajectory import LOG, Recording
+
+
+class TestSkipGames(TestCase):
+    def test_matches_simulate_games_without_losses(self):
+        # every game a win, through the capped bets too
+        recording = Recording(LOG, points=40)
+        for player_class in (
+            SteadyOnePlayer,
+            MartingaleSystemPlayer,
+            MartingaleSystemStopLossPlayer,
+        ):
+            _, expected, trajectory = simulate_games(
+                3_000, House(1, 0, 1), player_class(1_000_000), recording=recording
+            )
+            _, actual, skipped = skip_games(
+                3_000, House(1, 0, 1), player_class(1_000_000), recording=recording
+            )
+            for field, value in expected.__dict__.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(
+                        value, actual.__dict__[field], delta=abs(value) * 1e-9
+                    )
+                else:
+                    self.assertEqual(value, actual.__dict__[field], field)
+            np.testing.assert_array_equal(trajectory.indices, skipped.indices)
+            np.testing.assert_allclose(trajectory.balances, skipped.balances)
+
+    def test_matches_simulate_games_in_distribution(self):
+        # the fields the skipping tables compute, per player
+        fields = {
+            "games_played": lambda player: player.games_played,
+            "balance": lambda player: player.balance,
+            "mvdd": lambda player: player.max_value_draw_down_pcnt,
+            "doubles": lambda player: len(player.double_balance_game_lengths),
+            "max_losing_streak": lambda player: player.max_losing_streak,
+        }
+        for player_class, win_rate, tie_rate in (
+            (SteadyOnePlayer, 0.47, 0.1),
+            (MartingaleSystemPlayer, 0.5, 0),
+            (MartingaleSystemStopLossPlayer, 0.5, 0),
+        ):
+            players = []
+            for simulate, seed in ((simulate_games, 0), (skip_games, 1_000)):
+                players.append(
+                    [
+                        simulate(
+                            600,
+                            House(
+                                win_rate,
+                                tie_rate,
+                                1,
+                                rng=np.random.default_rng(seed + i),
+                            ),
+                            player_class(1_000_000),
+                        )[1]
+                        for i in range(0, 300)
+                    ]
+                )
+            for field, value in fields.items():
+                expected, actual = (
+                    np.array([value(player) for player in _players], dtype=np.float64)
+                    for _players in players
+                )
+                error = np.sqrt((expected.var() + actual.var()) / 300)
+                self.assertAlmostEqual(
+                    expected.mean(),
+                    actual.mean(),
+                    delta=max(4 * error, 1e-9 * abs(expected.mean())),
+                    msg=f"{player_class.__name__} {field}",
+                )
+
+    def test_balance_accumulator(self):
+        balance_accumulator = BalanceAccumulator()
+        simulations = skipping.simulate_martingale_stoploss_player(
+            0.55,
+            game_size=5_000,
+            repetition=6,
+            balance_accumulator=balance_accumulator,
+            root_seed=3,
+            recording=Recording(LOG, points=30),
+        )
+        self.assertEqual(6, len(simulations))
+        self.assertEqual(6, balance_accumulator.count[0])
+        self.assertEqual(1_000_000, balance_accumulator.mean[0])
+
+    def test_rejects_ties_in_progressions(self):
+        with self.assertRaises(Exception):
+            skip_games(100, House(0.5, 0.1, 1), MartingaleSystemPlayer(1_000_000))
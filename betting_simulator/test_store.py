@@ -0,0 +1,109 @@
+import os
+import tempfile
+from functools import partial
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator import casino
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.store import create_store, open_store
+from betting_simulator.trajectory import LOG, Recording
+
+
+class TestTrajectoryStore(TestCase):
+    def test_writer_matches_simulate_games(self):
+        recording = Recording(LOG, points=50)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trajectories")
+            store = create_store(path, [0.45, 0.5], 8, 300, recording)
+            balance_accumulator = BalanceAccumulator()
+            casino.simulate_martingale_system_player(
+                0.45,
+                game_size=300,
+                repetition=4,
+                balance_accumulator=store.writer(0.45, 4, 4, balance_accumulator),
+                root_seed=1,
+                recording=recording,
+            )
+            store.flush()
+            expected = casino.simulate_martingale_system_player(
+                0.45, game_size=300, repetition=4, root_seed=1, recording=recording
+            )
+            stored = open_store(path)
+            for player, (_house, _player, trajectory) in enumerate(expected):
+                from_disk = stored.trajectory(0.45, 4 + player)
+                np.testing.assert_array_equal(trajectory.indices, from_disk.indices)
+                np.testing.assert_array_equal(trajectory.balances, from_disk.balances)
+            # broke players are shorter, untouched rows stay empty
+            self.assertLess(stored.lengths[0, 4:].min(), len(stored.indices))
+            self.assertEqual(0, stored.lengths[0, :4].max())
+            self.assertEqual(0, stored.lengths[1].max())
+            np.testing.assert_allclose(
+                stored.balances[0, 4:, 0].mean(), balance_accumulator.mean[0]
+            )
+            with self.assertRaises(Exception):
+                store.writer(0.45, 6, 4)
+
+    def test_simulate_and_save(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                win_rates = [0.5 + (0.01 * x) for x in range(0, 30)]
+                store = create_store("trajectories", win_rates, 20, 50)
+                rate_balance_accumulator_dict = {}
+                casino.simulate_and_save(
+                    rate_balance_accumulator_dict,
+                    {},
+                    partial(casino.simulate_steady_one_player, game_size=50),
+                    1,
+                    "Steady one player",
+                    trajectory_store=store,
+                    repetition=2,
+                )
+                stored = open_store("trajectories")
+                self.assertEqual(51, stored.lengths.min())
+                rate = win_rates[7]
+                np.testing.assert_allclose(
+                    stored.balances[stored.rate_index(rate)].mean(axis=0),
+                    rate_balance_accumulator_dict[rate].mean,
+                )
+            finally:
+                os.chdir(cwd)
+
+    def test_simulate_multiple_rates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            win_rates = [0.5 + (0.01 * x) for x in range(0, 30)]
+            store = create_store(
+                os.path.join(directory, "trajectories"), win_rates, 30, 40
+            )
+            simulation_results = casino.simulate_multiple_rates(
+                partial(casino.simulate_steady_one_player, game_size=40),
+                trajectory_store=store,
+                repetition=3,
+                root_seed=3,
+                attempt=2,
+            )
+            stored = open_store(os.path.join(directory, "trajectories"))
+            self.assertEqual(41, stored.lengths.min())
+            result_summaries = {}
+            for win_rate, result_summary, _balance_accumulator in simulation_results:
+                result_summaries[win_rate] = result_summary.merge(
+                    result_summaries.get(win_rate, casino.ResultSummary())
+                )
+            self.assertEqual({30}, {r.sample_size for r in result_summaries.values()})
+            # every row holds the player of that number, whichever block played it
+            for player in (0, 4, 29):
+                _house, _player, balances = casino.replay_player(
+                    casino.SteadyOnePlayer, 3, 1, win_rates[5], 2, player, game_size=40
+                )
+                np.testing.assert_array_equal(
+                    balances, stored.trajectory(win_rates[5], player).balances
+                )
+            with self.assertRaises(Exception):
+                casino.simulate_multiple_rates(
+                    casino.simulate_steady_one_player,
+                    trajectory_store=store,
+                    repetition=4,
+                )
@@ -0,0 +1,114 @@
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator.aggregates import BalanceAccumulator
+from betting_simulator.casino import (
+    House,
+    MartingaleSystemPlayer,
+    SteadyOnePlayer,
+    simulate_games,
+)
+from betting_simulator.lockstep import simulate_lockstep
+from betting_simulator.trajectory import EVENTS, EVERY, LOG, OFF, Recording
+
+
+def _house(seed: int):
+    return House(0.5, 0, 1, rng=np.random.default_rng(seed))
+
+
+class TestRecording(TestCase):
+    def setUp(self):
+        self.full = [
+            simulate_games(5_000, _house(seed), MartingaleSystemPlayer(1_000_000))
+            for seed in range(0, 5)
+        ]
+
+    def test_grids(self):
+        for recording in (Recording(EVERY, every=7), Recording(LOG, points=50)):
+            for seed, (_, expected, balances) in enumerate(self.full):
+                _, player, trajectory = simulate_games(
+                    5_000,
+                    _house(seed),
+                    MartingaleSystemPlayer(1_000_000),
+                    None,
+                    recording,
+                )
+                self.assertEqual(expected.__dict__, player.__dict__)
+                self.assertEqual(0, trajectory.indices[0])
+                self.assertLessEqual(trajectory.indices[-1], player.games_played)
+                self.assertEqual(
+                    list(np.array(balances)[trajectory.indices]),
+                    list(trajectory.balances),
+                )
+
+    def test_events(self):
+        events = 0
+        games = 0
+        for seed in range(0, 5):
+            _, expected, balances = simulate_games(
+                5_000, _house(seed), SteadyOnePlayer(1_000_000)
+            )
+            _, player, trajectory = simulate_games(
+                5_000, _house(seed), SteadyOnePlayer(1_000_000), None, Recording(EVENTS)
+            )
+            self.assertEqual(expected.__dict__, player.__dict__)
+            self.assertEqual(
+                [0, player.games_played],
+                [trajectory.indices[0], trajectory.indices[-1]],
+            )
+            self.assertEqual(
+                list(np.array(balances)[trajectory.indices]), list(trajectory.balances)
+            )
+            events += len(trajectory.indices)
+            games += len(balances)
+        self.assertLess(events, games / 10)
+
+    def test_off(self):
+        _, player, trajectory = simulate_games(
+            5_000, _house(0), MartingaleSystemPlayer(1_000_000), None, Recording(OFF)
+        )
+        self.assertIsNone(trajectory)
+        self.assertEqual(self.full[0][1].__dict__, player.__dict__)
+
+    def test_lockstep_on_grid(self):
+        recording = Recording(LOG, points=100)
+        expected = BalanceAccumulator()
+        objects = [
+            simulate_games(
+                3_000, _house(seed), SteadyOnePlayer(1_000_000), None, recording
+            )
+            for seed in range(0, 6)
+        ]
+        for _, _, trajectory in objects:
+            expected.use_grid(recording.grid(3_000))
+            expected.add_trajectory(trajectory.balances)
+        vectorized = simulate_lockstep(
+            SteadyOnePlayer,
+            [_house(seed) for seed in range(0, 6)],
+            3_000,
+            recording=recording,
+        )
+        for (_, p1, t1), (_, p2, t2) in zip(objects, vectorized):
+            self.assertEqual(p1.__dict__, p2.__dict__)
+            self.assertEqual(list(t1.indices), list(t2.indices))
+            self.assertEqual(list(t1.balances), list(t2.balances))
+        accumulator = BalanceAccumulator()
+        simulate_lockstep(
+            SteadyOnePlayer,
+            [_house(seed) for seed in range(0, 6)],
+            3_000,
+            balance_accumulator=accumulator,
+            recording=recording,
+        )
+        rows = accumulator.rows()
+        self.assertEqual(
+            recording.grid(3_000)[: len(rows)].tolist(), [r["index"] for r in rows]
+        )
+        for row, expected_row in zip(rows, expected.rows()):
+            self.assertEqual(expected_row["index"], row["index"])
+            self.assertAlmostEqual(expected_row["mean"], row["mean"])
+        full = BalanceAccumulator()
+        full.add_trajectory(self.full[0][2])
+        with self.assertRaises(Exception):
+            accumulator.merge(full)
@@ -0,0 +1,84 @@
+import csv
+import glob
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from betting_simulator.aggregates import BALANCE_FIELDS, BalanceAccumulator
+from betting_simulator.casino import save_game_balances
+from betting_simulator.writer import BackgroundWriter
+
+
+def _fail():
+    raise Exception("disk full")
+
+
+class TestBackgroundWriter(TestCase):
+    def test_submit_and_failures(self):
+        written = []
+        with BackgroundWriter(max_pending=1) as writer:
+            for i in range(0, 5):
+                writer.submit(written.append, i)
+        self.assertEqual([0, 1, 2, 3, 4], written)
+        writer = BackgroundWriter()
+        writer.submit(_fail)
+        with self.assertRaises(Exception):
+            writer.close()
+
+
+class TestSaveGameBalances(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.rate_balance_accumulator_dict = {}
+        for rate in (0.5, 0.51):
+            # sketches at games 0, 1, 2, 3, 4, 5, 8, 12, 18 and 28
+            balance_accumulator = BalanceAccumulator(sketch_points=10)
+            balance_accumulator.use_grid(None, 28)
+            for _ in range(0, 20):
+                balance_accumulator.add_trajectory(
+                    rng.normal(100, 10, size=rng.integers(1, 30))
+                )
+            self.rate_balance_accumulator_dict[rate] = balance_accumulator
+
+    def test_csv_and_npz(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                with BackgroundWriter() as writer:
+                    for balance_format in ("csv", "npz"):
+                        save_game_balances(
+                            self.rate_balance_accumulator_dict,
+                            "Steady one player",
+                            1,
+                            balance_format,
+                            writer,
+                        )
+                    # the snapshot was taken, later merges don't reach the files
+                    self.rate_balance_accumulator_dict[0.5].add_trajectory([1e9])
+                csv_paths = sorted(
+                    glob.glob(os.path.join("game_balances", "*", "*.csv"))
+                )
+                (csv_path,) = [path for path in csv_paths if "rate_0.5_" in path]
+                with open(csv_path) as file:
+                    rows = list(csv.DictReader(file))
+                (npz_path,) = glob.glob(os.path.join("game_balances", "*", "*.npz"))
+                with np.load(npz_path) as npz:
+                    columns = {field: npz[field] for field in npz.files}
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(2, len(csv_paths))
+        self.assertEqual(BALANCE_FIELDS, list(rows[0]))
+        self.assertEqual("", rows[6]["p50"])
+        np.testing.assert_allclose(0.5, columns["rates"][0])
+        start, end = columns["offsets"][:2]
+        self.assertEqual(len(rows), end - start)
+        for field in ("index", "min", "max", "mean", "std"):
+            np.testing.assert_allclose(
+                [float(row[field]) for row in rows], columns[field][start:end]
+            )
+        self.assertTrue(np.isnan(columns["p50"][6]))
+        self.assertLess(columns["max"][0], 1e9)
+        self.assertEqual(0.51, columns["rate"][-1])
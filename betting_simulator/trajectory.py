@@ -0,0 +1,64 @@
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# what simulate_games keeps of a balance trajectory
+OFF = "off"  # nothing, only the final player state
+EVERY = "every"  # games 0, k, 2k, ...
+LOG = "log"  # log-spaced games, dense early and sparse late
+EVENTS = "events"  # start, every new max, every new max draw down, broke and end
+
+
+class Recording(NamedTuple):
+    mode: str = EVERY
+    every: int = 1
+    points: int = 1_000
+
+    def grid(self, game_size: int) -> Optional[np.ndarray]:
+        # game indices recorded for every player, None when they differ per player;
+        # one shared read-only array per (recording, game size)
+        return _grid(self, game_size)
+
+
+@lru_cache(maxsize=64)
+def _grid(recording: Recording, game_size: int) -> Optional[np.ndarray]:
+    if recording.mode == EVERY:
+        grid = np.arange(0, game_size + 1, recording.every, dtype=np.int64)
+    elif recording.mode == LOG:
+        grid = np.unique(
+            np.concatenate(
+                [
+                    [0],
+                    np.round(np.geomspace(1, game_size, recording.points)).astype(
+                        np.int64
+                    ),
+                ]
+            )
+        )
+    elif recording.mode in (OFF, EVENTS):
+        return None
+    else:
+        raise Exception(f"unknown recording mode {recording.mode}")
+    grid.flags.writeable = False
+    return grid
+
+
+class Trajectory(NamedTuple):
+    indices: np.ndarray
+    balances: np.ndarray
+
+
+class GridObserver:
+    # lockstep observer that forwards only the games on the grid, with their
+    # position on it as the index
+    def __init__(self, grid: np.ndarray, observer) -> None:
+        self.grid: list = grid.tolist()
+        self.observer = observer
+        self._position: int = 0
+
+    def __call__(self, index: int, ids: np.ndarray, balances: np.ndarray) -> None:
+        if self._position >= len(self.grid) or index != self.grid[self._position]:
+            return
+        self.observer(self._position, ids, balances)
+        self._position += 1
@@ -0,0 +1,44 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class BackgroundWriter:
+    # one writer thread, so the parent hands output over and goes back to the next
+    # attempt; a failed write raises on a later submit, wait or close
+    def __init__(self, max_pending: int = 2) -> None:
+        self.max_pending: int = max_pending
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="writer"
+        )
+        self._pending: list = []
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def submit(self, func, *args) -> Future:
+        self._pending = [future for future in self._pending if not self._done(future)]
+        # writes falling behind hold snapshots in memory, wait for the oldest
+        while len(self._pending) >= self.max_pending:
+            self._pending.pop(0).result()
+        future = self._executor.submit(func, *args)
+        self._pending.append(future)
+        return future
+
+    @staticmethod
+    def _done(future: Future) -> bool:
+        if not future.done():
+            return False
+        future.result()
+        return True
+
+    def wait(self) -> None:
+        while self._pending:
+            self._pending.pop(0).result()
+
+    def close(self) -> None:
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown()
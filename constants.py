@@ -6,6 +6,7 @@ PWD = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.p
 
 INPUT_DIRECTORY = os.path.join(PWD, 'input')
 OUTPUT_DIRECTORY = os.path.join(PWD, 'output')
+EXCEL_CACHE_DIRECTORY = os.path.join(OUTPUT_DIRECTORY, 'excel_cache')
 
 OUTPUT_FILE_NAME = 'packet_input.xlsx'
 OUTPUT_FILE_PATH = os.path.join(OUTPUT_DIRECTORY, OUTPUT_FILE_NAME)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import contextlib
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from constants import EXCEL_CACHE_DIRECTORY
+
+META_FILE_NAME = 'meta.json'
+
+
+def read_excel(filename: str, sheet_name=0) -> pd.DataFrame:
+    # pd.read_excel with default options, served from a pickled snapshot of the sheet
+    # while the workbook's path, mtime, size and content hash are unchanged
+    filename = os.path.abspath(filename)
+    directory = os.path.join(EXCEL_CACHE_DIRECTORY, _digest(filename.encode('utf-8'))[:16])
+    content_hash = _content_hash(filename, directory)
+    snapshot = os.path.join(directory, f'{content_hash[:16]}-{_digest(repr(sheet_name).encode("utf-8"))[:12]}.pkl')
+    if os.path.exists(snapshot):
+        try:
+            return pd.read_pickle(snapshot)
+        except Exception:
+            # truncated, or pickled by another pandas; parsed again below
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(snapshot)
+    df = pd.read_excel(filename, sheet_name=sheet_name)
+    _replace(snapshot, lambda path: pd.to_pickle(_consolidated(df), path))
+    return df
+
+
+def _consolidated(df):
+    # copying consolidates the per column blocks read_excel builds, which pickle slowly;
+    # sheet_name None or a list reads a dict of sheets
+    if isinstance(df, dict):
+        return {name: sheet.copy() for name, sheet in df.items()}
+    return df.copy()
+
+
+def _content_hash(filename: str, directory: str) -> str:
+    stat = os.stat(filename)
+    meta_path = os.path.join(directory, META_FILE_NAME)
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as file:
+            meta = json.load(file)
+        # the file was not touched, skip hashing it
+        if meta['path'] == filename and meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+            return meta['sha256']
+    sha256 = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha256.update(chunk)
+    content_hash = sha256.hexdigest()
+    if meta is not None and meta['sha256'] != content_hash:
+        # snapshots of the previous contents are never read again; the other sheets of
+        # the workbook may be removing them in parallel processes too
+        for name in os.listdir(directory):
+            if name.startswith(meta['sha256'][:16]):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(directory, name))
+    os.makedirs(directory, exist_ok=True)
+    meta = {'path': filename, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': content_hash}
+    _replace(meta_path, lambda path: _write_json(path, meta))
+    return content_hash
+
+
+def _write_json(path: str, data: dict):
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+
+
+def _replace(path: str, write):
+    # readers in other processes see the old file or the whole new one
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
@@ -1,4 +1,5 @@
 import constants
+import excel_cache
 import os
 
 from packet_composer.packet import Packet
@@ -7,7 +8,7 @@ import pandas as pd
 
 
 def extract_packets_info_from_file(_filename: str):
-    _df = pd.read_excel(os.path.join(constants.INPUT_DIRECTORY, _filename))
+    _df = excel_cache.read_excel(os.path.join(constants.INPUT_DIRECTORY, _filename))
     class_name_col = 'className'
     field_name_col = 'fieldName'
     value_col = 'value'
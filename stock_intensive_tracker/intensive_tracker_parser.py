@@ -1,73 +1,119 @@
+from concurrent.futures import ProcessPoolExecutor
 from constants import *
 from datetime import datetime
-from stock_intensive_tracker.stock_summary import StockSummary
+from excel_cache import read_excel
+from stock_intensive_tracker.stock_summary import StockSummaries
+import glob
+import numpy as np
 import os
 import pandas as pd
 
 
-def parse():
-    filename = os.path.join(INPUT_DIRECTORY, 'intensive tracker.xlsx')
-    stock_summaries = list()
-    print(f'parsing commencing...')
-    xls = pd.ExcelFile(filename)
-    vols = parse_sheet(xls, sheet_name='Vol')
-    pxs = parse_sheet(xls, sheet_name='Px')
-    perfs = parse_sheet(xls, sheet_name='Perf')
-    trades = parse_sheet(xls, sheet_name='Trade')
-    print(f'parsing complete.')
-    dates = set()
-    stock_codes = set()
-    for key in vols:
-        d = key.split('|')
-        stock_code = str(d[0])
-        if stock_code.isnumeric():
-            stock_codes.add(stock_code)
-        date_str = d[1]
-        if date_str != 'default':
-            date = datetime.strptime(date_str, '%Y-%m-%d')
-            dates.add(date)
-    print(f'stock codes[{len(stock_codes)}] and dates[{len(dates)}] extracted')
-    for stock_code in stock_codes:
-        for date in dates:
-            date_str = datetime.strftime(date, '%Y-%m-%d')
-            key = f'{stock_code}|{date_str}'
-            volume = vols.get(key)
-            px = pxs.get(key)
-            perf = perfs.get(key)
-            trade = trades.get(key)
-            stock_summary = StockSummary(stock_code=stock_code, date=date, volume=volume, price=px, performance=perf, trade=trade)
-            stock_summaries.append(stock_summary)
-
-    return stock_summaries
-
-
-def parse_sheet(filename, sheet_name) -> dict:
-    df = pd.read_excel(filename, sheet_name=sheet_name)
-    stock_codes = set()
-    for col in df.columns:
-        col_name = str(col)
-        if col and col_name.isnumeric():
-            stock_codes.add(col)
-
-    result = dict()
-    for index, row in df.iterrows():
-        timestamp = row.iloc[0]
-        target_date_str = 'default'
-        if isinstance(timestamp, datetime):
-            target_date_str = timestamp.strftime('%Y-%m-%d')
-        for col in stock_codes:
-            value = row.get(str(col))
-            if not pd.isnull(value):
-                key = f'{col}|{target_date_str}'
-                result[key] = value
-    return result
+SHEET_COLUMNS = {'Vol': 'volume', 'Px': 'price', 'Perf': 'performance', 'Trade': 'trade'}
+# volume, price and trade must be whole numbers on the sheets, a fractional one is
+# rejected rather than rounded
+COLUMN_DTYPES = {'volume': 'Int64', 'price': 'Int64', 'performance': 'float64', 'trade': 'Int64'}
+
+
+def parse(filename=None) -> StockSummaries:
+    filename = filename or os.path.join(INPUT_DIRECTORY, 'intensive tracker.xlsx')
+    return summarize(load(filename))
+
+
+def iter_summaries(filename=None):
+    # StockSummary objects are made one at a time as they are consumed
+    yield from parse(filename)
+
+
+def summarize(tracker: pd.DataFrame) -> StockSummaries:
+    # only the (stock_code, date) rows the sheets have values for
+    codes, stock_codes = pd.factorize(tracker.index.get_level_values('stock_code'), sort=True)
+    dates = tracker.index.get_level_values('date').to_numpy(dtype='datetime64[D]')
+    columns = {column: tracker[column].to_numpy(dtype=StockSummaries.DTYPES[column], na_value=0) for column in StockSummaries.COLUMNS}
+    missing = {column: tracker[column].isna().to_numpy() for column in StockSummaries.COLUMNS}
+    return StockSummaries(stock_codes.to_numpy(dtype=str), codes, dates, columns, missing)
+
+
+def load(filename) -> pd.DataFrame:
+    # one row per (stock_code, date) with a value on any of the sheets
+    sheets = {column: load_sheet(filename, sheet_name=sheet_name) for sheet_name, column in SHEET_COLUMNS.items()}
+    return _join(sheets)
+
+
+def load_workbooks(pattern, workers=None) -> pd.DataFrame:
+    # every tracker workbook in a directory or matching a glob, sheets parsed in a process pool;
+    # where workbooks overlap, the later path in sorted order wins, cell by cell, so periods
+    # in the names need zero padding (tracker 2020-07.xlsx, not tracker 2020-7.xlsx)
+    filenames = _workbook_filenames(pattern)
+    tasks = [(filename, sheet_name) for filename in filenames for sheet_name in SHEET_COLUMNS]
+    if workers == 1:
+        sheets = [load_sheet(filename, sheet_name) for filename, sheet_name in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            sheets = list(executor.map(load_sheet, *zip(*tasks)))
+    trackers = []
+    for index in range(0, len(sheets), len(SHEET_COLUMNS)):
+        trackers.append(_join(dict(zip(SHEET_COLUMNS.values(), sheets[index:index + len(SHEET_COLUMNS)]))))
+    tracker = pd.concat(trackers)
+    if len(trackers) > 1:
+        tracker = tracker.groupby(level=tracker.index.names, sort=True).last()
+    return tracker.astype(COLUMN_DTYPES)
+
+
+def _workbook_filenames(pattern) -> list:
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.xlsx')
+    # skip the lock files Excel leaves next to open workbooks, and workbooks that are no
+    # trackers, like the packet input next to them
+    filenames = sorted(filename for filename in glob.glob(pattern)
+                       if not os.path.basename(filename).startswith('~$') and _is_tracker(filename))
+    if not filenames:
+        raise Exception(f'no tracker workbooks found for {pattern}')
+    return filenames
+
+
+def _is_tracker(filename) -> bool:
+    with pd.ExcelFile(filename) as xls:
+        return set(SHEET_COLUMNS) <= set(xls.sheet_names)
+
+
+def _join(sheets: dict) -> pd.DataFrame:
+    tracker = pd.concat(sheets, axis=1).sort_index()
+    for column, dtype in COLUMN_DTYPES.items():
+        fractional = (tracker[column] % 1).fillna(0) != 0 if dtype == 'Int64' else None
+        if fractional is not None and fractional.any():
+            stock_code, date = fractional.idxmax()
+            raise Exception(f'{column} of stock {stock_code} on {date:%Y-%m-%d} is {tracker[column][(stock_code, date)]}, '
+                            f'expected a whole number')
+    return tracker.astype(COLUMN_DTYPES)
+
+
+def load_sheet(filename, sheet_name) -> pd.Series:
+    df = read_excel(filename, sheet_name=sheet_name)
+    stock_codes = [col for col in df.columns if isinstance(col, str) and col.isnumeric()]
+    # rows without a date in the first column have no place in the (stock_code, date) index
+    timestamps = df.iloc[:, 0]
+    dated = timestamps.map(lambda timestamp: isinstance(timestamp, datetime)).to_numpy(dtype=bool)
+    # one float block instead of a block per stock column
+    sheet = pd.DataFrame(df[stock_codes].to_numpy(dtype=np.float64)[dated],
+                         index=pd.DatetimeIndex(timestamps[dated], name='date').normalize(),
+                         columns=pd.Index(stock_codes, name='stock_code'))
+    sheet = sheet[sheet.index.notna()]
+    if sheet.index.has_duplicates:
+        # a later row for the same date wins, cell by cell
+        sheet = sheet.groupby(level='date', sort=False).last()
+    values = sheet.stack().dropna()
+    return values.swaplevel().sort_index()
 
 
 def extract_value_from_series(row: pd.Series, column_name):
     return row[column_name]
 
 
-summaries = parse()
-
-for summary in summaries:
-    print(summary)
+if __name__ == '__main__':
+    print(f'parsing commencing...')
+    stock_summaries = parse()
+    print(f'parsing complete.')
+    print(f'stock codes[{len(stock_summaries.stock_codes)}] and dates[{len(np.unique(stock_summaries.dates))}] extracted')
+    for summary in stock_summaries:
+        print(summary)
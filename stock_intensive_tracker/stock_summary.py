@@ -3,8 +3,11 @@ from __future__ import annotations
 from datetime import datetime
 import json
 
+import numpy as np
+
 
 class StockSummary:
+    __slots__ = ('stock_code', 'date', 'volume', 'price', 'performance', 'trade')
 
     def __init__(self, stock_code: str, date: datetime, volume: int, price: int, performance: float, trade: int):
         self.stock_code: str = stock_code
@@ -19,4 +22,64 @@ class StockSummary:
                f'price={self.price}, performance={self.performance}, trade={self.trade})'
 
     def toJSON(self):
-        return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True, indent=4)
+        return json.dumps(self, default=_json_default, sort_keys=True, indent=4)
+
+
+def _json_default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return {slot: getattr(o, slot) for slot in o.__slots__}
+
+
+class StockSummaries:
+    # struct of arrays, one row per (stock_code, date) with any data; stock codes are
+    # stored once and rows point into them, missing values are masked
+    COLUMNS = ('volume', 'price', 'performance', 'trade')
+    DTYPES = {'volume': np.int64, 'price': np.int64, 'performance': np.float64, 'trade': np.int64}
+
+    def __init__(self, stock_codes: np.ndarray, codes: np.ndarray, dates: np.ndarray, columns: dict, missing: dict):
+        self.stock_codes: np.ndarray = np.asarray(stock_codes, dtype=str)
+        self.codes: np.ndarray = np.asarray(codes, dtype=np.int32)
+        self.dates: np.ndarray = np.asarray(dates, dtype='datetime64[D]')
+        self.columns: dict = {column: np.asarray(columns[column], dtype=self.DTYPES[column]) for column in self.COLUMNS}
+        self.missing: dict = {column: np.asarray(missing[column], dtype=bool) for column in self.COLUMNS}
+        for array in (self.dates, *self.columns.values(), *self.missing.values()):
+            if len(array) != len(self.codes):
+                raise Exception(f'columns of {len(array)} rows do not match {len(self.codes)} stock codes')
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, item):
+        # an int is one StockSummary, a slice, index or mask array another StockSummaries
+        if isinstance(item, (int, np.integer)):
+            return self._summary(item)
+        return StockSummaries(self.stock_codes, self.codes[item], self.dates[item],
+                              {column: values[item] for column, values in self.columns.items()},
+                              {column: missing[item] for column, missing in self.missing.items()})
+
+    def __iter__(self):
+        stock_codes = self.stock_codes.tolist()
+        dates = self.dates.astype('datetime64[us]').tolist()
+        columns = [self.column(column) for column in self.COLUMNS]
+        for code, date, volume, price, performance, trade in zip(self.codes.tolist(), dates, *columns):
+            yield StockSummary(stock_codes[code], date, volume, price, performance, trade)
+
+    def _summary(self, index: int) -> StockSummary:
+        values = [None if self.missing[column][index] else self.columns[column][index].item() for column in self.COLUMNS]
+        return StockSummary(str(self.stock_codes[self.codes[index]]), self.dates[index].astype('datetime64[us]').item(), *values)
+
+    def column(self, column: str) -> list:
+        # python values with None where missing
+        values = self.columns[column].tolist()
+        for index in np.flatnonzero(self.missing[column]).tolist():
+            values[index] = None
+        return values
+
+    def row_stock_codes(self) -> np.ndarray:
+        # the stock code of every row
+        return self.stock_codes[self.codes]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.stock_codes, self.codes, self.dates, *self.columns.values(), *self.missing.values()))
@@ -0,0 +1,90 @@
+from constants import OUTPUT_DIRECTORY
+from stock_intensive_tracker.stock_summary import StockSummaries
+import json
+import numpy as np
+import os
+import sys
+
+JSONL = 'jsonl'
+CSV = 'csv'
+NPZ = 'npz'
+BATCH_SIZE = 65_536
+
+FIELDS = ('stock_code', 'date', *StockSummaries.COLUMNS)
+# rows are filled in from whole columns of tokens, nothing is serialized per object
+JSONL_ROW = '{' + ', '.join(f'"{field}": %s' for field in FIELDS) + '}\n'
+CSV_ROW = ','.join('%s' for _field in FIELDS) + '\n'
+
+
+def iter_batches(stock_summaries: StockSummaries, batch_size: int = BATCH_SIZE):
+    for start in range(0, len(stock_summaries), batch_size):
+        yield stock_summaries[start:start + batch_size]
+
+
+def export(stock_summaries: StockSummaries, path: str, file_format: str = None, batch_size: int = BATCH_SIZE) -> int:
+    # the format follows the file extension unless given
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format == NPZ:
+        save_npz(stock_summaries, path)
+        return len(stock_summaries)
+    if file_format not in (JSONL, CSV):
+        raise Exception(f'unknown export format {file_format}, expected one of {JSONL}, {CSV}, {NPZ}')
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        if file_format == CSV:
+            file.write(CSV_ROW % FIELDS)
+        for batch in iter_batches(stock_summaries, batch_size):
+            file.write(_jsonl_rows(batch) if file_format == JSONL else _csv_rows(batch))
+    return len(stock_summaries)
+
+
+def _jsonl_rows(batch: StockSummaries) -> str:
+    stock_codes = [json.dumps(stock_code) for stock_code in batch.stock_codes.tolist()]
+    return ''.join(map(JSONL_ROW.__mod__, _tokens(batch, stock_codes, '"%s"', 'null')))
+
+
+def _csv_rows(batch: StockSummaries) -> str:
+    stock_codes = [_csv_field(stock_code) for stock_code in batch.stock_codes.tolist()]
+    return ''.join(map(CSV_ROW.__mod__, _tokens(batch, stock_codes, '%s', '')))
+
+
+def _tokens(batch: StockSummaries, stock_codes: list, date_format: str, missing_token: str):
+    # stock codes and dates repeat, so each distinct one is formatted once
+    dates, date_indices = np.unique(batch.dates, return_inverse=True)
+    dates = [date_format % date for date in np.datetime_as_string(dates, unit='D').tolist()]
+    tokens = [np.array(stock_codes, dtype=object)[batch.codes].tolist(), np.array(dates, dtype=object)[date_indices].tolist()]
+    for column in StockSummaries.COLUMNS:
+        # repr of a python float is what json writes too
+        values = list(map(repr, batch.columns[column].tolist()))
+        for index in np.flatnonzero(batch.missing[column]).tolist():
+            values[index] = missing_token
+        tokens.append(values)
+    return zip(*tokens)
+
+
+def _csv_field(value: str) -> str:
+    if any(character in value for character in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def save_npz(stock_summaries: StockSummaries, path: str):
+    # already columnar, the arrays go out as they are; written through a file so savez
+    # doesn't add .npz to a path with another extension
+    with open(path, 'wb') as file:
+        np.savez(file, stock_codes=stock_summaries.stock_codes, codes=stock_summaries.codes, dates=stock_summaries.dates,
+                 **stock_summaries.columns, **{f'{column}_missing': missing for column, missing in stock_summaries.missing.items()})
+
+
+def load_npz(path: str) -> StockSummaries:
+    with np.load(path) as npz:
+        return StockSummaries(npz['stock_codes'], npz['codes'], npz['dates'],
+                              {column: npz[column] for column in StockSummaries.COLUMNS},
+                              {column: npz[f'{column}_missing'] for column in StockSummaries.COLUMNS})
+
+
+if __name__ == '__main__':
+    from stock_intensive_tracker.intensive_tracker_parser import parse
+
+    export_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(OUTPUT_DIRECTORY, 'stock_summaries.jsonl')
+    os.makedirs(os.path.dirname(os.path.abspath(export_path)), exist_ok=True)
+    print(f'exported [{export(parse(), export_path)}] stock summaries to {export_path}')
@@ -0,0 +1,99 @@
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+import contextlib
+import io
+import os
+import tempfile
+
+from openpyxl import Workbook
+import numpy as np
+
+import excel_cache
+from stock_intensive_tracker.intensive_tracker_parser import SHEET_COLUMNS, iter_summaries, load, load_workbooks, parse
+
+
+def write_tracker(filename, rows: list, header: list = None, sheet_names=SHEET_COLUMNS):
+    # every sheet gets the same header and rows, a sheet's values scaled by its position
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for scale, sheet_name in enumerate(sheet_names, start=1):
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append(header or ['Date', '1301', '1302', 1303])
+        for row in rows:
+            worksheet.append([row[0], *(value * scale if isinstance(value, (int, float)) else value for value in row[1:])])
+    workbook.save(filename)
+
+
+class TrackerTestCase(TestCase):
+    # sheets are cached under a temporary directory instead of output/
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = patch.object(excel_cache, 'EXCEL_CACHE_DIRECTORY', os.path.join(self.directory.name, 'excel_cache'))
+        self.cache.start()
+
+    def tearDown(self):
+        self.cache.stop()
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+
+class TestLoad(TrackerTestCase):
+    def test_load(self):
+        filename = self.path('tracker.xlsx')
+        write_tracker(filename, [
+            [datetime(2020, 7, 6), 1, 2, 3],
+            ['total', 10, 20, 30],
+            # the same day again, its values win where it has them
+            [datetime(2020, 7, 6, 15, 30), 4, None, 6],
+            [datetime(2020, 7, 7), None, 5, None],
+        ])
+        tracker = load(filename)
+        # the int labelled 1303 is not a stock code, the undated row is dropped
+        self.assertEqual([('1301', datetime(2020, 7, 6)), ('1302', datetime(2020, 7, 6)), ('1302', datetime(2020, 7, 7))],
+                         tracker.index.tolist())
+        self.assertEqual([4, 2, 5], tracker['volume'].tolist())
+        self.assertEqual([16, 8, 20], tracker['trade'].tolist())
+        self.assertEqual({'Int64'}, {str(tracker[column].dtype) for column in ('volume', 'price', 'trade')})
+        stock_summaries = parse(filename)
+        self.assertEqual(['1301', '1302'], stock_summaries.stock_codes.tolist())
+        np.testing.assert_array_equal(np.array(['2020-07-06', '2020-07-06', '2020-07-07'], dtype='datetime64[D]'),
+                                      stock_summaries.dates)
+        self.assertEqual([12.0, 6.0, 15.0], stock_summaries.column('performance'))
+        # nothing but the summaries comes out of the lazy entry point
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            summaries = iter_summaries(filename)
+            self.assertEqual(['1301', '1302', '1302'], [summary.stock_code for summary in summaries])
+        self.assertEqual('', stdout.getvalue())
+
+    def test_fractional_values(self):
+        filename = self.path('tracker.xlsx')
+        write_tracker(filename, [[datetime(2020, 7, 6), 1, 2.5]], header=['Date', '1301', '1302'])
+        with self.assertRaises(Exception):
+            load(filename)
+
+
+class TestLoadWorkbooks(TrackerTestCase):
+    def test_overlapping_workbooks(self):
+        write_tracker(self.path('tracker 2020-07-06.xlsx'), [
+            [datetime(2020, 7, 6), 1, 2, 0],
+            [datetime(2020, 7, 7), 3, 8, 0],
+        ])
+        write_tracker(self.path('tracker 2020-07-07.xlsx'), [
+            [datetime(2020, 7, 7), None, 4, 0],
+            [datetime(2020, 7, 8), 5, 6, 0],
+        ])
+        # no tracker sheets, left out
+        write_tracker(self.path('packet_input.xlsx'), [[datetime(2020, 7, 7), 9, 9, 9]], sheet_names=['Sheet1'])
+        for workers in (1, 2):
+            tracker = load_workbooks(self.directory.name, workers=workers)
+            self.assertEqual([('1301', datetime(2020, 7, 6)), ('1301', datetime(2020, 7, 7)), ('1301', datetime(2020, 7, 8)),
+                              ('1302', datetime(2020, 7, 6)), ('1302', datetime(2020, 7, 7)), ('1302', datetime(2020, 7, 8))],
+                             tracker.index.tolist())
+            # 1301 on the 7th is only in the earlier workbook, both have 1302 on the 7th and the later wins
+            self.assertEqual([1, 3, 5, 2, 4, 6], tracker['volume'].tolist())
+            self.assertEqual([2, 6, 10, 4, 8, 12], tracker['price'].tolist())
+        with self.assertRaises(Exception):
+            load_workbooks(self.path('packet_*.xlsx'))
@@ -0,0 +1,45 @@
+from datetime import datetime
+from unittest import TestCase
+
+import numpy as np
+
+from stock_intensive_tracker.stock_summary import StockSummaries, StockSummary
+
+
+def stock_summaries() -> StockSummaries:
+    # three rows of two stocks, each column missing somewhere
+    return StockSummaries(np.array(['1301', '1302']), np.array([0, 1, 1]),
+                          np.array(['2020-07-06', '2020-07-06', '2020-07-07'], dtype='datetime64[D]'),
+                          {'volume': [100, 0, 300], 'price': [10, 20, 0], 'performance': [0.5, np.nan, -1.25], 'trade': [0, 2, 3]},
+                          {'volume': [False, True, False], 'price': [False, False, True],
+                           'performance': [False, True, False], 'trade': [True, False, False]})
+
+
+def values(stock_summary: StockSummary) -> tuple:
+    return tuple(getattr(stock_summary, slot) for slot in StockSummary.__slots__)
+
+
+class TestStockSummaries(TestCase):
+    def test_index(self):
+        summaries = stock_summaries()
+        self.assertEqual(3, len(summaries))
+        self.assertEqual(('1301', datetime(2020, 7, 6), 100, 10, 0.5, None), values(summaries[0]))
+        self.assertEqual(('1302', datetime(2020, 7, 6), None, 20, None, 2), values(summaries[np.int64(1)]))
+        self.assertEqual(('1302', datetime(2020, 7, 7), 300, None, -1.25, 3), values(summaries[-1]))
+        self.assertIsInstance(summaries[0].volume, int)
+
+    def test_subsets(self):
+        summaries = stock_summaries()
+        tail = summaries[1:]
+        self.assertIsInstance(tail, StockSummaries)
+        self.assertEqual(['1302', '1302'], tail.row_stock_codes().tolist())
+        self.assertEqual([None, 300], tail.column('volume'))
+        masked = summaries[summaries.codes == 0]
+        self.assertEqual(['1301'], masked.row_stock_codes().tolist())
+        self.assertEqual([None], masked.column('trade'))
+        self.assertEqual(['1301', '1302', '1302'], summaries.row_stock_codes().tolist())
+
+    def test_iter(self):
+        summaries = stock_summaries()
+        self.assertEqual([values(summaries[index]) for index in range(0, len(summaries))], list(map(values, summaries)))
+        self.assertEqual(['1302'], [summary.stock_code for summary in summaries[1:2]])
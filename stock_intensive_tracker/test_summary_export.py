@@ -0,0 +1,49 @@
+from unittest import TestCase
+import csv
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from stock_intensive_tracker.stock_summary import StockSummaries
+from stock_intensive_tracker.summary_export import FIELDS, export, load_npz
+from stock_intensive_tracker.test_stock_summary import stock_summaries
+
+
+class TestExport(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.summaries = stock_summaries()
+        # row by row as the exports should write them
+        self.rows = [{'stock_code': summary.stock_code, 'date': summary.date.strftime('%Y-%m-%d'),
+                      **{column: getattr(summary, column) for column in StockSummaries.COLUMNS}} for summary in self.summaries]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_jsonl(self):
+        self.assertEqual(3, export(self.summaries, self.path('summaries.jsonl'), batch_size=2))
+        with open(self.path('summaries.jsonl')) as file:
+            self.assertEqual(self.rows, [json.loads(line) for line in file])
+
+    def test_csv(self):
+        self.assertEqual(3, export(self.summaries, self.path('summaries.csv'), batch_size=2))
+        with open(self.path('summaries.csv'), newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(list(FIELDS), list(rows[0]))
+        self.assertEqual([{field: '' if value is None else str(value) for field, value in row.items()} for row in self.rows], rows)
+
+    def test_npz(self):
+        for name, file_format in (('summaries.npz', None), ('summaries.bin', 'npz')):
+            export(self.summaries, self.path(name), file_format)
+            self.assertTrue(os.path.exists(self.path(name)))
+            loaded = load_npz(self.path(name))
+            np.testing.assert_array_equal(self.summaries.row_stock_codes(), loaded.row_stock_codes())
+            np.testing.assert_array_equal(self.summaries.dates, loaded.dates)
+            for column in StockSummaries.COLUMNS:
+                self.assertEqual(self.summaries.column(column), loaded.column(column))
+        self.assertEqual(['summaries.bin', 'summaries.npz'], sorted(os.listdir(self.directory.name)))
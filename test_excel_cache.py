@@ -0,0 +1,100 @@
+from unittest import TestCase
+from unittest.mock import patch
+import os
+import tempfile
+
+import pandas as pd
+
+import excel_cache
+
+
+def write_workbook(filename, sheets: dict):
+    with pd.ExcelWriter(filename) as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+class TestReadExcel(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = patch.object(excel_cache, 'EXCEL_CACHE_DIRECTORY', os.path.join(self.directory.name, 'excel_cache'))
+        self.cache.start()
+        self.filename = os.path.join(self.directory.name, 'workbook.xlsx')
+        write_workbook(self.filename, {'Vol': pd.DataFrame({'1301': [1, 2]}), 'Px': pd.DataFrame({'1301': [3, 4]})})
+
+    def tearDown(self):
+        self.cache.stop()
+        self.directory.cleanup()
+
+    def snapshots(self) -> list:
+        return sorted(name for root, _directories, names in os.walk(excel_cache.EXCEL_CACHE_DIRECTORY)
+                      for name in names if name.endswith('.pkl'))
+
+    def test_unchanged(self):
+        pd.testing.assert_frame_equal(pd.read_excel(self.filename, sheet_name='Px'), excel_cache.read_excel(self.filename, 'Px'))
+        # an untouched file is neither hashed nor read again
+        with patch.object(excel_cache.hashlib, 'sha256') as sha256, patch.object(excel_cache.pd, 'read_excel') as read_excel:
+            df = excel_cache.read_excel(self.filename, 'Px')
+        sha256.assert_not_called()
+        read_excel.assert_not_called()
+        self.assertEqual([3, 4], df['1301'].tolist())
+
+    def test_touched(self):
+        excel_cache.read_excel(self.filename, 'Vol')
+        snapshots = self.snapshots()
+        stat = os.stat(self.filename)
+        os.utime(self.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        # the same content is hashed again and its snapshot reused
+        with patch.object(excel_cache.pd, 'read_excel') as read_excel:
+            df = excel_cache.read_excel(self.filename, 'Vol')
+        read_excel.assert_not_called()
+        self.assertEqual([1, 2], df['1301'].tolist())
+        self.assertEqual(snapshots, self.snapshots())
+
+    def test_changed(self):
+        excel_cache.read_excel(self.filename, 'Vol')
+        snapshots = self.snapshots()
+        write_workbook(self.filename, {'Vol': pd.DataFrame({'1301': [5, 6, 7]})})
+        self.assertEqual([5, 6, 7], excel_cache.read_excel(self.filename, 'Vol')['1301'].tolist())
+        self.assertEqual(1, len(self.snapshots()))
+        self.assertNotEqual(snapshots, self.snapshots())
+
+    def test_removed_by_another_sheet(self):
+        for sheet_name in ('Vol', 'Px'):
+            excel_cache.read_excel(self.filename, sheet_name)
+        write_workbook(self.filename, {'Vol': pd.DataFrame({'1301': [5, 6, 7]})})
+        listdir = os.listdir
+
+        def raced_listdir(directory):
+            # another process invalidating the same workbook removes them first
+            names = listdir(directory)
+            for name in names:
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(directory, name))
+            return names
+
+        with patch.object(excel_cache.os, 'listdir', raced_listdir):
+            self.assertEqual([5, 6, 7], excel_cache.read_excel(self.filename, 'Vol')['1301'].tolist())
+        self.assertEqual(1, len(self.snapshots()))
+
+    def test_unreadable_snapshot(self):
+        excel_cache.read_excel(self.filename, 'Vol')
+        (snapshot,) = [os.path.join(root, name) for root, _directories, names in os.walk(excel_cache.EXCEL_CACHE_DIRECTORY)
+                       for name in names if name.endswith('.pkl')]
+        with open(snapshot, 'r+b') as file:
+            file.truncate(10)
+        self.assertEqual([1, 2], excel_cache.read_excel(self.filename, 'Vol')['1301'].tolist())
+        # parsed again into a snapshot that reads
+        with patch.object(excel_cache.pd, 'read_excel') as read_excel:
+            self.assertEqual([1, 2], excel_cache.read_excel(self.filename, 'Vol')['1301'].tolist())
+        read_excel.assert_not_called()
+
+    def test_many_sheets(self):
+        for sheet_name in (None, ['Vol', 'Px']):
+            sheets = excel_cache.read_excel(self.filename, sheet_name)
+            self.assertEqual([3, 4], sheets['Px']['1301'].tolist())
+            with patch.object(excel_cache.pd, 'read_excel') as read_excel:
+                sheets = excel_cache.read_excel(self.filename, sheet_name)
+            read_excel.assert_not_called()
+            self.assertEqual(['Vol', 'Px'], list(sheets))
+        self.assertEqual(2, len(self.snapshots()))